@@ -0,0 +1,166 @@
+# 업로드 API 수용 제어 (back-pressure)
+#
+# 큐가 이미 깊거나 Redis 메모리가 부족한데도 업로드를 계속 받으면 대기 시간이 끝없이 늘고
+# 결국 Redis 가 OOM 으로 종료됩니다. 업로드를 저장/발행하기 전에 아래 순서로 확인하고,
+# 한도를 넘으면 429 + Retry-After 로 깨끗하게 거절합니다.
+#   1. Redis 메모리 사용률 (INFO memory, used_memory / maxmemory)
+#   2. 브로커 큐 적체 (큐별 우선순위 리스트 길이 합)
+#   3. 사용자별 실행 중 + 대기 중 파이프라인 수 (background/fair_queue.py 카운터)
+#   4. 요청률 토큰 버킷 (web 프로세스별) - 잠깐 기다리면 토큰이 생기면 지연 후 수용, 아니면 거절
+#
+# 메모리/적체 조회는 probe_interval 동안 캐시해 요청마다 Redis 를 조회하지 않습니다.
+# 설정은 celeryconfig.admission 에서 합니다.
+
+import math
+import time
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+
+from background.metrics import ADMISSION_TOTAL
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Decision:
+    """수용 판정 결과 (wait > 0 이면 토큰 버킷 지연 후 수용)"""
+    admitted: bool
+    reason: str = "ok"
+    retry_after: float = 0.0
+    wait: float = 0.0
+
+    def retry_after_header(self) -> str:
+        return str(max(int(math.ceil(self.retry_after)), 1))
+
+
+class TokenBucket:
+    """초당 rate 개 토큰, 최대 burst 개 보관"""
+
+    def __init__(self, rate: float, burst: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.clock = clock
+        self.tokens = self.burst
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, max_wait: float) -> Optional[float]:
+        """토큰 1개 예약 - 기다릴 시간(초) 반환, max_wait 안에 생기지 않으면 None (예약 안 함)
+
+        대기 시간이 있는 예약도 토큰을 미리 빼 두므로 뒤의 요청은 그만큼 더 기다립니다.
+        """
+        with self._lock:
+            self._refill(self.clock())
+            wait = 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+            if wait > max_wait:
+                return None
+            self.tokens -= 1
+            return wait
+
+    def time_until_token(self) -> float:
+        with self._lock:
+            self._refill(self.clock())
+            return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+
+class RedisProbe:
+    """실제 Redis/브로커 상태 조회"""
+
+    def __init__(self, app, queues):
+        self.app = app
+        self.queues = list(queues)
+        self._broker = None
+
+    def queue_depth(self) -> int:
+        if self._broker is None:  # 브로커가 Redis 가 아니면 (memory:// 등) 조회 실패로 처리됨
+            from background.autoscaler import CeleryBrokerBackend
+            self._broker = CeleryBrokerBackend(self.app)
+        return sum(self._broker.depth(queue) for queue in self.queues)
+
+    def memory_ratio(self, max_bytes: int = None) -> float:
+        from background.store import get_redis
+        info = get_redis().info("memory")
+        limit = max_bytes or int(info.get("maxmemory") or 0)
+        return float(info.get("used_memory", 0)) / limit if limit else 0.0
+
+    def user_backlog(self, user_id: str) -> int:
+        from background import fair_queue
+        return fair_queue.inflight(user_id) + fair_queue.pending_count(user_id)
+
+
+class AdmissionController:
+    """수용 여부 판정 - 조회 실패 시에는 수용 (수용 제어 때문에 서비스가 멈추지 않도록)"""
+
+    def __init__(self, conf: Dict, probe, clock: Callable[[], float] = time.monotonic):
+        self.conf = conf
+        self.probe = probe
+        self.clock = clock
+        self.bucket = TokenBucket(conf.get("rate_per_second", 50), conf.get("burst", 100), clock)
+        self._cached = {}
+        self._lock = threading.Lock()
+
+    def _cached_probe(self, name: str, fetch: Callable[[], float]) -> float:
+        """probe_interval 동안 같은 값 재사용 (조회 실패도 0 으로 캐시 - 장애 중 요청마다 재연결하지 않도록)"""
+        now = self.clock()
+        with self._lock:
+            cached = self._cached.get(name)
+            if cached and now - cached[0] < float(self.conf.get("probe_interval", 1.0)):
+                return cached[1]
+        try:
+            value = fetch()
+        except Exception as e:
+            logger.warning(f"[admission] {name} 조회 실패 - 수용으로 처리: {e}")
+            value = 0
+        with self._lock:
+            self._cached[name] = (now, value)
+        return value
+
+    def _reject(self, reason: str, retry_after: float) -> Decision:
+        ADMISSION_TOTAL.labels(decision="rejected", reason=reason).inc()
+        return Decision(False, reason, retry_after)
+
+    def check(self, user_id: str = None) -> Decision:
+        conf = self.conf
+        if not conf.get("enabled", True):
+            return Decision(True)
+        retry_after = float(conf.get("retry_after_seconds", 5))
+
+        try:
+            max_ratio = conf.get("max_redis_memory_ratio")
+            if max_ratio and self._cached_probe(
+                    "memory", lambda: self.probe.memory_ratio(conf.get("max_redis_memory_bytes"))) >= max_ratio:
+                return self._reject("redis_memory", retry_after * 2)
+
+            max_depth = conf.get("max_queue_depth")
+            if max_depth and self._cached_probe("depth", self.probe.queue_depth) >= max_depth:
+                return self._reject("queue_depth", retry_after)
+
+            max_backlog = conf.get("max_user_backlog")
+            if max_backlog and user_id is not None and self.probe.user_backlog(user_id) >= max_backlog:
+                return self._reject("user_backlog", retry_after)
+        except Exception as e:
+            logger.warning(f"[admission] 상태 조회 실패 - 수용으로 처리: {e}")
+
+        wait = self.bucket.reserve(float(conf.get("max_defer_seconds", 0.5)))
+        if wait is None:
+            return self._reject("rate", self.bucket.time_until_token())
+        ADMISSION_TOTAL.labels(decision="deferred" if wait else "admitted", reason="ok").inc()
+        return Decision(True, wait=wait)
+
+
+_controller = None
+
+
+def get_controller() -> AdmissionController:
+    global _controller
+    if _controller is None:
+        from background.celery import celery_app
+        conf = celery_app.conf.get("admission") or {}
+        _controller = AdmissionController(conf, RedisProbe(celery_app, conf.get("queues", ["celery"])))
+    return _controller
@@ -0,0 +1,394 @@
+# 큐 적체 기반 워커 동시성 자동 조절 컨트롤러
+#
+# 큐별 적체(대기 메시지 수), 가장 오래된 메시지의 대기 시간, 작업 지연 메트릭(큐 대기 시간 p95)을
+# 주기적으로 확인하고 워커 원격 제어(pool_grow / pool_shrink)로 풀 프로세스 수를 늘리거나 줄입니다.
+# 지연 메트릭은 워커 메트릭 엔드포인트(celery_task_queue_wait_seconds 히스토그램)를 제어 주기마다
+# 읽어 직전 조회와의 차이로 계산하므로, 최근 주기 동안 시작된 작업만 반영됩니다.
+#
+# 실행:
+#   python -m background.autoscaler              # 실제 브로커/워커 대상
+#   python -m background.autoscaler --simulate   # 시뮬레이션 큐로 정책 검증
+#
+# 정책은 celeryconfig.autoscale_policies 에서 큐별로 설정합니다.
+
+import argparse
+import json
+import logging
+import math
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ScalingPolicy:
+    """큐별 스케일링 정책"""
+    queue: str
+    min_procs: int = 1
+    max_procs: int = 8
+    target_backlog_per_proc: int = 5      # 프로세스당 허용 적체 메시지 수
+    max_wait_seconds: float = 30.0        # 가장 오래된 메시지 대기 허용 시간
+    max_latency_p95_seconds: Optional[float] = None  # 최근 주기 작업 대기 시간 p95 허용치 (None 이면 사용 안 함)
+    scale_up_step: int = 2
+    scale_down_step: int = 1
+    scale_up_cooldown: float = 15.0       # 확장 후 다음 확장까지 최소 간격 (초)
+    scale_down_cooldown: float = 120.0    # 마지막 변경 후 축소까지 최소 간격 (초)
+
+    @classmethod
+    def from_config(cls, queue: str, options: Dict) -> "ScalingPolicy":
+        return cls(queue=queue, **options)
+
+
+@dataclass
+class QueueState:
+    """큐별 컨트롤러 상태"""
+    last_scale_up: float = float("-inf")
+    last_change: float = float("-inf")
+    history: list = field(default_factory=list)
+
+
+def histogram_quantile(quantile: float, buckets: Dict[float, float]) -> Optional[float]:
+    """누적 버킷 {le: count} 에서 분위수 추정 (버킷 안은 선형 보간, Prometheus histogram_quantile 과 같은 방식)"""
+    bounds = sorted(buckets)
+    if not bounds or not buckets[bounds[-1]]:
+        return None
+    rank = quantile * buckets[bounds[-1]]
+    lower_bound, lower_count = 0.0, 0.0
+    for bound in bounds:
+        count = buckets[bound]
+        if count >= rank:
+            if math.isinf(bound):
+                return lower_bound  # 마지막 유한 버킷보다 큼 - 상한으로 보고
+            if count == lower_count:
+                return bound
+            return lower_bound + (bound - lower_bound) * (rank - lower_count) / (count - lower_count)
+        lower_bound, lower_count = bound, count
+    return bounds[-1]
+
+
+class MetricsLatencySource:
+    """워커 메트릭 엔드포인트에서 큐별 작업 대기 시간 p95 계산 (직전 조회와의 버킷 차이 기준)
+
+    task_prefixes: 큐 -> 그 큐에서 실행되는 작업 이름 접두사 (celeryconfig.task_modules_by_queue 의 모듈)
+    """
+
+    METRIC = "celery_task_queue_wait_seconds"
+
+    def __init__(self, urls, task_prefixes: Dict[str, list], quantile: float = 0.95, fetch=None):
+        self.urls = list(urls)
+        self.task_prefixes = task_prefixes
+        self.quantile = quantile
+        self.fetch = fetch or self._fetch
+        self._previous = {}
+
+    @staticmethod
+    def _fetch(url: str) -> str:
+        from urllib.request import urlopen
+        with urlopen(url, timeout=2.0) as response:
+            return response.read().decode()
+
+    def _buckets(self, queue: str) -> Dict[float, float]:
+        from prometheus_client.parser import text_string_to_metric_families
+
+        prefixes = tuple(self.task_prefixes.get(queue) or ())
+        buckets = {}
+        for url in self.urls:
+            try:
+                text = self.fetch(url)
+            except Exception as e:
+                logger.warning(f"[autoscaler] 메트릭 조회 실패 ({url}): {e}")
+                continue
+            for family in text_string_to_metric_families(text):
+                if family.name != self.METRIC:
+                    continue
+                for sample in family.samples:
+                    if sample.name.endswith("_bucket") and sample.labels.get("task", "").startswith(prefixes):
+                        bound = float(sample.labels["le"])
+                        buckets[bound] = buckets.get(bound, 0.0) + sample.value
+        return buckets
+
+    def latency_p95(self, queue: str) -> Optional[float]:
+        current = self._buckets(queue)
+        previous = self._previous.get(queue, {})
+        self._previous[queue] = current
+        delta = {bound: count - previous.get(bound, 0.0) for bound, count in current.items()}
+        if any(count < 0 for count in delta.values()):
+            delta = current  # 워커 재시작으로 카운터가 초기화됨
+        return histogram_quantile(self.quantile, delta)
+
+
+class CeleryBrokerBackend:
+    """Redis 브로커 + Celery 원격 제어를 사용하는 실제 백엔드"""
+
+    def __init__(self, app, latency: MetricsLatencySource = None):
+        import redis
+        self.app = app
+        self.redis = redis.Redis.from_url(app.conf.broker_url)
+        self.latency = latency
+
+    def _queue_keys(self, queue: str):
+        # kombu redis 전송은 우선순위별로 "{queue}\x06\x16{priority}" 리스트를 추가로 사용
+        sep = self.app.conf.broker_transport_options.get("sep", "\x06\x16")
+        keys = [queue]
+        for priority in self.app.conf.broker_transport_options.get("priority_steps", []):
+            if priority:
+                keys.append(f"{queue}{sep}{priority}")
+        return keys
+
+    def depth(self, queue: str) -> int:
+        pipe = self.redis.pipeline()
+        for key in self._queue_keys(queue):
+            pipe.llen(key)
+        return sum(pipe.execute())
+
+    def oldest_wait(self, queue: str) -> Optional[float]:
+        """가장 오래된 메시지의 대기 시간 (발행 시 기록된 published_at 헤더 기준)"""
+        oldest = None
+        for key in self._queue_keys(queue):
+            raw = self.redis.lindex(key, -1)  # LPUSH/BRPOP 이므로 꼬리가 가장 오래된 메시지
+            if not raw:
+                continue
+            try:
+                published_at = json.loads(raw).get("headers", {}).get("published_at")
+            except ValueError:
+                continue
+            if published_at and (oldest is None or published_at < oldest):
+                oldest = published_at
+        return time.time() - oldest if oldest else None
+
+    def latency_p95(self, queue: str) -> Optional[float]:
+        return self.latency.latency_p95(queue) if self.latency else None
+
+    def workers(self, queue: str) -> Dict[str, int]:
+        """큐를 소비하는 워커별 현재 풀 프로세스 수"""
+        inspect = self.app.control.inspect(timeout=2.0)
+        active_queues = inspect.active_queues() or {}
+        stats = inspect.stats() or {}
+        result = {}
+        for hostname, queues in active_queues.items():
+            if any(q.get("name") == queue for q in queues):
+                procs = stats.get(hostname, {}).get("pool", {}).get("processes", [])
+                result[hostname] = len(procs)
+        return result
+
+    def grow(self, hostname: str, n: int):
+        self.app.control.pool_grow(n, destination=[hostname])
+
+    def shrink(self, hostname: str, n: int):
+        self.app.control.pool_shrink(n, destination=[hostname])
+
+
+class SimulatedQueue:
+    """정책 검증용 시뮬레이션 큐 (도착률/처리 시간/워커 1대)
+
+    arrivals: 시각(초) -> 초당 도착 메시지 수 함수
+    """
+
+    def __init__(self, queue: str, arrivals, service_time: float = 1.0, procs: int = 2, seed: int = 0):
+        self.queue = queue
+        self.arrivals = arrivals
+        self.service_time = service_time
+        self.procs = procs
+        self.now = 0.0
+        self.pending = []   # 대기 메시지의 도착 시각
+        self._busy = []     # 처리 중 메시지의 완료 시각
+        self._random = random.Random(seed)
+        self.completed_waits = []
+        self._reported_waits = 0
+
+    def advance(self, seconds: float, step: float = 0.1):
+        end = self.now + seconds
+        while self.now < end:
+            self.now += step
+            expected = self.arrivals(self.now) * step
+            count = int(expected) + (1 if self._random.random() < expected - int(expected) else 0)
+            self.pending.extend([self.now] * count)
+            self._busy = [t for t in self._busy if t > self.now]
+            while self.pending and len(self._busy) < self.procs:
+                arrived = self.pending.pop(0)
+                self.completed_waits.append(self.now - arrived)
+                self._busy.append(self.now + self.service_time)
+
+    # ----- 백엔드 인터페이스 -----
+    def depth(self, queue: str) -> int:
+        return len(self.pending)
+
+    def oldest_wait(self, queue: str) -> Optional[float]:
+        return self.now - self.pending[0] if self.pending else None
+
+    def latency_p95(self, queue: str) -> Optional[float]:
+        """직전 조회 이후 처리를 시작한 메시지들의 대기 시간 p95"""
+        recent = sorted(self.completed_waits[self._reported_waits:])
+        self._reported_waits = len(self.completed_waits)
+        return recent[min(int(len(recent) * 0.95), len(recent) - 1)] if recent else None
+
+    def workers(self, queue: str) -> Dict[str, int]:
+        return {"sim@worker": self.procs}
+
+    def grow(self, hostname: str, n: int):
+        self.procs += n
+
+    def shrink(self, hostname: str, n: int):
+        self.procs = max(self.procs - n, 0)
+
+
+class Autoscaler:
+    """큐별 정책에 따라 워커 풀 크기를 조정하는 컨트롤러"""
+
+    def __init__(self, backend, policies, clock=time.monotonic):
+        self.backend = backend
+        self.policies = {p.queue: p for p in policies}
+        self.clock = clock
+        self.states = {queue: QueueState() for queue in self.policies}
+
+    def desired_procs(self, policy: ScalingPolicy, current: int, depth: int, wait: Optional[float],
+                      latency: Optional[float] = None) -> int:
+        desired = math.ceil(depth / policy.target_backlog_per_proc) if depth else policy.min_procs
+        if wait is not None and wait > policy.max_wait_seconds:
+            desired = max(desired, current + policy.scale_up_step)
+        if policy.max_latency_p95_seconds is not None and latency is not None \
+                and latency > policy.max_latency_p95_seconds:
+            desired = max(desired, current + policy.scale_up_step)  # 적체는 작아도 작업들이 오래 기다림
+        return max(policy.min_procs, min(policy.max_procs, desired))
+
+    def evaluate(self, queue: str) -> Dict:
+        """한 번의 제어 주기: 관측 → 결정 → 원격 제어"""
+        policy = self.policies[queue]
+        state = self.states[queue]
+        now = self.clock()
+
+        depth = self.backend.depth(queue)
+        wait = self.backend.oldest_wait(queue)
+        latency = self.backend.latency_p95(queue)
+        workers = self.backend.workers(queue)
+        current = sum(workers.values())
+        desired = self.desired_procs(policy, current, depth, wait, latency)
+
+        action, delta = "hold", 0
+        if not workers:
+            action = "no_workers"
+        elif desired > current and now - state.last_scale_up >= policy.scale_up_cooldown:
+            delta = min(desired - current, policy.scale_up_step)
+            self._distribute(workers, delta, grow=True)
+            state.last_scale_up = state.last_change = now
+            action = "scale_up"
+        elif desired < current and now - state.last_change >= policy.scale_down_cooldown:
+            delta = min(current - desired, policy.scale_down_step)
+            self._distribute(workers, delta, grow=False)
+            state.last_change = now
+            action = "scale_down"
+
+        decision = {
+            "queue": queue,
+            "depth": depth,
+            "oldest_wait": round(wait, 3) if wait is not None else None,
+            "latency_p95": round(latency, 3) if latency is not None else None,
+            "current": current,
+            "desired": desired,
+            "action": action,
+            "delta": delta,
+        }
+        state.history.append(decision)
+        del state.history[:-100]
+        if action in ("scale_up", "scale_down"):
+            logger.info(f"[autoscaler] {queue}: {action} {current} → {current + (delta if action == 'scale_up' else -delta)} "
+                        f"(적체 {depth}, 최장 대기 {decision['oldest_wait'] or 0}s, "
+                        f"대기 p95 {decision['latency_p95'] or 0}s)")
+        return decision
+
+    def _distribute(self, workers: Dict[str, int], delta: int, grow: bool):
+        """변경량을 워커들에 1개씩 분배 (확장은 작은 풀부터, 축소는 큰 풀부터)"""
+        sizes = dict(workers)
+        for _ in range(delta):
+            if grow:
+                hostname = min(sizes, key=sizes.get)
+                self.backend.grow(hostname, 1)
+                sizes[hostname] += 1
+            else:
+                hostname = max(sizes, key=sizes.get)
+                if sizes[hostname] <= 1:
+                    break
+                self.backend.shrink(hostname, 1)
+                sizes[hostname] -= 1
+
+    def run_once(self):
+        return [self.evaluate(queue) for queue in self.policies]
+
+    def run_forever(self, interval: float):
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"[autoscaler] 제어 주기 실패: {str(e)}")
+            time.sleep(interval)
+
+
+def load_policies(app):
+    return [ScalingPolicy.from_config(queue, options)
+            for queue, options in (app.conf.get("autoscale_policies") or {}).items()]
+
+
+def load_latency_source(app) -> Optional[MetricsLatencySource]:
+    """autoscale_metrics_urls 가 설정되면 큐별 작업 모듈 기준 지연 메트릭 소스 생성"""
+    urls = app.conf.get("autoscale_metrics_urls") or []
+    if not urls:
+        return None
+    return MetricsLatencySource(urls, app.conf.get("task_modules_by_queue") or {})
+
+
+def simulate(policy: ScalingPolicy, duration: float = 900, interval: float = 5.0, service_time: float = 2.0):
+    """버스트 트래픽 시뮬레이션 - 조절 이력과 대기 시간 통계 반환"""
+    def bursty(t):
+        return 6.0 if 120 <= t % 600 < 240 else 0.3
+
+    queue = SimulatedQueue(policy.queue, bursty, service_time=service_time, procs=policy.min_procs)
+    scaler = Autoscaler(queue, [policy], clock=lambda: queue.now)
+    timeline = []
+    while queue.now < duration:
+        queue.advance(interval)
+        decision = scaler.evaluate(policy.queue)
+        timeline.append({"t": round(queue.now, 1), **decision})
+
+    waits = sorted(queue.completed_waits)
+    return {
+        "timeline": timeline,
+        "max_procs_used": max(d["current"] for d in timeline),
+        "proc_seconds": round(sum(d["current"] for d in timeline) * interval, 1),
+        "wait_p50": waits[len(waits) // 2] if waits else None,
+        "wait_p99": waits[int(len(waits) * 0.99)] if waits else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="큐 적체 기반 워커 오토스케일러")
+    parser.add_argument("--interval", type=float, default=None, help="제어 주기 (초)")
+    parser.add_argument("--once", action="store_true", help="한 번만 평가하고 결과 출력")
+    parser.add_argument("--simulate", action="store_true", help="시뮬레이션 큐로 정책 검증")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    from background.celery import celery_app
+
+    policies = load_policies(celery_app)
+    if args.simulate:
+        for policy in policies:
+            report = simulate(policy)
+            changes = [d for d in report["timeline"] if d["action"] in ("scale_up", "scale_down")]
+            print(json.dumps({k: v for k, v in report.items() if k != "timeline"} | {
+                "queue": policy.queue,
+                "changes": changes,
+            }, ensure_ascii=False, indent=2))
+        return
+
+    scaler = Autoscaler(CeleryBrokerBackend(celery_app, load_latency_source(celery_app)), policies)
+    if args.once:
+        print(json.dumps(scaler.run_once(), ensure_ascii=False, indent=2))
+        return
+    scaler.run_forever(args.interval or celery_app.conf.get("autoscale_interval") or 10)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+# 대량 문서 배치 수집 (batch ingest)
+#
+# 수백~수만 개 파일을 하나의 배치 핸들로 묶어 고급 파이프라인에 흘려보냅니다.
+#   - 파일 작업은 배치 대기열(batch:{id}:pending)에 쌓이고
+#   - 동시에 실행되는 파이프라인은 max_in_flight 개로 제한 (backpressure)
+#   - 발행은 fair_queue.submit 을 거치므로 배치 파일도 사용자별 동시 실행 슬롯을 쓰고,
+#     슬롯이 없으면 공정 스케줄링 대기열에서 다른 사용자와 라운드로빈으로 배정됨
+#   - 파이프라인이 끝날 때마다 finalize_pipeline → file_done() 이 다음 파일을 발행
+#   - 디렉토리/압축 파일 멤버는 스트림으로 저장소에 옮기고, 크기/개수 제한을 넘는 멤버는
+#     열지 않고 skipped 상태와 사유로 기록 (압축 폭탄 방지)
+#
+# Redis 키 (batch_ttl 동안 보관)
+#   batch:{id}            메타데이터 JSON
+#   batch:{id}:counts     hash - total / queued / running / completed / failed / skipped / inflight
+#   batch:{id}:files      hash - 파일 인덱스 → 상태 JSON (skipped 는 reason 포함)
+#   batch:{id}:pending    list - 발행 대기 중인 파일 작업 JSON
+
+import os
+import json
+import logging
+import tarfile
+import uuid
+import zipfile
+from datetime import datetime
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+from background.store import get_redis
+
+logger = logging.getLogger(__name__)
+
+META_KEY = "batch:{batch_id}"
+COUNTS_KEY = "batch:{batch_id}:counts"
+FILES_KEY = "batch:{batch_id}:files"
+PENDING_KEY = "batch:{batch_id}:pending"
+
+ARCHIVE_SUFFIXES = (".zip", ".tar", ".tar.gz", ".tgz", ".tar.bz2")
+
+# 건너뛴 파일 사유
+MEMBER_TOO_LARGE = "member_too_large"          # 파일 하나가 batch_max_member_bytes 초과
+ARCHIVE_SIZE_LIMIT = "archive_size_limit"      # 압축 파일에서 풀어낸 누적 크기가 batch_max_archive_bytes 초과
+ARCHIVE_MEMBER_LIMIT = "archive_member_limit"  # 압축 파일 멤버 수가 batch_max_archive_members 초과
+
+# (이름, 선언 크기, 스트림을 여는 함수, 건너뛸 사유) - 건너뛰는 항목은 opener 가 None
+Entry = Tuple[str, int, Optional[Callable], Optional[str]]
+
+
+def _conf():
+    from background.celery import celery_app
+    return celery_app.conf
+
+
+def _ttl() -> int:
+    return int(_conf().get("batch_ttl") or 7 * 86400)
+
+
+def _keys(batch_id: str):
+    return [key.format(batch_id=batch_id) for key in (META_KEY, COUNTS_KEY, FILES_KEY, PENDING_KEY)]
+
+
+def is_archive(filename: str) -> bool:
+    return (filename or "").lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def resolve_directory(path: str) -> str:
+    """batch_import_roots 아래의 디렉토리만 허용, 실제 경로 반환"""
+    real = os.path.realpath(path)
+    for root in _conf().get("batch_import_roots") or []:
+        root = os.path.realpath(root)
+        if os.path.commonpath([root, real]) == root:
+            if not os.path.isdir(real):
+                raise FileNotFoundError(f"디렉토리를 찾을 수 없습니다: {path}")
+            return real
+    raise PermissionError(f"허용되지 않은 수집 경로입니다: {path}")
+
+
+def max_member_bytes() -> int:
+    return int(_conf().get("batch_max_member_bytes") or 100 * 1024 * 1024)
+
+
+def iter_directory(path: str) -> Iterator[Entry]:
+    """디렉토리를 이름 순으로 순회하며 파일 항목을 하나씩 반환 (숨김 파일 제외, 내용은 opener 로 스트리밍)"""
+    limit = max_member_bytes()
+    for current, dirs, files in os.walk(path):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        for name in sorted(files):
+            full = os.path.join(current, name)
+            if name.startswith(".") or not os.path.isfile(full):
+                continue
+            size = os.path.getsize(full)
+            if size > limit:
+                yield os.path.relpath(full, path), size, None, MEMBER_TOO_LARGE
+            else:
+                yield os.path.relpath(full, path), size, lambda full=full: open(full, "rb"), None
+
+
+def _archive_members(path: str) -> Iterator[Tuple[str, int, Callable]]:
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if not info.is_dir():
+                    yield info.filename, info.file_size, lambda info=info: archive.open(info)
+        return
+    with tarfile.open(path) as archive:
+        for member in archive:
+            if member.isfile():
+                yield member.name, member.size, lambda member=member: archive.extractfile(member)
+
+
+def iter_archive(path: str) -> Iterator[Entry]:
+    """zip / tar 압축 파일의 일반 파일 멤버를 하나씩 반환 (전체를 풀어 두지 않음)
+
+    제한은 멤버 헤더의 선언 크기(info.file_size / member.size)로 열기 전에 판단합니다.
+    batch_max_member_bytes 를 넘는 멤버는 건너뛰고, 누적 크기(batch_max_archive_bytes)나
+    멤버 수(batch_max_archive_members) 제한에 걸리면 그 멤버를 사유와 함께 반환하고 순회를 멈춥니다.
+    선언보다 실제 내용이 큰 멤버는 storage.store_upload(max_bytes=...) 가 쓰는 도중 막습니다.
+    """
+    conf = _conf()
+    member_limit = max_member_bytes()
+    total_limit = int(conf.get("batch_max_archive_bytes") or 2 * 1024 ** 3)
+    count_limit = int(conf.get("batch_max_archive_members") or 10000)
+
+    members, total = 0, 0
+    for name, size, opener in _archive_members(path):
+        if members >= count_limit:
+            yield name, size, None, ARCHIVE_MEMBER_LIMIT
+            return
+        if size > member_limit:
+            yield name, size, None, MEMBER_TOO_LARGE
+            continue
+        if total + size > total_limit:
+            yield name, size, None, ARCHIVE_SIZE_LIMIT
+            return
+        members += 1
+        total += size
+        yield name, size, opener, None
+
+
+def create(user_id: str, source: Dict, max_in_flight: int = None) -> str:
+    """배치 생성 후 batch_id 반환 (파일은 add_file 로 추가)"""
+    batch_id = str(uuid.uuid4())
+    meta = {
+        "batch_id": batch_id,
+        "user_id": user_id,
+        "source": source,
+        "max_in_flight": int(max_in_flight or _conf().get("batch_max_in_flight") or 8),
+        "expanding": True,  # 입력 확장(디렉토리/압축 해제) 중이면 True
+        "created_at": datetime.now().isoformat(),
+    }
+    redis_client = get_redis()
+    redis_client.setex(META_KEY.format(batch_id=batch_id), _ttl(), json.dumps(meta))
+    redis_client.hset(COUNTS_KEY.format(batch_id=batch_id), mapping={
+        "total": 0, "queued": 0, "running": 0, "completed": 0, "failed": 0, "skipped": 0, "inflight": 0,
+    })
+    return batch_id
+
+
+def get_meta(batch_id: str) -> Optional[Dict]:
+    data = get_redis().get(META_KEY.format(batch_id=batch_id))
+    return json.loads(data) if data else None
+
+
+def _set_file(batch_id: str, index: int, state: Dict):
+    get_redis().hset(FILES_KEY.format(batch_id=batch_id), str(index), json.dumps(state))
+
+
+def add_file(batch_id: str, upload: Dict, filename: str = None) -> int:
+    """저장소에 기록된 업로드(storage.store_upload 결과)를 배치 대기열에 추가
+
+    filename 은 상태 표시용 이름 (디렉토리/압축 파일 안의 상대 경로 등)
+    """
+    redis_client = get_redis()
+    counts_key = COUNTS_KEY.format(batch_id=batch_id)
+    index = redis_client.hincrby(counts_key, "total", 1) - 1
+    redis_client.hincrby(counts_key, "queued", 1)
+    job = {
+        "index": index,
+        "filename": filename or upload["filename"],
+        "path": upload["path"],
+        "sha256": upload["sha256"],
+        "size": upload["size"],
+        "chain_id": str(uuid.uuid4()),
+    }
+    _set_file(batch_id, index, {**job, "status": "queued"})
+    redis_client.rpush(PENDING_KEY.format(batch_id=batch_id), json.dumps(job))
+    return index
+
+
+def skip_file(batch_id: str, filename: str, size: int, reason: str) -> int:
+    """등록하지 않은 파일을 skipped 상태와 사유로 기록 (배치 완료 판정에는 끝난 파일로 셈)"""
+    redis_client = get_redis()
+    counts_key = COUNTS_KEY.format(batch_id=batch_id)
+    index = redis_client.hincrby(counts_key, "total", 1) - 1
+    redis_client.hincrby(counts_key, "skipped", 1)
+    _set_file(batch_id, index, {
+        "index": index,
+        "filename": filename,
+        "size": size,
+        "status": "skipped",
+        "reason": reason,
+        "finished_at": datetime.now().isoformat(),
+    })
+    logger.warning(f"[batch] {batch_id} 파일 건너뜀 ({reason}): {filename} ({size:,} bytes)")
+    return index
+
+
+def finish_expanding(batch_id: str):
+    """입력 확장 완료 표시 - 이후 모든 파일이 끝나면 배치 완료"""
+    meta = get_meta(batch_id)
+    if meta:
+        meta["expanding"] = False
+        get_redis().setex(META_KEY.format(batch_id=batch_id), _ttl(), json.dumps(meta))
+        _refresh_ttl(batch_id)
+
+
+def _refresh_ttl(batch_id: str):
+    redis_client = get_redis()
+    for key in _keys(batch_id):
+        redis_client.expire(key, _ttl())
+
+
+def pump(batch_id: str) -> int:
+    """동시 실행 한도까지 대기 파일을 공정 스케줄링(fair_queue.submit)에 제출, 제출 수 반환"""
+    from background import fair_queue
+
+    meta = get_meta(batch_id)
+    if not meta:
+        return 0
+    redis_client = get_redis()
+    counts_key = COUNTS_KEY.format(batch_id=batch_id)
+    pending_key = PENDING_KEY.format(batch_id=batch_id)
+
+    dispatched = 0
+    while True:
+        # 슬롯 선점 (INCR 후 초과 시 되돌림) → 여러 워커가 동시에 pump 해도 한도 유지
+        if redis_client.hincrby(counts_key, "inflight", 1) > meta["max_in_flight"]:
+            redis_client.hincrby(counts_key, "inflight", -1)
+            break
+        raw = redis_client.lpop(pending_key)
+        if raw is None:
+            redis_client.hincrby(counts_key, "inflight", -1)
+            break
+
+        job = json.loads(raw)
+        redis_client.hincrby(counts_key, "queued", -1)
+        redis_client.hincrby(counts_key, "running", 1)
+        _set_file(batch_id, job["index"], {**job, "status": "running"})
+        fair_queue.submit(
+            meta["user_id"],
+            job["path"],
+            job["size"],
+            blob_sha256=job["sha256"],
+            filename=job["filename"],
+            chain_id=job["chain_id"],
+            lane="bulk",
+            batch_id=batch_id,
+            batch_index=job["index"],
+        )
+        dispatched += 1
+    return dispatched
+
+
+def file_done(batch_id: str, index: int, status: str) -> int:
+    """파이프라인 종료 처리 - 상태 기록 후 다음 파일 발행"""
+    redis_client = get_redis()
+    files_key = FILES_KEY.format(batch_id=batch_id)
+    counts_key = COUNTS_KEY.format(batch_id=batch_id)
+
+    raw = redis_client.hget(files_key, str(index))
+    state = json.loads(raw) if raw else {"index": index}
+    if state.get("status") in ("completed", "failed"):
+        return 0  # 중복 호출 무시
+    state["status"] = status
+    state["finished_at"] = datetime.now().isoformat()
+    _set_file(batch_id, index, state)
+
+    redis_client.hincrby(counts_key, "running", -1)
+    redis_client.hincrby(counts_key, status, 1)
+    redis_client.hincrby(counts_key, "inflight", -1)
+    return pump(batch_id)
+
+
+def status(batch_id: str, offset: int = 0, limit: int = 100, state: str = None) -> Optional[Dict]:
+    """배치 집계 상태 + 파일별 상태 (인덱스 순 페이지)"""
+    meta = get_meta(batch_id)
+    if not meta:
+        return None
+    redis_client = get_redis()
+    counts = {k: int(v) for k, v in redis_client.hgetall(COUNTS_KEY.format(batch_id=batch_id)).items()}
+    total = counts.get("total", 0)
+    finished = counts.get("completed", 0) + counts.get("failed", 0) + counts.get("skipped", 0)
+
+    indexes = [str(i) for i in range(offset, min(offset + limit, total))]
+    files = []
+    if indexes:
+        for raw in redis_client.hmget(FILES_KEY.format(batch_id=batch_id), indexes):
+            if raw:
+                item = json.loads(raw)
+                if state is None or item.get("status") == state:
+                    files.append({k: item.get(k) for k in (
+                        "index", "filename", "size", "status", "reason", "chain_id", "finished_at")})
+
+    return {
+        "batch_id": batch_id,
+        "user_id": meta["user_id"],
+        "source": meta["source"],
+        "created_at": meta["created_at"],
+        "max_in_flight": meta["max_in_flight"],
+        "expanding": meta["expanding"],
+        "done": not meta["expanding"] and finished == total,
+        "progress": round(finished / total * 100, 1) if total else 0,
+        "counts": {k: v for k, v in counts.items() if k != "inflight"},
+        "files": files,
+        "page": {"offset": offset, "limit": limit, "total": total},
+    }
@@ -3,15 +3,17 @@ import os
 import asyncio
 import time
 
-celery_app = Celery(
-    "celery_test_server",
-    include=[
-        'background.task.test_tasks', 
-        'background.task.sample_tasks', 
-        'background.task.document_tasks', 
-        'background.task.basic_tasks',
-        'background.task.default_tasks'
-    ]  # 새로운 경로로 수정
-)
+# 로드할 작업 모듈(include)은 celeryconfig 에서 워커가 소비하는 큐 기준으로 결정
+celery_app = Celery("celery_test_server")
 
 celery_app.config_from_object('background.celeryconfig')
+
+# 로깅/메트릭/프로파일링 시그널 핸들러 등록 (web/worker 공통)
+import background.log  # noqa: E402,F401
+import background.metrics  # noqa: E402,F401
+import background.profiling  # noqa: E402,F401
+import background.retention  # noqa: E402,F401
+
+if celery_app.conf.get("local_mode"):
+    from background import local
+    local.enable(celery_app)
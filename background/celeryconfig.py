@@ -2,6 +2,8 @@
 
 import os
 
+from celery.schedules import crontab
+
 broker_url = os.environ.get("CELERY_BROKER_URL", "redis://localhost:6379/1") # 브로커 설정 메시지큐 기반으로 동작을 하기위해 큐저장용 (broker)
 result_backend = os.environ.get("CELERY_RESULT_BACKEND", "redis://localhost:6379/1") # task 실행 결과를 추적하기 위해서 저장하기 위한 공간 (backend)
 
@@ -10,4 +12,236 @@ accept_content = ["json"] # 허용할 메시지 형식의 리스트. 여기서
 result_serializer = "json" # 결과를 직렬화할 때 사용할 형식을 지정
 enable_utc = True # UTC 시간대 사용을 활성화
 timezone = "Asia/Seoul" # Celery가 사용할 기본 시간대를 설정
-broker_connection_retry_on_startup = True # 시작 시 브로커 연결 재시도를 활성화
\ No newline at end of file
+broker_connection_retry_on_startup = True # 시작 시 브로커 연결 재시도를 활성화
+
+# ===== 프로파일링 설정 (background/profiling.py) =====
+profile_tasks = os.environ.get("PROFILE_TASKS", "") # 프로파일링할 작업 이름 (쉼표 구분, 짧은 이름 허용, "*" 는 전체)
+profile_sample_rate = float(os.environ.get("PROFILE_SAMPLE_RATE", "0")) # 무작위 샘플링 비율 (0 ~ 1)
+profile_mode = os.environ.get("PROFILE_MODE", "cprofile") # "cprofile" 또는 "sample" (통계적 스택 샘플링)
+profile_dir = os.environ.get("PROFILE_DIR", "data/profiles") # 프로파일 저장 디렉토리
+
+
+# ===== 오토스케일러 설정 (background/autoscaler.py) =====
+autoscale_interval = float(os.environ.get("AUTOSCALE_INTERVAL", "10")) # 제어 주기 (초)
+autoscale_metrics_urls = [ # 지연 메트릭을 읽을 워커 메트릭 엔드포인트 (쉼표 구분, 비우면 적체/최장 대기만 사용)
+    url for url in os.environ.get("AUTOSCALE_METRICS_URLS", "").split(",") if url
+]
+autoscale_policies = { # 큐별 스케일링 정책 (ScalingPolicy 필드)
+    "celery": {
+        "min_procs": 2,
+        "max_procs": 8,
+        "target_backlog_per_proc": 5,
+        "max_wait_seconds": 30,
+        "max_latency_p95_seconds": 20,
+        "scale_up_cooldown": 15,
+        "scale_down_cooldown": 120,
+    },
+    "default-add": {
+        "min_procs": 1,
+        "max_procs": 4,
+        "target_backlog_per_proc": 10,
+        "max_wait_seconds": 60,
+    },
+}
+
+
+# ===== 우선순위 / 공정 스케줄링 설정 (background/fair_queue.py) =====
+# Redis 전송의 우선순위는 숫자가 작을수록 먼저 처리됩니다 (0 이 최우선)
+broker_transport_options = {
+    "priority_steps": list(range(10)),
+    "sep": ":",
+    "queue_order_strategy": "priority",
+}
+task_default_priority = 5
+worker_prefetch_multiplier = 1 # 미리 가져오는 메시지를 줄여야 우선순위가 실제로 반영됨
+
+fair_max_inflight_per_user = int(os.environ.get("FAIR_MAX_INFLIGHT_PER_USER", "4")) # 사용자별 동시 실행 파이프라인 수
+fair_user_max_inflight = {} # 사용자별 한도 재정의 {"user_id": n}
+fair_user_weights = {} # 라운드로빈 한 차례에 배정할 작업 수 {"user_id": n} (기본 1)
+fair_interactive_max_bytes = int(os.environ.get("FAIR_INTERACTIVE_MAX_BYTES", str(100 * 1024))) # 이 크기 이하 업로드는 interactive 레인
+fair_lane_priorities = {"interactive": 0, "bulk": 6}
+
+
+# ===== 작업 모듈 로드 설정 =====
+# 큐별 작업 모듈. CELERY_WORKER_QUEUES(쉼표 구분)가 지정되면 해당 큐의 모듈만 로드하고,
+# 지정되지 않으면 전체 모듈을 로드합니다. web 프로세스는 작업 이름으로만 발행하므로 로드하지 않습니다.
+task_modules_by_queue = {
+    "celery": [
+        "background.task.test_tasks",
+        "background.task.sample_tasks",
+        "background.task.document_tasks",
+        "background.task.basic_tasks",
+        "background.task.pipeline_tasks",
+        "background.task.maintenance_tasks",
+    ],
+    "default-add": [
+        "background.task.default_tasks",
+    ],
+}
+_worker_queues = [q.strip() for q in os.environ.get("CELERY_WORKER_QUEUES", "").split(",") if q.strip()]
+include = [
+    module
+    for queue, modules in task_modules_by_queue.items()
+    if not _worker_queues or queue in _worker_queues
+    for module in modules
+]
+
+
+# ===== 업로드 저장소 설정 (background/storage.py) =====
+upload_storage_dir = os.environ.get("UPLOAD_STORAGE_DIR", "data/blobs") # 내용 주소 기반 업로드 저장 디렉토리 (web/worker 공유 볼륨)
+upload_max_versions = int(os.environ.get("UPLOAD_MAX_VERSIONS", "20")) # 파일명별로 보관할 업로드 버전 기록 수 (오래된 기록부터 잘림)
+
+
+# ===== 결과 보관 정책 (background/retention.py) =====
+result_expires = int(os.environ.get("CELERY_RESULT_EXPIRES", "86400")) # 결과 백엔드 기본 보관 기간 (초)
+result_expires_by_task = { # 작업별 결과 백엔드 보관 기간 (초) - 최종 결과만 오래 보관 (묶음 실행은 마지막 단계 작업 기준)
+    "background.task.sample_tasks.save_to_database_advanced": 7 * 86400,
+}
+# 중간 단계 결과는 chain 메시지로 전달되므로 결과 백엔드에 저장하지 않음
+# (fan_out_stage 의 샤드도 마찬가지 - chord 합류는 결과 저장과 별개로 진행, join 은 임베딩 캐시에서 결과 구성)
+task_annotations = {
+    "background.task.sample_tasks.extract_text_advanced": {"ignore_result": True},
+    "background.task.sample_tasks.split_text_chunks_advanced": {"ignore_result": True},
+    "background.task.sample_tasks.generate_embeddings_advanced": {"ignore_result": True},
+}
+result_retention = { # side store(db=2) 키 패밀리별 정책
+    "progress": {"ttl": 3600},
+    "intermediate": {"ttl": 7200, "compress": True, "compress_min_bytes": 1024},
+    "notifications": {"ttl": 86400, "max_items": 50},
+}
+
+
+# ===== 배치 수집 설정 (background/batch.py) =====
+batch_max_in_flight = int(os.environ.get("BATCH_MAX_IN_FLIGHT", "8")) # 배치당 동시 실행 파이프라인 수 (backpressure)
+batch_max_files = int(os.environ.get("BATCH_MAX_FILES", "100000")) # 배치당 최대 파일 수
+batch_max_member_bytes = int(os.environ.get("BATCH_MAX_MEMBER_BYTES", str(100 * 1024 * 1024))) # 파일(압축 멤버) 하나의 최대 크기
+batch_max_archive_bytes = int(os.environ.get("BATCH_MAX_ARCHIVE_BYTES", str(2 * 1024 ** 3))) # 압축 파일 하나에서 풀어내는 누적 크기 상한
+batch_max_archive_members = int(os.environ.get("BATCH_MAX_ARCHIVE_MEMBERS", "10000")) # 압축 파일 하나에서 등록하는 최대 멤버 수
+batch_import_roots = [ # 디렉토리 수집을 허용하는 서버 경로 (web/worker 공유 볼륨)
+    path for path in os.environ.get("BATCH_IMPORT_ROOTS", "data/imports").split(",") if path
+]
+batch_ttl = 7 * 86400 # 배치 상태 보관 기간 (초)
+
+
+# ===== 조회 API 캐시 설정 (background/read_cache.py) =====
+read_cache = {
+    "maxsize": 4096, # 프로세스 내 LRU 항목 수
+    "memory_max_ttl": 30, # 프로세스 내 LRU 최대 보관 기간 (초) - 다른 web 프로세스에서 무효화 불가
+    "ttl": { # 리소스별 캐시 TTL (초)
+        "progress": 1,
+        "notifications": 2,
+        "status": 1,
+        "documents": 5,
+        "document": 300, # 완료/실패/superseded 문서 (처리 중이면 document_processing)
+        "document_processing": 2,
+        "chunks": 300,
+        "chunk": 3600,
+    },
+}
+
+
+# ===== 임베딩 캐시 설정 (background/embedding_cache.py) =====
+embedding_cache = {
+    "model": "text-embedding-3-small",
+    "dimensions": 1536,
+    "dtype": "float16", # 벡터 저장 형식 (float16 / float32) - 바꾸면 키가 달라져 캐시가 새로 채워짐
+    "max_entries": int(os.environ.get("EMBEDDING_CACHE_MAX_ENTRIES", "200000")), # 초과 시 LRU 삭제
+}
+
+
+# ===== 단계별 시간 예산 (background/deadline.py) =====
+stage_budget = {
+    "reserve_ratio": 0.1, # soft_time_limit 중 체크포인트/이어하기 발행용으로 남겨 둘 비율
+    "min_reserve_seconds": 2,
+    "max_continuations": 50, # 단계당 최대 이어하기 횟수
+}
+
+
+# ===== 문서 파이프라인 정의 (background/pipeline_spec.py) =====
+# PIPELINE_SPEC_FILE(JSON)이 지정되면 아래 기본 스펙 대신 사용합니다.
+from background import pipeline_spec  # noqa: E402
+
+document_pipeline = pipeline_spec.validate({
+    "stages": [
+        {"name": "텍스트_추출", "task": "background.task.sample_tasks.extract_text_advanced",
+         "soft_time_limit": 120, "time_limit": 180, "max_retries": 3},
+        {"name": "텍스트_청킹", "task": "background.task.sample_tasks.split_text_chunks_advanced",
+         "soft_time_limit": 90, "time_limit": 120, "max_retries": 3,
+         "fuse": True}, # CPU 만 쓰는 짧은 단계 - 추출과 같은 작업에서 실행 (브로커 왕복 1회 절약)
+        {"name": "임베딩_생성", "task": "background.task.sample_tasks.generate_embeddings_advanced",
+         "soft_time_limit": 300, "time_limit": 420, "max_retries": 2,
+         "batch_size": 32, # 캐시 기록 단위
+         "parallelism": int(os.environ.get("EMBEDDING_PARALLELISM", "1"))}, # 2 이상이면 chord 로 API 호출 분산
+        {"name": "데이터베이스_저장", "task": "background.task.sample_tasks.save_to_database_advanced",
+         "soft_time_limit": 60, "time_limit": 90, "max_retries": 3},
+    ],
+})
+if os.environ.get("PIPELINE_SPEC_FILE"):
+    document_pipeline = pipeline_spec.load_file(os.environ["PIPELINE_SPEC_FILE"])
+task_annotations = pipeline_spec.task_annotations(document_pipeline, base=task_annotations)
+fused_pipeline_max_bytes = int(os.environ.get("FUSED_PIPELINE_MAX_BYTES", str(100 * 1024))) # 이 크기 이하 문서는 모든 단계를 한 작업에서 실행 (0 이면 사용 안 함)
+
+
+# ===== 멱등 실행 설정 (background/idempotency.py) =====
+idempotency = {
+    "result_ttl": 86400, # 완료 결과 보관 (이 기간 안의 재전달/중복 발행은 결과만 반환)
+    "lock_ttl": None,    # 실행 중 잠금 TTL (None 이면 작업 time_limit, 없으면 3600초)
+    "contention_countdown": 30, # 같은 키가 실행 중이면 이 시간(최대 잠금 남은 시간) 후 재시도 (초)
+    "once_ttl": 86400,   # 알림/이메일 같은 개별 부수 효과 기록 보관
+}
+
+
+# ===== 업로드 수용 제어 (background/admission.py) =====
+admission = {
+    "enabled": os.environ.get("ADMISSION_ENABLED", "1") == "1",
+    "queues": ["celery"],
+    "max_queue_depth": int(os.environ.get("ADMISSION_MAX_QUEUE_DEPTH", "2000")), # 브로커 적체 한도 (메시지 수)
+    "max_user_backlog": 20,          # 사용자별 실행 중 + 대기 중 파이프라인 한도
+    "max_redis_memory_ratio": 0.85,  # used_memory / maxmemory
+    "max_redis_memory_bytes": None,  # maxmemory 미설정(0) 서버용 기준 바이트
+    "rate_per_second": float(os.environ.get("ADMISSION_RATE_PER_SECOND", "50")), # web 프로세스별 토큰 버킷
+    "burst": 100,
+    "max_defer_seconds": 0.5,        # 이 시간 안에 토큰이 생기면 기다렸다가 수용
+    "retry_after_seconds": 5,
+    "probe_interval": 1.0,           # 메모리/적체 조회 캐시 (초)
+}
+
+
+# ===== 주기 정리 작업 (background/maintenance.py, celery beat) =====
+maintenance = {
+    "scan_batch": 500,                          # SCAN COUNT / 한 번에 조회·삭제하는 키/파일 수
+    "upload_grace_seconds": int(os.environ.get("MAINTENANCE_UPLOAD_GRACE_SECONDS", "3600")), # 이보다 최근에 변경된 업로드 파일은 남김
+    "superseded_retention_seconds": 7 * 86400,  # superseded 문서의 청크 목록 보관 기간
+    "prewarm_min_occurrences": 3,               # 이 횟수 이상 색인된 본문만 임베딩 예열
+    "prewarm_limit": 1000,                      # 예열 상한 (embedding_cache.max_entries 보다 충분히 작게)
+    "prewarm_max_tracked": 200000,              # 등장 수 집계 항목 상한 (넘으면 한 번만 나온 항목 버림)
+    "lock_ttl": 1800,                           # 실행 중 표시 TTL (작업 time_limit 과 같게)
+}
+_maintenance_options = {"priority": 9} # 파이프라인 작업보다 뒤에 처리
+beat_schedule = {
+    "sweep-orphaned-uploads": {
+        "task": "background.task.maintenance_tasks.sweep_orphaned_uploads",
+        "schedule": crontab(minute=15),  # 매시 15분
+        "options": _maintenance_options,
+    },
+    "sweep-orphaned-keys": {
+        "task": "background.task.maintenance_tasks.sweep_orphaned_keys",
+        "schedule": 600.0,  # 10분마다
+        "options": _maintenance_options,
+    },
+    "compact-vector-index": {
+        "task": "background.task.maintenance_tasks.compact_vector_index",
+        "schedule": crontab(hour=3, minute=30),  # 매일 03:30 (timezone 기준)
+        "options": _maintenance_options,
+    },
+    "prewarm-embedding-cache": {
+        "task": "background.task.maintenance_tasks.prewarm_embedding_cache",
+        "schedule": crontab(hour=4, minute=0),  # 압축 후
+        "options": _maintenance_options,
+    },
+}
+
+
+# ===== 로컬 실행 모드 (background/local.py, background/clock.py) =====
+local_mode = os.environ.get("LOCAL_MODE", "0") == "1" # 외부 Redis/워커 없이 한 프로세스에서 실행 (eager + 인메모리 저장소)
+simulation_time_scale = float(os.environ.get("SIMULATION_TIME_SCALE", "1")) # 처리 시간 시뮬레이션 sleep 배율 (0 이면 대기 없음)
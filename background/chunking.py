@@ -0,0 +1,80 @@
+# 내용 기반 청킹 + 청크 해시 (증분 재색인용)
+#
+# 고정 길이로 자르면 앞부분에 한 글자만 추가돼도 뒤의 모든 청크 경계가 밀려 전부 새 청크가 됩니다.
+# 여기서는 경계를 "직전 WINDOW 글자" 의 gear 롤링 해시로 정하므로(FastCDC 방식), 경계는 주변 내용에만
+# 의존하고 수정된 부분 주변 청크만 바뀝니다. 줄바꿈 없는 긴 줄도 같은 방식으로 자릅니다.
+#   - 청크 시작에서 min_chars 이후부터 해시 상위 mask_bits 비트가 모두 0 인 위치에서 자름
+#     (평균 크기 ≈ min_chars + 2 ** mask_bits)
+#   - 자를 위치는 바로 앞 SNAP_CHARS 글자 안의 줄바꿈 → 공백으로 당김 (문장/단어 중간을 피함)
+#   - max_chars 까지 경계가 없으면 강제로 자름 (이 경우도 가까운 줄바꿈/공백 우선)
+
+import hashlib
+from typing import Iterator, List, Tuple
+
+WINDOW = 64  # 64비트 gear 해시는 최근 64글자에만 의존
+SNAP_CHARS = 64
+_MASK64 = (1 << 64) - 1
+# 글자 → 64비트 난수 (프로세스/버전과 무관하게 같은 경계가 나오도록 sha256 으로 고정 생성)
+_GEAR = tuple(int.from_bytes(hashlib.sha256(i.to_bytes(2, "big")).digest()[:8], "big") for i in range(256))
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def _snap(text: str, lo: int, cut: int) -> int:
+    """cut 바로 앞(lo 이상, SNAP_CHARS 이내)의 줄바꿈 → 공백 뒤로 자를 위치를 당김, 없으면 그대로"""
+    floor = max(lo, cut - SNAP_CHARS)
+    newline = text.rfind("\n", floor, cut)
+    if newline != -1:
+        return newline + 1
+    space = max(text.rfind(" ", floor, cut), text.rfind("\t", floor, cut))
+    return space + 1 if space != -1 else cut
+
+
+def split_boundaries(text: str, min_chars: int = 250, max_chars: int = 1000,
+                     mask_bits: int = 8) -> Iterator[Tuple[int, int]]:
+    """청크 (시작, 끝) 위치 반환"""
+    mask = ((1 << mask_bits) - 1) << (64 - mask_bits)  # 상위 비트 - 하위 비트는 최근 몇 글자에만 의존
+    length = len(text)
+    start = 0
+    while start < length:
+        lo = start + min_chars
+        hi = min(start + max_chars, length)
+        if lo >= length:
+            break
+        cut = None
+        h = 0
+        # 경계 해시는 최근 WINDOW 글자에만 의존하므로 min_chars 직전 WINDOW 글자부터 계산
+        offset = max(start, lo - WINDOW)
+        for position, char in enumerate(text[offset:hi], offset + 1):
+            h = ((h << 1) + _GEAR[ord(char) & 0xFF]) & _MASK64
+            if position >= lo and not h & mask:
+                cut = _snap(text, lo, position)
+                break
+        if cut is None:
+            if hi == length:
+                break
+            cut = _snap(text, lo, hi)
+        yield start, cut
+        start = cut
+
+    if start < length:
+        yield start, length
+
+
+def vector_ids(hashes: List[str], scope: str) -> List[str]:
+    """청크 해시 → 벡터 ID (같은 문서 안에서 같은 내용이 반복되면 순번을 붙여 구분)"""
+    seen = {}
+    ids = []
+    for digest in hashes:
+        occurrence = seen.get(digest, 0)
+        seen[digest] = occurrence + 1
+        ids.append(f"{scope}_{digest[:16]}" + (f"_{occurrence}" if occurrence else ""))
+    return ids
+
+
+def scope_for(user_id: str = None, filename: str = None, document_id: str = None) -> str:
+    """벡터 ID 범위 - 같은 사용자/파일명의 재업로드는 같은 범위를 공유"""
+    key = f"{user_id}/{filename}" if user_id is not None and filename else f"doc/{document_id}"
+    return hashlib.sha1(key.encode()).hexdigest()[:12]
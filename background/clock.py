@@ -0,0 +1,57 @@
+# 시뮬레이션 시간 (처리/API 호출 흉내용 sleep)
+#
+# 작업 안의 "처리 시간 시뮬레이션" sleep 은 time.sleep 대신 여기의 sleep() 을 사용합니다.
+# 배율(celeryconfig.simulation_time_scale, 환경 변수 SIMULATION_TIME_SCALE)로 실제 대기 시간을 조정하고,
+# 0 이면 기다리지 않습니다. 요청된 시간은 simulated_seconds() 로 누적되므로
+# 대기 없이 돌린 테스트/벤치마크에서도 "원래라면 걸렸을 시간"을 확인할 수 있습니다.
+#
+# 배율 대신 시간 소스 자체를 바꾸려면 set_source(fn) 으로 sleep 함수를 교체합니다 (fn(seconds)).
+# 시간 예산/지연 측정(time.monotonic 등)은 실제 시계를 그대로 사용합니다.
+
+import threading
+import time
+
+_scale = None
+_source = None
+_simulated = 0.0
+_lock = threading.Lock()
+
+
+def scale() -> float:
+    global _scale
+    if _scale is None:
+        from background.celery import celery_app
+        _scale = float(celery_app.conf.get("simulation_time_scale", 1))
+    return _scale
+
+
+def set_scale(value: float):
+    global _scale
+    _scale = float(value)
+
+
+def set_source(sleep_fn=None):
+    """sleep 함수 교체 (None 이면 배율 적용한 time.sleep 으로 복귀)"""
+    global _source
+    _source = sleep_fn
+
+
+def sleep(seconds: float):
+    global _simulated
+    with _lock:
+        _simulated += seconds
+    if _source is not None:
+        _source(seconds)
+    elif scale() > 0:
+        time.sleep(seconds * scale())
+
+
+def simulated_seconds() -> float:
+    """지금까지 요청된 시뮬레이션 시간 합계 (배율 적용 전)"""
+    return _simulated
+
+
+def reset():
+    global _simulated
+    with _lock:
+        _simulated = 0.0
@@ -0,0 +1,123 @@
+# 단계별 시간 예산 (soft_time_limit 기반 연속 실행)
+#
+# 큰 문서는 한 번의 실행 안에 soft_time_limit 을 넘길 수 있습니다. 예전에는
+# SoftTimeLimitExceeded → autoretry 로 단계 전체를 처음부터 다시 실행해 끝나지 못했습니다.
+# 이제 단계는 항목마다 남은 예산을 확인하고, 부족하면 진행 상황을 체크포인트로 남긴 뒤
+# self.replace() 로 같은 task_id 의 이어하기 작업을 발행합니다 (chain 의 다음 단계는 그대로 유지).
+#
+# 사용 예:
+#     budget = StageBudget(self)
+#     for item in items:
+#         if budget.should_yield():
+#             save_checkpoint(...)
+#             return continue_stage(self, step_name, stage_input, continuation=continuation)
+#         ...
+#         budget.tick()
+
+import time
+import logging
+
+from celery.exceptions import Ignore
+
+from background.metrics import count_items
+
+logger = logging.getLogger(__name__)
+
+
+def _transient_errors() -> tuple:
+    """재시도해도 되는 일시적 오류 (네트워크/브로커/저장소 연결 문제)"""
+    errors = [ConnectionError, TimeoutError]
+    try:
+        from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
+        errors += [RedisConnectionError, RedisTimeoutError]
+    except ImportError:
+        pass
+    return tuple(errors)
+
+
+# autoretry_for 에 사용 - 타임아웃/입력 오류는 재시도하지 않음 (완료된 작업을 다시 하지 않도록)
+TRANSIENT_ERRORS = _transient_errors()
+
+
+class StageBudgetExceeded(Exception):
+    """이어하기 한도를 넘은 경우 (예산 안에 끝낼 수 없는 단계)"""
+
+
+class StageYield(Ignore):
+    """묶음 실행(run_fused_stages) 안의 단계가 이어하기를 요청 - 묶음 작업이 나머지 단계와 함께 발행"""
+
+    def __init__(self, signature):
+        super().__init__("stage yielded")
+        self.signature = signature
+
+
+def _conf() -> dict:
+    from background.celery import celery_app
+    return celery_app.conf.get("stage_budget") or {}
+
+
+class StageBudget:
+    """작업의 soft_time_limit 대비 경과 시간 추적
+
+    항목별 소요 시간의 이동 평균으로 다음 항목을 끝낼 수 있는지 추정합니다.
+    """
+
+    def __init__(self, task, limit: float = None):
+        conf = _conf()
+        timelimit = task.request.timelimit or (None, None)
+        self.limit = limit or timelimit[1] or task.soft_time_limit
+        self.reserve = 0.0
+        if self.limit:
+            self.reserve = max(float(conf.get("min_reserve_seconds", 2)),
+                               self.limit * float(conf.get("reserve_ratio", 0.1)))
+        self.started = time.monotonic()
+        self._last = self.started
+        self.items = 0
+        self.avg_item = 0.0
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def remaining(self) -> float:
+        return float("inf") if not self.limit else self.limit - self.elapsed()
+
+    def tick(self):
+        """항목 하나 완료 - 항목당 소요 시간 갱신"""
+        now = time.monotonic()
+        duration = now - self._last
+        self._last = now
+        self.items += 1
+        self.avg_item = duration if self.items == 1 else 0.8 * self.avg_item + 0.2 * duration
+
+    def should_yield(self) -> bool:
+        """남은 예산으로 다음 항목을 안전하게 끝낼 수 없으면 True (이번 실행에서 1개 이상 처리한 경우만)"""
+        if not self.limit or self.items == 0:
+            return False
+        return self.remaining() < self.reserve + 2 * self.avg_item
+
+
+def continue_stage(task, step_name: str, stage_input, continuation: int = 0, **kwargs):
+    """같은 task_id 로 이어하기 작업 발행 - chain 의 다음 단계와 콜백은 그대로 이어짐
+
+    kwargs 는 이어하기 작업에 그대로 전달됩니다 (예: 샤드 번호).
+    """
+    continuation += 1
+    limit = int(_conf().get("max_continuations", 50))
+    if continuation > limit:
+        raise StageBudgetExceeded(f"{step_name} 이어하기 한도 초과 ({limit}회)")
+
+    options = {}
+    priority = (task.request.delivery_info or {}).get("priority")
+    if priority is not None:
+        options["priority"] = priority
+    if task.request.group:
+        options["ignore_result"] = False  # chord 샤드는 결과를 남겨야 합쳐짐
+    elif task.request.ignore_result:
+        options["ignore_result"] = True  # chain 의 중간 단계 (마지막 단계만 결과 저장)
+
+    count_items(step_name, "continuations")
+    logger.info(f"[{task.request.id}] {step_name} 시간 예산 소진 - 이어하기 {continuation}회차 발행")
+    continuation_sig = task.signature((stage_input,), {**kwargs, "continuation": continuation}, **options)
+    if getattr(task.request, "fused", False):
+        raise StageYield(continuation_sig)
+    return task.replace(continuation_sig)
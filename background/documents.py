@@ -0,0 +1,175 @@
+# 문서 / 청크 저장소 (조회 API 의 원본 데이터)
+#
+# 파이프라인 시작 시 문서를 등록하고(processing), 저장 단계가 청크를 기록한 뒤 completed 로,
+# 실패 시 finalize_pipeline 이 failed 로 표시합니다.
+#
+# Redis 키 (side store, 만료 없음)
+#   doc:{document_id}           문서 메타데이터 JSON
+#   doc:{document_id}:chunks    청크 ID 목록 (순서 유지)
+#   chunk:{chunk_id}            청크 JSON (본문 + 위치 + 임베딩 모델)
+#   docs:all                    전체 문서 (sorted set, score = 등록 시각)
+#   docs:user:{user_id}         사용자별 문서 (sorted set)
+#   docset:{user_id}:{filename}         같은 파일의 현재 색인된 청크 ID 집합 (증분 재색인 비교 기준)
+#   docset:{user_id}:{filename}:latest  같은 파일의 최신 문서 ID
+
+import json
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from background.store import get_redis
+from background.read_cache import get_cache
+
+DOC_KEY = "doc:{document_id}"
+DOC_CHUNKS_KEY = "doc:{document_id}:chunks"
+CHUNK_KEY = "chunk:{chunk_id}"
+ALL_DOCS_KEY = "docs:all"
+USER_DOCS_KEY = "docs:user:{user_id}"
+DOCSET_KEY = "docset:{user_id}:{filename}"
+DOCSET_LATEST_KEY = "docset:{user_id}:{filename}:latest"
+
+# 청크 조회 시 돌려주는 필드 (임베딩 벡터 자체는 제외)
+CHUNK_FIELDS = ("chunk_id", "document_id", "index", "content", "content_hash", "char_count",
+                "start_pos", "end_pos", "embedding_model")
+
+
+def _write_meta(meta: Dict):
+    meta["updated_at"] = datetime.now().isoformat()
+    get_redis().set(DOC_KEY.format(document_id=meta["document_id"]), json.dumps(meta))
+    # 조회 캐시의 문서 메타데이터 무효화 (문서 목록 페이지는 TTL 로 갱신)
+    get_cache().invalidate("document", meta["document_id"])
+
+
+def invalidate_chunk_pages(document_id: str):
+    """문서의 청크 목록 페이지 캐시 무효화 (offset/limit 별로 캐시됨)"""
+    get_cache().invalidate_group("chunks", document_id)
+
+
+def get_document(document_id: str) -> Optional[Dict]:
+    data = get_redis().get(DOC_KEY.format(document_id=document_id))
+    return json.loads(data) if data else None
+
+
+def register(document_id: str, file_path: str, user_id: str = None, filename: str = None):
+    """파이프라인 시작 시 문서 등록 (status=processing)"""
+    redis_client = get_redis()
+    now = time.time()
+    _write_meta({
+        "document_id": document_id,
+        "user_id": user_id,
+        "filename": filename,
+        "file_path": file_path,
+        "status": "processing",
+        "chunk_count": 0,
+        "created_at": datetime.fromtimestamp(now).isoformat(),
+    })
+    redis_client.zadd(ALL_DOCS_KEY, {document_id: now})
+    if user_id is not None:
+        redis_client.zadd(USER_DOCS_KEY.format(user_id=user_id), {document_id: now})
+
+
+def indexed_chunk_ids(user_id: str = None, filename: str = None) -> set:
+    """같은 사용자/파일명으로 이전에 색인된 청크 ID 집합 (처음이면 빈 집합)"""
+    if user_id is None or not filename:
+        return set()
+    return set(get_redis().smembers(DOCSET_KEY.format(user_id=user_id, filename=filename)))
+
+
+def save_chunks(document_id: str, chunks: List[Dict], summary: Dict = None,
+                user_id: str = None, filename: str = None, removed_ids: List[str] = ()):
+    """저장 단계 결과 기록 - 청크 본문/위치 저장 후 문서를 completed 로 표시
+
+    user_id/filename 이 주어지면 같은 파일의 색인 청크 집합을 갱신하고, 빠진 청크를 삭제하며
+    이전 버전 문서를 superseded 로 표시합니다. 다시 쓴 청크(재사용 청크는 document_id/index 가 바뀜)와
+    삭제한 청크, 두 문서의 청크 목록 페이지는 조회 캐시에서 무효화합니다.
+    """
+    redis_client = get_redis()
+    chunk_ids = []
+    records = {}
+    for index, chunk in enumerate(chunks):
+        chunk_id = chunk["chunk_id"]
+        chunk_ids.append(chunk_id)
+        records[CHUNK_KEY.format(chunk_id=chunk_id)] = json.dumps({
+            **{field: chunk.get(field) for field in CHUNK_FIELDS},
+            "document_id": document_id,
+            "index": index,
+        })
+    if records:
+        redis_client.mset(records)
+    if removed_ids:
+        redis_client.delete(*[CHUNK_KEY.format(chunk_id=chunk_id) for chunk_id in removed_ids])
+    get_cache().invalidate_many("chunk", [*chunk_ids, *removed_ids])
+
+    list_key = DOC_CHUNKS_KEY.format(document_id=document_id)
+    redis_client.delete(list_key)
+    if chunk_ids:
+        redis_client.rpush(list_key, *chunk_ids)
+
+    meta = get_document(document_id) or {"document_id": document_id,
+                                         "created_at": datetime.now().isoformat()}
+    meta.update(summary or {})
+    meta["status"] = "completed"
+    meta["chunk_count"] = len(chunk_ids)
+
+    if user_id is not None and filename:
+        docset_key = DOCSET_KEY.format(user_id=user_id, filename=filename)
+        redis_client.delete(docset_key)
+        if chunk_ids:
+            redis_client.sadd(docset_key, *chunk_ids)
+        latest_key = DOCSET_LATEST_KEY.format(user_id=user_id, filename=filename)
+        previous_id = redis_client.get(latest_key)
+        redis_client.set(latest_key, document_id)
+        if previous_id and previous_id != document_id:
+            previous = get_document(previous_id)
+            if previous:
+                previous["status"] = "superseded"
+                previous["superseded_by"] = document_id
+                _write_meta(previous)
+                invalidate_chunk_pages(previous_id)  # 빠진 청크가 삭제되어 이전 페이지 내용이 바뀜
+                meta["previous_version"] = previous_id
+    _write_meta(meta)
+    invalidate_chunk_pages(document_id)
+
+
+def mark_failed(document_id: str):
+    meta = get_document(document_id)
+    if meta and meta.get("status") not in ("completed", "superseded"):
+        meta["status"] = "failed"
+        _write_meta(meta)
+
+
+def list_documents(user_id: str = None, offset: int = 0, limit: int = 50) -> Dict:
+    """문서 목록 (최신순 페이지)"""
+    redis_client = get_redis()
+    index_key = USER_DOCS_KEY.format(user_id=user_id) if user_id is not None else ALL_DOCS_KEY
+    total = redis_client.zcard(index_key)
+    ids = redis_client.zrevrange(index_key, offset, offset + limit - 1) if limit > 0 else []
+    items = []
+    if ids:
+        for raw in redis_client.mget([DOC_KEY.format(document_id=i) for i in ids]):
+            if raw:
+                items.append(json.loads(raw))
+    return {"items": items, "page": {"offset": offset, "limit": limit, "total": total}}
+
+
+def list_chunks(document_id: str, offset: int = 0, limit: int = 50) -> Optional[Dict]:
+    """문서의 청크 목록 (순서대로 페이지), 문서가 없으면 None"""
+    document = get_document(document_id)
+    if document is None:
+        return None
+    redis_client = get_redis()
+    list_key = DOC_CHUNKS_KEY.format(document_id=document_id)
+    total = redis_client.llen(list_key)
+    ids = redis_client.lrange(list_key, offset, offset + limit - 1) if limit > 0 else []
+    items = []
+    if ids:
+        for raw in redis_client.mget([CHUNK_KEY.format(chunk_id=i) for i in ids]):
+            if raw:
+                items.append(json.loads(raw))
+    return {"document_id": document_id, "status": document["status"], "items": items,
+            "page": {"offset": offset, "limit": limit, "total": total}}
+
+
+def get_chunk(chunk_id: str) -> Optional[Dict]:
+    data = get_redis().get(CHUNK_KEY.format(chunk_id=chunk_id))
+    return json.loads(data) if data else None
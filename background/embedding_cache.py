@@ -0,0 +1,113 @@
+# 임베딩 캐시 (모델 + 청크 본문 해시 → 바이너리 벡터)
+#
+# 같은 본문(머리글, 법적 고지, 템플릿 문단 등)은 문서가 달라도 같은 벡터이므로
+# 임베딩 API 를 호출하기 전에 MGET 한 번으로 캐시를 조회하고, 없는 것만 생성해 저장합니다.
+#
+# Redis 키 (side store, 바이너리 클라이언트)
+#   emb:{model}:{dtype}:{content_hash}   리틀 엔디언 float16/float32 배열
+#   emb:lru                              LRU 순서 (sorted set, score = 마지막 사용 시각)
+# max_entries 를 넘으면 가장 오래 사용되지 않은 항목부터 삭제합니다.
+# 설정은 celeryconfig.embedding_cache 에서 합니다.
+
+import time
+import random
+import struct
+import logging
+from typing import Dict, Iterable, List
+
+from background.store import get_binary_redis
+
+logger = logging.getLogger(__name__)
+
+KEY = "emb:{model}:{dtype}:{content_hash}"
+LRU_KEY = "emb:lru"
+
+# dtype → struct 형식 문자 (float16 은 float32 의 절반 크기, 코사인 유사도에는 충분한 정밀도)
+FORMATS = {"float16": "e", "float32": "f"}
+
+
+def _conf() -> dict:
+    from background.celery import celery_app
+    return celery_app.conf.get("embedding_cache") or {}
+
+
+def model_name() -> str:
+    return _conf().get("model", "text-embedding-3-small")
+
+
+def _dtype() -> str:
+    return _conf().get("dtype", "float16")
+
+
+def cache_key(model: str, content_hash: str) -> str:
+    return KEY.format(model=model, dtype=_dtype(), content_hash=content_hash)
+
+
+def encode_vector(vector: List[float]) -> bytes:
+    return struct.pack(f"<{len(vector)}{FORMATS[_dtype()]}", *vector)
+
+
+def decode_vector(data: bytes) -> List[float]:
+    fmt = FORMATS[_dtype()]
+    return list(struct.unpack(f"<{len(data) // struct.calcsize(fmt)}{fmt}", data))
+
+
+def simulate_embedding(content_hash: str, dimensions: int = None) -> List[float]:
+    """임베딩 API 대역 - 본문 해시로 결정되는 단위 벡터 (실제로는 openai.embeddings.create)"""
+    dimensions = dimensions or int(_conf().get("dimensions", 1536))
+    rng = random.Random(content_hash)
+    vector = [rng.gauss(0.0, 1.0) for _ in range(dimensions)]
+    norm = sum(v * v for v in vector) ** 0.5 or 1.0
+    return [v / norm for v in vector]
+
+
+def get_many(model: str, hashes: Iterable[str]) -> Dict[str, bytes]:
+    """캐시 일괄 조회 (MGET 1회) - 찾은 항목만 {content_hash: 벡터 바이트} 로 반환, LRU 갱신"""
+    hashes = list(dict.fromkeys(hashes))
+    if not hashes:
+        return {}
+    redis_client = get_binary_redis()
+    keys = [cache_key(model, h) for h in hashes]
+    found = {h: value for h, value in zip(hashes, redis_client.mget(keys)) if value is not None}
+    if found:
+        now = time.time()
+        redis_client.zadd(LRU_KEY, {cache_key(model, h): now for h in found})
+    return found
+
+
+def put_many(model: str, vectors: Dict[str, List[float]]):
+    """생성한 벡터 일괄 저장 후 상한 초과분 LRU 삭제"""
+    if not vectors:
+        return
+    redis_client = get_binary_redis()
+    records = {cache_key(model, h): encode_vector(vector) for h, vector in vectors.items()}
+    redis_client.mset(records)
+    now = time.time()
+    redis_client.zadd(LRU_KEY, {key: now for key in records})
+    evict()
+
+
+def evict() -> int:
+    """max_entries 초과분을 가장 오래 사용되지 않은 순서로 삭제, 삭제 수 반환"""
+    redis_client = get_binary_redis()
+    excess = redis_client.zcard(LRU_KEY) - int(_conf().get("max_entries", 200000))
+    if excess <= 0:
+        return 0
+    victims = [member for member, _ in redis_client.zpopmin(LRU_KEY, excess)]
+    if victims:
+        redis_client.delete(*victims)
+        logger.info(f"[embedding_cache] LRU 삭제: {len(victims)}개")
+    return len(victims)
+
+
+def load_vectors(model: str, hashes: Iterable[str]) -> Dict[str, List[float]]:
+    """저장 단계용 - 캐시에서 벡터를 읽고, 그 사이 삭제된 항목은 다시 생성해 채움"""
+    hashes = list(dict.fromkeys(hashes))
+    vectors = {h: decode_vector(data) for h, data in get_many(model, hashes).items()}
+    missing = [h for h in hashes if h not in vectors]
+    if missing:
+        logger.warning(f"[embedding_cache] 캐시에서 빠진 벡터 {len(missing)}개 재생성")
+        regenerated = {h: simulate_embedding(h) for h in missing}
+        put_many(model, regenerated)
+        vectors.update(regenerated)
+    return vectors
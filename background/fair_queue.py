@@ -0,0 +1,232 @@
+# 사용자(user_id)별 공정 스케줄링 모듈
+#
+# - 사용자별 동시 실행 파이프라인 수 제한 (Redis 카운터 fair:inflight:{user_id})
+# - 제한을 넘는 요청은 사용자별 대기열(fair:pending:{user_id})에 보관
+# - 슬롯이 비면 사용자 라운드로빈(fair:tenants)으로 다음 작업을 배정 (가중치 = 한 차례 배정 수)
+# - 작은 업로드는 interactive 우선순위, 큰 업로드는 bulk 우선순위로 브로커에 발행
+# - 배치 수집(background/batch.py)의 파일도 같은 경로로 제출되어 같은 사용자 슬롯을 씁니다
+#
+# 파이프라인이 끝나거나 실패하면 finalize_pipeline 작업이 슬롯을 반환합니다.
+# 대기 작업 발행이 실패하면 그 작업은 사용자 대기열 맨 앞으로 되돌리고 슬롯을 반환합니다.
+# eager 실행에서 대기 작업의 파이프라인이 실패하면 (finalize_pipeline 이 이미 실패 기록/슬롯 반환) 기록만 합니다.
+
+import json
+import logging
+import uuid
+from typing import Dict, Optional
+
+from background import pipeline_spec
+
+logger = logging.getLogger(__name__)
+
+INFLIGHT_KEY = "fair:inflight:{user_id}"
+PENDING_KEY = "fair:pending:{user_id}"
+TENANT_RING_KEY = "fair:tenants"
+TENANT_SET_KEY = "fair:tenant_set"
+
+# 카운터 누수(워커 강제 종료 등) 대비 안전 TTL
+INFLIGHT_TTL = 3600
+
+
+def _redis():
+    from background.store import get_redis
+    return get_redis()
+
+
+def _conf():
+    from background.celery import celery_app
+    return celery_app.conf
+
+
+def max_inflight(user_id: str) -> int:
+    conf = _conf()
+    overrides = conf.get("fair_user_max_inflight") or {}
+    return int(overrides.get(user_id, conf.get("fair_max_inflight_per_user") or 4))
+
+
+def user_weight(user_id: str) -> int:
+    return max(int((_conf().get("fair_user_weights") or {}).get(user_id, 1)), 1)
+
+
+def lane_for(file_size: int) -> str:
+    """파일 크기로 우선순위 레인 결정"""
+    return "interactive" if file_size <= int(_conf().get("fair_interactive_max_bytes") or 0) else "bulk"
+
+
+def priority_for(lane: str) -> int:
+    return int((_conf().get("fair_lane_priorities") or {}).get(lane, 5))
+
+
+def _try_acquire(user_id: str) -> bool:
+    """사용자 슬롯 획득 시도 (INCR 후 초과 시 되돌림)"""
+    redis_client = _redis()
+    key = INFLIGHT_KEY.format(user_id=user_id)
+    current = redis_client.incr(key)
+    redis_client.expire(key, INFLIGHT_TTL)
+    if current > max_inflight(user_id):
+        redis_client.decr(key)
+        return False
+    return True
+
+
+def inflight(user_id: str) -> int:
+    return int(_redis().get(INFLIGHT_KEY.format(user_id=user_id)) or 0)
+
+
+def _dispatch(job: Dict):
+    from background.pipeline import process_document_pipeline_advanced
+    return process_document_pipeline_advanced(
+        job["file_path"],
+        user_id=job["user_id"],
+        priority=priority_for(job["lane"]),
+        chain_id=job["chain_id"],
+        blob_sha256=job.get("blob_sha256"),
+        filename=job.get("filename"),
+        fair_slot=True,
+        mode=job.get("mode"),
+        batch_id=job.get("batch_id"),
+        batch_index=job.get("batch_index"),
+    )
+
+
+def _finalized(job: Dict) -> bool:
+    """발행된 뒤 실패해 finalize_pipeline 이 이미 실행된 작업인지 (eager 실행에서 실패가 발행한 쪽으로 올라옴)"""
+    from background import documents
+    document = documents.get_document(job["chain_id"])
+    return bool(document) and document.get("status") == "failed"
+
+
+def submit(user_id: str, file_path: str, file_size: int, blob_sha256: str = None,
+           filename: str = None, chain_id: str = None, lane: str = None,
+           batch_id: str = None, batch_index: int = None) -> Dict:
+    """파이프라인 제출 - 슬롯이 있으면 즉시 발행, 없으면 사용자 대기열에 보관
+
+    배치 파일은 batch_id/batch_index 와 미리 발급한 chain_id, bulk 레인으로 제출합니다.
+    """
+    from background.store import DocumentProcessor
+
+    job = {
+        "chain_id": chain_id or str(uuid.uuid4()),
+        "user_id": user_id,
+        "file_path": file_path,
+        "file_size": file_size,
+        "lane": lane or lane_for(file_size),
+        "mode": pipeline_spec.execution_mode(file_size),
+        "blob_sha256": blob_sha256,
+        "filename": filename,
+    }
+    if batch_id:
+        job.update(batch_id=batch_id, batch_index=batch_index)
+
+    # 같은 사용자의 대기 작업이 있으면 순서 유지를 위해 뒤에 줄을 섭니다
+    if not pending_count(user_id) and _try_acquire(user_id):
+        try:
+            _dispatch(job)
+        except Exception:
+            if not _finalized(job):
+                _redis().decr(INFLIGHT_KEY.format(user_id=user_id))  # 발행 실패 - 잡은 슬롯 반환
+            raise
+        return {**job, "status": "dispatched"}
+
+    redis_client = _redis()
+    position = redis_client.rpush(PENDING_KEY.format(user_id=user_id), json.dumps(job))
+    if redis_client.sadd(TENANT_SET_KEY, user_id):
+        redis_client.rpush(TENANT_RING_KEY, user_id)
+
+    DocumentProcessor.save_progress(job["chain_id"], "대기열", {
+        "file_path": file_path,
+        "pipeline_id": job["chain_id"],
+        "queue_position": position,
+        "lane": job["lane"],
+    }, 0)
+    logger.info(f"[fair] {user_id} 동시 실행 한도 도달 - 대기열 {position}번째: {job['chain_id']}")
+
+    # 슬롯 확인과 대기열 추가 사이에 release 가 빈 대기열을 보고 지나갔을 수 있음 - 다시 배정
+    if inflight(user_id) < max_inflight(user_id):
+        dispatch_pending()
+    return {**job, "status": "queued", "queue_position": position}
+
+
+def release(user_id: str) -> int:
+    """슬롯 반환 후 대기 중인 작업 배정, 새로 발행한 작업 수 반환"""
+    redis_client = _redis()
+    key = INFLIGHT_KEY.format(user_id=user_id)
+    if redis_client.decr(key) < 0:
+        redis_client.set(key, 0)
+    return dispatch_pending()
+
+
+def dispatch_pending(limit: Optional[int] = None) -> int:
+    """사용자 라운드로빈으로 대기 작업 배정
+
+    한 차례에 사용자별 가중치만큼 배정하고, 한 바퀴 동안 아무것도 배정하지 못하면 멈춥니다.
+    발행하지 못한 작업은 대기열 맨 앞으로 되돌리고 다음 사용자로 넘어갑니다.
+    작업 하나의 실행 실패(eager)는 기록만 하고 호출한 쪽(release)으로 올리지 않습니다.
+    """
+    redis_client = _redis()
+    dispatched = 0
+    idle_turns = 0
+
+    while limit is None or dispatched < limit:
+        ring_size = redis_client.llen(TENANT_RING_KEY)
+        if not ring_size or idle_turns >= ring_size:
+            break
+
+        user_id = redis_client.lpop(TENANT_RING_KEY)
+        if user_id is None:
+            break
+        pending_key = PENDING_KEY.format(user_id=user_id)
+
+        served = 0
+        try:
+            for _ in range(user_weight(user_id)):
+                if limit is not None and dispatched >= limit:
+                    break
+                if not _try_acquire(user_id):
+                    break
+                raw = redis_client.lpop(pending_key)
+                if raw is None:
+                    redis_client.decr(INFLIGHT_KEY.format(user_id=user_id))
+                    break
+                if not _dispatch_pending_job(user_id, raw):
+                    break
+                served += 1
+                dispatched += 1
+        finally:
+            # 링에서 꺼낸 사용자는 배정 중 예외가 나도 반드시 되돌림 (집합에만 남으면 다시 배정되지 않음)
+            if redis_client.llen(pending_key):
+                redis_client.rpush(TENANT_RING_KEY, user_id)
+            else:
+                redis_client.srem(TENANT_SET_KEY, user_id)
+                # srem 직전에 제출된 작업이 링에서 누락되지 않도록 재확인
+                if redis_client.llen(pending_key) and redis_client.sadd(TENANT_SET_KEY, user_id):
+                    redis_client.rpush(TENANT_RING_KEY, user_id)
+
+        idle_turns = 0 if served else idle_turns + 1
+
+    return dispatched
+
+
+def _dispatch_pending_job(user_id: str, raw: str) -> bool:
+    """슬롯을 잡은 대기 작업 발행 - 발행하지 못했으면 대기열 맨 앞으로 되돌리고 슬롯 반환 후 False
+
+    실행된 뒤 실패한 작업은 배정한 것으로 셉니다.
+    """
+    job = json.loads(raw)
+    try:
+        _dispatch(job)
+    except Exception as e:
+        if _finalized(job):
+            # 파이프라인이 실행되어 실패 (eager) - finalize_pipeline 이 실패 기록/슬롯 반환을 마침
+            logger.error(f"[fair] {user_id} 파이프라인 실패: {job['chain_id']} ({e})")
+            return True
+        redis_client = _redis()
+        redis_client.lpush(PENDING_KEY.format(user_id=user_id), raw)
+        redis_client.decr(INFLIGHT_KEY.format(user_id=user_id))
+        logger.error(f"[fair] {user_id} 작업 발행 실패 - 대기열로 되돌림: {job['chain_id']} ({e})")
+        return False
+    return True
+
+
+def pending_count(user_id: str) -> int:
+    return _redis().llen(PENDING_KEY.format(user_id=user_id))
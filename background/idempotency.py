@@ -0,0 +1,137 @@
+# 멱등 실행 (중복 실행/재전달 시 부수 효과를 한 번만 남기기)
+#
+# 재시도나 브로커 재전달로 같은 작업이 다시 실행되면 알림, 이메일 발송, 참조 반환 같은
+# 부수 효과가 반복됩니다. 여기서는 Redis SET NX 원장으로 "이미 처리한 키"를 기록합니다.
+#
+# Redis 키 (side store)
+#   idem:lock:{task}:{key}   실행 중 표시 (값 = 실행 중인 task_id, lock_ttl 후 자동 해제)
+#   idem:done:{task}:{key}   완료 결과 (JSON, result_ttl 동안 보관 - 이후 재전달은 결과만 반환)
+#   idem:once:{scope}:{key}  작업 안의 개별 부수 효과 (claim() - 처음 한 번만 True)
+#
+# 같은 키가 실행 중(잠금이 있음)이면 건너뛰지 않고 잠금이 풀릴 즈음 다시 시도합니다 (retry countdown).
+# 실행하던 워커가 죽어 같은 task_id 로 재전달된 경우에도 잠금 TTL 이 지나면 다시 실행되고,
+# 실제로 건너뛰는 것은 완료 기록(idem:done)이 있는 경우뿐입니다. eager 실행은 같은 프로세스에서 기다립니다.
+#
+# 멱등 키는 발행 시 헤더로 지정하거나 (apply_async(headers={"idempotency_key": ...})),
+# 지정하지 않으면 task_id 를 사용합니다 (재시도/재전달은 같은 task_id).
+# 인자만으로 작업이 정해지는 경우 idempotency_from_args=True 로 인자 해시를 키로 씁니다.
+# 설정은 celeryconfig.idempotency 에서 합니다.
+
+import json
+import time
+import hashlib
+import logging
+
+from celery import Task
+
+from background.metrics import IDEMPOTENT_SKIPS_TOTAL
+
+logger = logging.getLogger(__name__)
+
+LOCK_KEY = "idem:lock:{task}:{key}"
+DONE_KEY = "idem:done:{task}:{key}"
+ONCE_KEY = "idem:once:{scope}:{key}"
+
+
+def _redis():
+    from background.store import get_redis  # store 가 이 모듈을 임포트하므로 지연 임포트
+    return get_redis()
+
+
+def _conf() -> dict:
+    from background.celery import celery_app
+    return celery_app.conf.get("idempotency") or {}
+
+
+def derive_key(*parts) -> str:
+    """인자로 멱등 키 생성 (순서가 다른 같은 kwargs 는 같은 키)"""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def claim(scope: str, key: str, ttl: int = None) -> bool:
+    """부수 효과 하나를 처음 수행하는 경우에만 True (SET NX)"""
+    ttl = ttl or int(_conf().get("once_ttl", 86400))
+    if _redis().set(ONCE_KEY.format(scope=scope, key=key), "1", ex=ttl, nx=True):
+        return True
+    IDEMPOTENT_SKIPS_TOTAL.labels(task=scope, reason="duplicate_effect").inc()
+    return False
+
+
+def release(scope: str, key: str):
+    """부수 효과가 실패한 경우 기록 취소 (다음 실행에서 다시 수행)"""
+    _redis().delete(ONCE_KEY.format(scope=scope, key=key))
+
+
+class IdempotentTask(Task):
+    """같은 멱등 키의 작업은 한 번만 실행하고, 다시 오면 기록된 결과를 반환하는 기본 작업 클래스
+
+    @celery_app.task(base=IdempotentTask) 로 사용합니다. 결과는 JSON 으로 직렬화 가능해야 합니다.
+    """
+
+    idempotency_key_header = "idempotency_key"
+    idempotency_from_args = False
+
+    def idempotency_key(self, args, kwargs) -> str:
+        request = self.request
+        supplied = getattr(request, self.idempotency_key_header, None) \
+            or (request.headers or {}).get(self.idempotency_key_header)
+        if supplied:
+            return supplied
+        return derive_key(list(args), kwargs) if self.idempotency_from_args else request.id
+
+    def __call__(self, *args, **kwargs):
+        if self.request.called_directly:
+            return super().__call__(*args, **kwargs)
+
+        conf = _conf()
+        key = self.idempotency_key(args, kwargs)
+        lock_key = LOCK_KEY.format(task=self.name, key=key)
+        done_key = DONE_KEY.format(task=self.name, key=key)
+        redis_client = _redis()
+
+        committed = redis_client.get(done_key)
+        if committed is not None:
+            IDEMPOTENT_SKIPS_TOTAL.labels(task=self.name, reason="committed").inc()
+            logger.info(f"[idempotency] {self.name} 이미 완료된 키 - 기록된 결과 반환 ({key[:12]})")
+            return json.loads(committed)
+
+        lock_ttl = int(conf.get("lock_ttl") or self.time_limit or 3600)
+        if not redis_client.set(lock_key, self.request.id, ex=lock_ttl, nx=True):
+            IDEMPOTENT_SKIPS_TOTAL.labels(task=self.name, reason="in_progress").inc()
+            if not self.request.is_eager:
+                # 실행 중인 작업이 끝나면 완료 기록을, 죽었으면 잠금 TTL 만료 후 잠금을 얻음
+                countdown = max(1, min(int(conf.get("contention_countdown", 30)), redis_client.ttl(lock_key)))
+                logger.info(f"[idempotency] {self.name} 같은 키 실행 중 - {countdown}초 후 재시도 ({key[:12]})")
+                raise self.retry(countdown=countdown, max_retries=self.request.retries + 1)
+            committed = self._wait_for_lock(redis_client, lock_key, done_key, lock_ttl)
+            if committed is not None:
+                return json.loads(committed)
+
+        try:
+            result = super().__call__(*args, **kwargs)
+        except BaseException:
+            # 재시도/실패 - 다음 실행이 다시 잡을 수 있도록 내 잠금만 해제
+            if redis_client.get(lock_key) == self.request.id:
+                redis_client.delete(lock_key)
+            raise
+
+        # 결과 기록 + 잠금 해제를 한 트랜잭션으로 (중간에 죽으면 잠금 TTL 후 재실행 가능)
+        pipe = redis_client.pipeline()
+        pipe.set(done_key, json.dumps(result, ensure_ascii=False, default=str),
+                 ex=int(conf.get("result_ttl", 86400)))
+        pipe.delete(lock_key)
+        pipe.execute()
+        return result
+
+    def _wait_for_lock(self, redis_client, lock_key: str, done_key: str, lock_ttl: int):
+        """eager 실행 - 같은 프로세스의 다른 스레드가 끝낼 때까지 대기, 완료 기록이 생기면 그 값을 반환"""
+        deadline = time.monotonic() + lock_ttl
+        while time.monotonic() < deadline:
+            time.sleep(0.01)
+            committed = redis_client.get(done_key)
+            if committed is not None:
+                return committed
+            if redis_client.set(lock_key, self.request.id, ex=lock_ttl, nx=True):
+                return None
+        raise TimeoutError(f"{self.name} 멱등 잠금 대기 시간 초과: {lock_key}")
@@ -0,0 +1,39 @@
+# 로컬 실행 모드 (외부 Redis / 워커 없이 한 프로세스에서 API → 파이프라인 전체 실행)
+#
+# - Celery: 인메모리 브로커 + eager 실행 (발행한 작업이 발행한 스레드에서 바로 실행되고 결과는 캐시 백엔드에 저장)
+# - side store(db2): background/memory_store.py 의 InMemoryRedis (진행률, 중간 결과, 알림, 임베딩 캐시, 공정 스케줄링 카운터)
+# - 시뮬레이션 sleep: background/clock.py 배율 (0 이면 대기 없음)
+#
+# LOCAL_MODE=1 이면 background.celery 임포트 시 자동으로 켜집니다.
+#   LOCAL_MODE=1 SIMULATION_TIME_SCALE=0 uvicorn main:app
+# 테스트/벤치마크에서는 enable(celery_app, time_scale=0) 을 직접 호출해도 됩니다.
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+CELERY_SETTINGS = {
+    "broker_url": "memory://",
+    "result_backend": "cache+memory://",
+    "task_always_eager": True,
+    "task_eager_propagates": False,  # 실패해도 link_error(finalize_pipeline) 가 워커처럼 실행되도록
+    "task_store_eager_result": True,  # 상태 조회 API 가 AsyncResult 로 결과를 읽을 수 있도록
+}
+
+
+def enable(app, time_scale: float = None, redis_client=None):
+    """로컬 실행 모드로 전환하고 사용 중인 인메모리 저장소를 반환"""
+    from background import clock, store
+    from background.memory_store import InMemoryRedis
+    from background.metrics import InstrumentedRedis
+
+    # 브로커 적체는 eager 모드에서 항상 0 - 조회하지 않음
+    admission = dict(app.conf.get("admission") or {}, max_queue_depth=None)
+    app.conf.update(CELERY_SETTINGS, local_mode=True, admission=admission)
+
+    redis_client = redis_client or InMemoryRedis()
+    store.set_redis(InstrumentedRedis(redis_client))
+    if time_scale is not None:
+        clock.set_scale(time_scale)
+    logger.info(f"로컬 실행 모드 - eager 작업 + 인메모리 저장소 (시뮬레이션 시간 배율 {clock.scale()})")
+    return redis_client
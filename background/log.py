@@ -0,0 +1,191 @@
+# 구조화(JSON) 로깅 설정
+#
+# - 로그 호출은 레코드를 큐에 넣기만 하고, 포맷/출력은 QueueListener 스레드가 처리 (호출 측 비차단)
+# - 작업 컨텍스트(task_id, root_id, task_name, stage)를 contextvars 로 보관해 모든 레코드에 자동 첨부
+# - 루프 반복 로그는 sampled() 로 첫/마지막/N번째 반복만 남김
+#
+# web 은 main.py 에서 configure() 를 호출하고, 워커는 Celery setup_logging 시그널로 설정됩니다.
+# 환경 변수: LOG_FORMAT (json | text, 기본 json), LOG_LEVEL (기본 INFO), LOG_SAMPLE_EVERY (기본 10)
+
+import os
+import sys
+import json
+import queue
+import atexit
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from celery.signals import setup_logging, task_prerun, task_postrun, worker_process_init
+
+CONTEXT_FIELDS = ("task_id", "root_id", "task_name", "stage")
+
+# 표준 LogRecord 속성 - 이 외의 속성(extra=...)은 JSON 필드로 출력
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+_context: ContextVar[dict] = ContextVar("log_context", default={})
+_task_tokens = {}
+_listener = None
+_configured_pid = None
+
+
+# ===== 컨텍스트 =====
+
+def get_context() -> dict:
+    return _context.get()
+
+
+@contextmanager
+def bind(**fields):
+    """블록 안에서 남기는 로그에 필드 추가 (예: bind(stage="임베딩_생성"))"""
+    token = _context.set({**_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    """호출 스레드에서 현재 컨텍스트를 레코드에 복사 (큐로 넘어간 뒤에는 컨텍스트가 없으므로)"""
+
+    def filter(self, record):
+        for key, value in _context.get().items():
+            if not hasattr(record, key):
+                setattr(record, key, value)
+        return True
+
+
+@task_prerun.connect
+def _bind_task_context(task_id=None, task=None, **kwargs):
+    request = task.request
+    token = _context.set({
+        **_context.get(),
+        "task_id": task_id,
+        "root_id": request.root_id or task_id,
+        "task_name": task.name,
+    })
+    _task_tokens.setdefault(task_id, []).append(token)
+
+
+@task_postrun.connect
+def _reset_task_context(task_id=None, **kwargs):
+    tokens = _task_tokens.get(task_id)
+    if not tokens:
+        return
+    token = tokens.pop()
+    if not tokens:
+        del _task_tokens[task_id]
+    try:
+        _context.reset(token)
+    except ValueError:
+        # 다른 컨텍스트에서 만들어진 토큰 (eager 중첩 실행 등) - 작업 필드만 비움
+        _context.set({k: v for k, v in _context.get().items() if k not in CONTEXT_FIELDS})
+
+
+# ===== 샘플링 =====
+
+def sample_every() -> int:
+    return max(int(os.environ.get("LOG_SAMPLE_EVERY", "10")), 1)
+
+
+def sampled(index: int, total: int = None, every: int = None) -> bool:
+    """루프 반복 로그 샘플링 - 첫 반복, 마지막 반복, every 번째 반복만 True
+
+    호출 측에서 `if sampled(i, total): logger.debug(...)` 로 감싸면
+    샘플링되지 않은 반복은 메시지 포맷 비용도 들지 않습니다.
+    """
+    every = every or sample_every()
+    return index == 0 or (total is not None and index == total - 1) or (index + 1) % every == 0
+
+
+# ===== 포맷 / 핸들러 =====
+
+class JsonFormatter(logging.Formatter):
+    """한 줄 JSON 로그 (ts, level, logger, message + 컨텍스트/extra 필드)"""
+
+    def format(self, record):
+        payload = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """로컬 개발용 텍스트 포맷 (컨텍스트 필드를 접두어로 표시)"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s %(context)s%(message)s")
+
+    def format(self, record):
+        fields = [f"{key}={getattr(record, key)}" for key in ("task_id", "stage") if getattr(record, key, None)]
+        record.context = f"[{' '.join(fields)}] " if fields else ""
+        return super().format(record)
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """같은 프로세스 안의 큐이므로 레코드를 그대로 넘기고 메시지 포맷은 리스너 스레드에서 수행"""
+
+    def prepare(self, record):
+        return record
+
+
+def configure(level: str = None, fmt: str = None, force: bool = False):
+    """루트 로거를 큐 핸들러로 설정 (프로세스당 한 번, fork 된 자식은 force 로 재설정)"""
+    global _listener, _configured_pid
+    if _configured_pid == os.getpid() and not force:
+        return
+
+    level = (level or os.environ.get("LOG_LEVEL", "INFO")).upper()
+    fmt = fmt or os.environ.get("LOG_FORMAT", "json")
+
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+
+    records = queue.SimpleQueue()
+    handler = _DeferredQueueHandler(records)
+    handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    # fork 이전 부모의 리스너 스레드는 자식에 없으므로 새로 시작
+    if _listener is not None and _configured_pid == os.getpid():
+        _listener.stop()
+    _listener = QueueListener(records, output, respect_handler_level=False)
+    _listener.start()
+    _configured_pid = os.getpid()
+
+
+def shutdown():
+    """남은 레코드를 모두 출력하고 리스너 종료"""
+    global _listener
+    if _listener is not None and _configured_pid == os.getpid():
+        _listener.stop()
+    _listener = None
+
+
+atexit.register(shutdown)
+
+
+@setup_logging.connect
+def _setup_worker_logging(loglevel=None, **kwargs):
+    # 이 시그널에 연결하면 Celery 는 루트 로거를 직접 설정하지 않습니다
+    configure(level=logging.getLevelName(loglevel) if isinstance(loglevel, int) else loglevel)
+
+
+@worker_process_init.connect
+def _setup_child_logging(**kwargs):
+    configure(force=True)
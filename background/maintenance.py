@@ -0,0 +1,420 @@
+# 주기 정리 / 압축 / 예열 (celery beat 가 background/task/maintenance_tasks.py 작업을 발행)
+#
+# 업로드 파일과 side store 키는 정상 경로에서는 참조 반환과 TTL 로 정리됩니다. 하지만 작업이 중간에 죽거나
+# 정책이 바뀌기 전에 쓰인 항목은 누가 지우기 전까지 계속 남습니다. 여기서는 그런 항목을 SCAN 으로
+# batch 개씩 조회해 정리하고, 회수한 바이트와 처리 항목 수를 메트릭으로 남깁니다.
+#
+#   sweep_uploads        참조 카운트가 없는 업로드 파일, 오래된 임시 파일(.upload-*), 빈 샤드 디렉토리
+#   sweep_keys           만료 없이 남은 중간 결과, 만료 없이 남은/길어진 알림 목록, 0 이하 참조 카운트
+#   compact_index        고아 청크, 삭제/오래된 superseded 문서의 청크 목록, 문서 인덱스와 임베딩 캐시 LRU 의 빈 항목
+#   prewarm_embeddings   여러 문서에 반복되는 본문(머리글, 고지문, 템플릿 문단)의 임베딩을 캐시에 채우고 LRU 갱신
+#
+# 설정은 celeryconfig.maintenance, 실행 주기는 celeryconfig.beat_schedule 에서 합니다.
+
+import os
+import re
+import json
+import time
+import logging
+from collections import Counter, defaultdict
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+from background import documents, embedding_cache, retention, storage
+from background.metrics import MAINTENANCE_ITEMS_TOTAL, MAINTENANCE_RECLAIMED_BYTES
+from background.read_cache import get_cache
+from background.store import get_binary_redis, get_redis
+
+logger = logging.getLogger(__name__)
+
+BLOB_NAME = re.compile(r"^[0-9a-f]{64}$")
+TEMP_PREFIX = ".upload-"  # storage.store_upload 의 임시 파일
+
+# 이 상태의 문서가 가리키는 청크는 같은 파일의 현재 색인(docset)에 없으면 고아
+LIVE_STATUSES = ("processing", "completed")
+
+
+def _conf() -> dict:
+    from background.celery import celery_app
+    return celery_app.conf.get("maintenance") or {}
+
+
+def _batch_size() -> int:
+    return int(_conf().get("scan_batch", 500))
+
+
+def _text(value) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def _report(task: str, target: str, stats: Dict) -> Dict:
+    """회수 바이트/항목 수 메트릭 기록 (scanned 는 제외)"""
+    if stats.get("bytes"):
+        MAINTENANCE_RECLAIMED_BYTES.labels(task=task, target=target).inc(stats["bytes"])
+    for action, count in stats.items():
+        if action not in ("scanned", "bytes") and count:
+            MAINTENANCE_ITEMS_TOTAL.labels(task=task, action=action).inc(count)
+    logger.info(f"[maintenance] {task}: {stats}")
+    return stats
+
+
+def scan_batches(client, match: str, batch: int = None) -> Iterator[List[str]]:
+    """SCAN 으로 패턴에 맞는 키를 batch 개씩 묶어 반환 (KEYS 처럼 서버를 막지 않음, 도중 삭제해도 안전)"""
+    batch = batch or _batch_size()
+    keys = []
+    for raw in client.scan_iter(match=match, count=batch):
+        keys.append(_text(raw))
+        if len(keys) >= batch:
+            yield keys
+            keys = []
+    if keys:
+        yield keys
+
+
+def _usage(client, keys) -> List[int]:
+    pipe = client.pipeline(transaction=False)
+    for key in keys:
+        pipe.memory_usage(key, samples=0)
+    return [usage or 0 for usage in pipe.execute()]
+
+
+def _delete(client, keys, stats: Dict, action: str = "deleted"):
+    """키 삭제 + 삭제 전 MEMORY USAGE 합계를 회수 바이트로 기록"""
+    if not keys:
+        return
+    stats["bytes"] += sum(_usage(client, keys))
+    client.delete(*keys)
+    stats[action] = stats.get(action, 0) + len(keys)
+
+
+# ===== 업로드 파일 =====
+
+def _remove_file(path: str, cutoff: float) -> Optional[int]:
+    """유예 기간이 지난 파일이면 삭제하고 크기 반환 (그 사이 갱신/삭제됐으면 None)"""
+    try:
+        stat = os.stat(path)
+        if stat.st_mtime > cutoff:
+            return None
+        os.unlink(path)
+        return stat.st_size
+    except FileNotFoundError:
+        return None
+
+
+def _sweep_blob_batch(candidates: List, cutoff: float, stats: Dict):
+    keys = [storage.REFS_KEY.format(sha256=sha256) for sha256, _ in candidates]
+    redis_client = get_redis()
+    for (sha256, path), refs in zip(candidates, redis_client.mget(keys)):
+        if refs is not None and int(refs) > 0:
+            continue
+        # 삭제 직전 blob 잠금 안에서 참조와 mtime 재확인 - 같은 내용이 다시 올라오면 store_upload 가 갱신
+        with storage.blob_guard(sha256):
+            refs = redis_client.get(storage.REFS_KEY.format(sha256=sha256))
+            size = _remove_file(path, cutoff) if refs is None or int(refs) <= 0 else None
+        if size is not None:
+            stats["deleted"] += 1
+            stats["bytes"] += size
+    candidates.clear()
+
+
+def sweep_uploads(grace_seconds: int = None, now: float = None) -> Dict:
+    """참조 카운트가 없는 업로드 파일 / 오래된 임시 파일 / 빈 샤드 디렉토리 삭제
+
+    유예 기간(upload_grace_seconds)보다 오래 변경되지 않은 항목만 대상으로 해서
+    저장 직후 참조를 잡기 전인 업로드는 건드리지 않습니다.
+    """
+    if grace_seconds is None:
+        grace_seconds = int(_conf().get("upload_grace_seconds", 3600))
+    cutoff = (now or time.time()) - grace_seconds
+    root = storage.storage_dir()
+    stats = {"scanned": 0, "deleted": 0, "temp_deleted": 0, "dirs_removed": 0, "bytes": 0}
+    if not os.path.isdir(root):
+        return _report("sweep_uploads", "disk", stats)
+
+    batch = _batch_size()
+    candidates = []
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            if name.startswith(TEMP_PREFIX):
+                size = _remove_file(path, cutoff)  # 저장 중 죽은 업로드의 임시 파일
+                if size is not None:
+                    stats["temp_deleted"] += 1
+                    stats["bytes"] += size
+            elif BLOB_NAME.match(name):
+                stats["scanned"] += 1
+                candidates.append((name, path))
+                if len(candidates) >= batch:
+                    _sweep_blob_batch(candidates, cutoff, stats)
+    if candidates:
+        _sweep_blob_batch(candidates, cutoff, stats)
+
+    # 빈 샤드 디렉토리 (안쪽부터, 최근에 만들어졌거나 비워진 디렉토리는 다음 실행에서)
+    for dirpath, _, _ in os.walk(root, topdown=False):
+        if os.path.samefile(dirpath, root):
+            continue
+        try:
+            if not os.listdir(dirpath) and os.stat(dirpath).st_mtime <= cutoff:
+                os.rmdir(dirpath)
+                stats["dirs_removed"] += 1
+        except OSError:
+            pass  # 그 사이 파일이 생겼거나 이미 삭제됨
+    return _report("sweep_uploads", "disk", stats)
+
+
+# ===== side store 키 =====
+
+def _sweep_intermediate(client, batch: int) -> Dict:
+    """만료 없이 남은 중간 결과 삭제
+
+    TTL 이 있는 중간 결과는 만료에 맡깁니다. 진행률 기록이 먼저 만료돼도 재시도/재개 중인 작업은
+    중간 결과를 다시 읽으므로 진행률 유무로는 지우지 않습니다.
+    """
+    stats = {"scanned": 0, "deleted": 0, "bytes": 0}
+    for keys in scan_batches(client, "intermediate:*", batch):
+        stats["scanned"] += len(keys)
+        pipe = client.pipeline(transaction=False)
+        for key in keys:
+            pipe.ttl(key)
+        orphans = [key for key, key_ttl in zip(keys, pipe.execute()) if key_ttl == -1]
+        _delete(client, orphans, stats)
+    return stats
+
+
+def _newest_timestamp(items) -> Optional[float]:
+    try:
+        return datetime.fromisoformat(json.loads(items[0])["timestamp"]).timestamp()
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+def _sweep_notifications(client, batch: int, now: float) -> Dict:
+    """만료 없이 남은 알림 목록은 마지막 알림 기준으로 삭제/만료 지정, max_items 를 넘는 목록은 자름"""
+    ttl = retention.ttl("notifications", 86400)
+    max_items = int(retention.policy("notifications").get("max_items", 100))
+    stats = {"scanned": 0, "deleted": 0, "expired": 0, "trimmed": 0, "bytes": 0}
+    for keys in scan_batches(client, "notifications:*", batch):
+        stats["scanned"] += len(keys)
+        pipe = client.pipeline(transaction=False)
+        for key in keys:
+            pipe.ttl(key)
+            pipe.llen(key)
+            pipe.lrange(key, 0, 0)
+        values = pipe.execute()
+
+        stale, expire, trim = [], [], []
+        for key, key_ttl, length, newest in zip(keys, values[0::3], values[1::3], values[2::3]):
+            if key_ttl == -1:
+                newest_at = _newest_timestamp(newest)
+                age = now - newest_at if newest_at is not None else 0
+                if age >= ttl:
+                    stale.append(key)
+                    continue
+                expire.append((key, int(ttl - age)))
+            if length > max_items:
+                trim.append(key)
+
+        _delete(client, stale, stats)
+        if expire:
+            pipe = client.pipeline(transaction=False)
+            for key, seconds in expire:
+                pipe.expire(key, max(seconds, 1))
+            pipe.execute()
+            stats["expired"] += len(expire)
+        if trim:
+            before = _usage(client, trim)
+            pipe = client.pipeline(transaction=False)
+            for key in trim:
+                pipe.ltrim(key, 0, max_items - 1)
+            pipe.execute()
+            stats["bytes"] += max(sum(before) - sum(_usage(client, trim)), 0)
+            stats["trimmed"] += len(trim)
+    return stats
+
+
+def _sweep_blob_refs(client, batch: int) -> Dict:
+    """0 이하로 남은 업로드 참조 카운트 삭제 (release 도중 죽었거나 중복 반환된 경우)"""
+    stats = {"scanned": 0, "deleted": 0, "bytes": 0}
+    for keys in scan_batches(client, storage.REFS_KEY.format(sha256="*"), batch):
+        stats["scanned"] += len(keys)
+        orphans = [key for key, refs in zip(keys, client.mget(keys)) if refs is not None and int(refs) <= 0]
+        for key, usage in zip(orphans, _usage(client, orphans)):
+            if storage.drop_empty_refs(key):  # 그 사이 참조가 다시 잡혔으면 남김
+                stats["deleted"] += 1
+                stats["bytes"] += usage
+    return stats
+
+
+def sweep_keys(now: float = None) -> Dict:
+    """side store 의 고아 키 정리 - 키 패밀리별 결과 반환"""
+    client = get_redis()
+    batch = _batch_size()
+    now = now or time.time()
+    return {
+        "intermediate": _report("sweep_intermediate", "redis", _sweep_intermediate(client, batch)),
+        "notifications": _report("sweep_notifications", "redis", _sweep_notifications(client, batch, now)),
+        "blob_refs": _report("sweep_blob_refs", "redis", _sweep_blob_refs(client, batch)),
+    }
+
+
+# ===== 색인 압축 =====
+
+def _documents(client, document_ids) -> Dict[str, Optional[Dict]]:
+    document_ids = list(dict.fromkeys(document_ids))
+    if not document_ids:
+        return {}
+    raw = client.mget([documents.DOC_KEY.format(document_id=i) for i in document_ids])
+    return {i: json.loads(value) if value else None for i, value in zip(document_ids, raw)}
+
+
+def _compact_chunks(client, batch: int, stats: Dict):
+    """문서가 없어졌거나 실패/superseded 문서에만 남은 청크 삭제
+
+    같은 파일의 재업로드는 청크를 공유하므로 현재 색인 집합(docset)에 있는 청크는 남깁니다.
+    """
+    for keys in scan_batches(client, documents.CHUNK_KEY.format(chunk_id="*"), batch):
+        stats["scanned"] += len(keys)
+        chunks = {key: json.loads(raw) for key, raw in zip(keys, client.mget(keys)) if raw}
+        metas = _documents(client, [chunk.get("document_id") for chunk in chunks.values()])
+
+        suspects = []
+        for key, chunk in chunks.items():
+            meta = metas.get(chunk.get("document_id"))
+            if meta is None:
+                suspects.append((key, None))
+            elif meta.get("status") not in LIVE_STATUSES:
+                docset = None
+                if meta.get("user_id") is not None and meta.get("filename"):
+                    docset = documents.DOCSET_KEY.format(user_id=meta["user_id"], filename=meta["filename"])
+                suspects.append((key, docset))
+
+        pipe = client.pipeline(transaction=False)
+        for key, docset in suspects:
+            if docset:
+                pipe.sismember(docset, key.split(":", 1)[1])
+        indexed = iter(pipe.execute())
+        orphans = [key for key, docset in suspects if not (docset and next(indexed))]
+        _delete(client, orphans, stats, action="chunks_deleted")
+        get_cache().invalidate_many("chunk", [key.split(":", 1)[1] for key in orphans])
+
+
+def _compact_chunk_lists(client, batch: int, now: float, stats: Dict):
+    """문서가 없어졌거나 superseded 된 지 오래된 문서의 청크 ID 목록 삭제 (메타데이터/버전 이력은 유지)"""
+    retention_seconds = int(_conf().get("superseded_retention_seconds", 7 * 86400))
+    for keys in scan_batches(client, documents.DOC_CHUNKS_KEY.format(document_id="*"), batch):
+        stats["scanned"] += len(keys)
+        metas = _documents(client, [key.split(":")[1] for key in keys])
+        orphans = []
+        for key in keys:
+            meta = metas.get(key.split(":")[1])
+            if meta is None:
+                orphans.append(key)
+            elif meta.get("status") == "superseded":
+                updated_at = datetime.fromisoformat(meta["updated_at"]).timestamp() if meta.get("updated_at") else 0
+                if now - updated_at >= retention_seconds:
+                    orphans.append(key)
+        _delete(client, orphans, stats, action="chunk_lists_deleted")
+        for key in orphans:
+            documents.invalidate_chunk_pages(key.split(":")[1])
+
+
+def _prune_sorted_set(client, key: str, batch: int, is_dangling) -> int:
+    """정렬 집합을 batch 개씩 훑어 is_dangling(members) 가 고른 항목 제거, 제거 수 반환"""
+    dangling = []
+    start = 0
+    while True:
+        members = client.zrevrange(key, start, start + batch - 1)
+        if not members:
+            break
+        dangling.extend(is_dangling(members))
+        start += batch
+    for offset in range(0, len(dangling), batch):
+        client.zrem(key, *dangling[offset:offset + batch])
+    return len(dangling)
+
+
+def _compact_sorted_sets(client, keys: List[str], batch: int, is_dangling, stats: Dict, action: str):
+    for key in keys:
+        before = _usage(client, [key])[0]
+        removed = _prune_sorted_set(client, key, batch, is_dangling)
+        if removed:
+            stats[action] = stats.get(action, 0) + removed
+            stats["bytes"] += max(before - _usage(client, [key])[0], 0)
+
+
+def compact_index(now: float = None) -> Dict:
+    """문서/청크 색인과 임베딩 캐시 LRU 에서 가리키는 대상이 없는 항목 정리"""
+    client = get_redis()
+    batch = _batch_size()
+    now = now or time.time()
+    stats = {"scanned": 0, "chunks_deleted": 0, "chunk_lists_deleted": 0,
+             "index_entries_removed": 0, "lru_entries_removed": 0, "bytes": 0}
+
+    _compact_chunks(client, batch, stats)
+    _compact_chunk_lists(client, batch, now, stats)
+
+    def missing_documents(members):
+        metas = _documents(client, [_text(member) for member in members])
+        return [member for member in members if metas.get(_text(member)) is None]
+
+    index_keys = [documents.ALL_DOCS_KEY]
+    for keys in scan_batches(client, documents.USER_DOCS_KEY.format(user_id="*"), batch):
+        index_keys.extend(keys)
+    _compact_sorted_sets(client, index_keys, batch, missing_documents, stats, "index_entries_removed")
+
+    # 임베딩 캐시 - 값은 Redis maxmemory 정책 등으로 사라졌는데 LRU 에만 남은 항목
+    binary_client = get_binary_redis()
+
+    def missing_vectors(members):
+        pipe = binary_client.pipeline(transaction=False)
+        for member in members:
+            pipe.exists(member)
+        return [member for member, exists in zip(members, pipe.execute()) if not exists]
+
+    _compact_sorted_sets(binary_client, [embedding_cache.LRU_KEY], batch, missing_vectors,
+                         stats, "lru_entries_removed")
+    return _report("compact_index", "redis", stats)
+
+
+# ===== 캐시 예열 =====
+
+def prewarm_embeddings(min_occurrences: int = None, limit: int = None) -> Dict:
+    """여러 번 색인된 본문(템플릿 문단 등)의 임베딩을 캐시에 채우고 LRU 를 갱신해 삭제되지 않게 함
+
+    청크 저장소를 SCAN 해 (모델, 본문 해시)별 등장 수를 세고, 상위 limit 개 중 min_occurrences 이상인 것만 예열합니다.
+    추적 항목이 max_tracked 를 넘으면 한 번만 나온 항목을 버려 메모리를 제한합니다.
+    """
+    conf = _conf()
+    min_occurrences = min_occurrences or int(conf.get("prewarm_min_occurrences", 3))
+    limit = limit or int(conf.get("prewarm_limit", 1000))
+    max_tracked = int(conf.get("prewarm_max_tracked", 200000))
+    client = get_redis()
+
+    counts = Counter()
+    scanned = 0
+    for keys in scan_batches(client, documents.CHUNK_KEY.format(chunk_id="*")):
+        for raw in client.mget(keys):
+            if not raw:
+                continue
+            chunk = json.loads(raw)
+            if chunk.get("content_hash"):
+                scanned += 1
+                counts[(chunk.get("embedding_model") or embedding_cache.model_name(), chunk["content_hash"])] += 1
+        if len(counts) > max_tracked:
+            counts = Counter({item: count for item, count in counts.items() if count > 1})
+
+    hot = defaultdict(list)
+    for (model, digest), count in counts.most_common(limit):
+        if count < min_occurrences:
+            break
+        hot[model].append(digest)
+
+    stats = {"scanned": scanned, "hot": 0, "refreshed": 0, "warmed": 0}
+    for model, hashes in hot.items():
+        found = embedding_cache.get_many(model, hashes)  # 캐시에 있는 항목은 LRU 갱신
+        missing = [digest for digest in hashes if digest not in found]
+        embedding_cache.put_many(model, {digest: embedding_cache.simulate_embedding(digest) for digest in missing})
+        stats["hot"] += len(hashes)
+        stats["refreshed"] += len(found)
+        stats["warmed"] += len(missing)
+    return _report("prewarm_embeddings", "redis", stats)
@@ -0,0 +1,371 @@
+# 인메모리 Redis 대역 (로컬 실행 / 벤치마크용)
+#
+# side store(db2) 클라이언트 자리에 넣어 DocumentProcessor, 알림, 임베딩 캐시, 공정 스케줄링
+# 카운터 등이 외부 Redis 없이 한 프로세스 안에서 동작하게 합니다 (background/local.py).
+# 파이프라인이 사용하는 명령만 구현하며, 명령별 호출 수와 키 패밀리별 쓰기 바이트를 집계합니다.
+
+import copy
+import fnmatch
+import functools
+import threading
+import time
+from collections import Counter
+
+from redis.exceptions import WatchError
+
+# 잠금 없이 실행하는 메서드 (지연 생성/제너레이터)
+_UNLOCKED = {"pipeline", "scan_iter"}
+
+
+def _synchronized(cls):
+    """공개 명령을 인스턴스 잠금 안에서 실행 (web 스레드 + eager 작업이 같은 대역을 공유)"""
+    def wrap(method):
+        @functools.wraps(method)
+        def locked(self, *args, **kwargs):
+            with self._lock:
+                return method(self, *args, **kwargs)
+        return locked
+
+    for name, attr in list(vars(cls).items()):
+        if callable(attr) and not name.startswith("_") and name not in _UNLOCKED:
+            setattr(cls, name, wrap(attr))
+    return cls
+
+
+@_synchronized
+class InMemoryRedis:
+    """Redis 대역 - 파이프라인이 사용하는 명령만 구현하고 호출 수/쓰기 바이트를 집계
+
+    명령 하나하나는 잠금 안에서 실행되고 (_synchronized), pipeline().execute() 는 묶음 전체를 잠급니다.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._data = {}
+        self._expires_at = {}
+        self.ops = Counter()
+        self.bytes_written = Counter()
+
+    # ----- 내부 헬퍼 -----
+    def _count(self, command, key=None, value=None):
+        self.ops[command] += 1
+        if value is not None:
+            family = str(key).split(":", 1)[0]
+            self.bytes_written[family] += len(value.encode() if isinstance(value, str) else value)
+
+    def _alive(self, key):
+        expires_at = self._expires_at.get(key)
+        if expires_at is not None and expires_at <= time.time():
+            self._data.pop(key, None)
+            self._expires_at.pop(key, None)
+        return key in self._data
+
+    # ----- 문자열 -----
+    def get(self, key):
+        self._count("get")
+        return self._data.get(key) if self._alive(key) else None
+
+    def set(self, key, value, ex=None, nx=False):
+        if isinstance(value, (int, float)):
+            value = str(value)  # redis-py 처럼 숫자는 문자열로 저장
+        self._count("set", key, value)
+        if nx and self._alive(key):
+            return None
+        self._data[key] = value
+        if ex:
+            self._expires_at[key] = time.time() + ex
+        else:
+            self._expires_at.pop(key, None)
+        return True
+
+    def setex(self, key, seconds, value):
+        self._count("setex", key, value)
+        self._data[key] = value
+        self._expires_at[key] = time.time() + seconds
+        return True
+
+    def mget(self, keys):
+        self._count("mget")
+        return [self._data.get(key) if self._alive(key) else None for key in keys]
+
+    def mset(self, mapping):
+        for key, value in mapping.items():
+            self._count("mset", key, value)
+            self._data[key] = value
+            self._expires_at.pop(key, None)
+        return True
+
+    def delete(self, *keys):
+        self._count("delete")
+        removed = 0
+        for key in keys:
+            if self._alive(key):
+                removed += 1
+            self._data.pop(key, None)
+            self._expires_at.pop(key, None)
+        return removed
+
+    def exists(self, *keys):
+        self._count("exists")
+        return sum(1 for key in keys if self._alive(key))
+
+    def ttl(self, key):
+        self._count("ttl")
+        if not self._alive(key):
+            return -2
+        expires_at = self._expires_at.get(key)
+        return -1 if expires_at is None else max(int(expires_at - time.time()), 0)
+
+    def expire(self, key, seconds):
+        self._count("expire")
+        if not self._alive(key):
+            return False
+        self._expires_at[key] = time.time() + seconds
+        return True
+
+    # ----- 리스트 -----
+    def lpush(self, key, *values):
+        for value in values:
+            self._count("lpush", key, value)
+        self._alive(key)  # 만료된 리스트는 비우고 새로 시작
+        items = self._data.setdefault(key, [])
+        for value in values:
+            items.insert(0, value)
+        return len(items)
+
+    def lrange(self, key, start, end):
+        self._count("lrange")
+        if not self._alive(key):
+            return []
+        items = self._data[key]
+        end = len(items) if end == -1 else end + 1
+        return items[start:end]
+
+    def lpop(self, key):
+        self._count("lpop")
+        if not self._alive(key) or not self._data[key]:
+            return None
+        return self._data[key].pop(0)
+
+    def rpush(self, key, *values):
+        for value in values:
+            self._count("rpush", key, value)
+        self._alive(key)
+        items = self._data.setdefault(key, [])
+        items.extend(values)
+        return len(items)
+
+    def ltrim(self, key, start, end):
+        self._count("ltrim")
+        if self._alive(key):
+            items = self._data[key]
+            self._data[key] = items[start:len(items) if end == -1 else end + 1]
+        return True
+
+    def llen(self, key):
+        self._count("llen")
+        return len(self._data[key]) if self._alive(key) else 0
+
+    # ----- 카운터 / 집합 -----
+    def incr(self, key, amount=1):
+        self._count("incr")
+        value = int(self._data.get(key, 0) if self._alive(key) else 0) + amount
+        self._data[key] = str(value)
+        return value
+
+    def decr(self, key, amount=1):
+        return self.incr(key, -amount)
+
+    def sadd(self, key, *members):
+        self._count("sadd")
+        self._alive(key)
+        members_set = self._data.setdefault(key, set())
+        added = len(set(members) - members_set)
+        members_set.update(members)
+        return added
+
+    def smembers(self, key):
+        self._count("smembers")
+        return set(self._data[key]) if self._alive(key) else set()
+
+    def sismember(self, key, member):
+        self._count("sismember")
+        return self._alive(key) and member in self._data[key]
+
+    def srem(self, key, *members):
+        self._count("srem")
+        if not self._alive(key):
+            return 0
+        removed = len(set(members) & self._data[key])
+        self._data[key].difference_update(members)
+        return removed
+
+    # ----- 해시 -----
+    def hset(self, key, field=None, value=None, mapping=None):
+        items = dict(mapping or {})
+        if field is not None:
+            items[field] = value
+        self._alive(key)
+        hash_ = self._data.setdefault(key, {})
+        added = 0
+        for name, item in items.items():
+            self._count("hset", key, str(item))
+            added += name not in hash_
+            hash_[name] = str(item)
+        return added
+
+    def hget(self, key, field):
+        self._count("hget")
+        return self._data[key].get(field) if self._alive(key) else None
+
+    def hmget(self, key, fields):
+        self._count("hmget")
+        hash_ = self._data[key] if self._alive(key) else {}
+        return [hash_.get(field) for field in fields]
+
+    def hgetall(self, key):
+        self._count("hgetall")
+        return dict(self._data[key]) if self._alive(key) else {}
+
+    def hincrby(self, key, field, amount=1):
+        self._count("hincrby")
+        self._alive(key)
+        hash_ = self._data.setdefault(key, {})
+        value = int(hash_.get(field, 0)) + amount
+        hash_[field] = str(value)
+        return value
+
+    # ----- 정렬 집합 -----
+    def zadd(self, key, mapping):
+        self._count("zadd")
+        self._alive(key)
+        zset = self._data.setdefault(key, {})
+        added = len(set(mapping) - set(zset))
+        zset.update({member: float(score) for member, score in mapping.items()})
+        return added
+
+    def zcard(self, key):
+        self._count("zcard")
+        return len(self._data[key]) if self._alive(key) else 0
+
+    def zrevrange(self, key, start, end):
+        self._count("zrevrange")
+        if not self._alive(key):
+            return []
+        ordered = sorted(self._data[key], key=lambda member: self._data[key][member], reverse=True)
+        return ordered[start:len(ordered) if end == -1 else end + 1]
+
+    def zpopmin(self, key, count=1):
+        self._count("zpopmin")
+        if not self._alive(key):
+            return []
+        zset = self._data[key]
+        popped = sorted(zset.items(), key=lambda item: item[1])[:count]
+        for member, _ in popped:
+            del zset[member]
+        return popped
+
+    def zrem(self, key, *members):
+        self._count("zrem")
+        if not self._alive(key):
+            return 0
+        zset = self._data[key]
+        return sum(zset.pop(member, None) is not None for member in members)
+
+    def scan_iter(self, match="*", count=None):
+        self._count("scan")
+        for key in list(self._data):
+            if self._alive(key) and fnmatch.fnmatchcase(key, match):
+                yield key
+
+    # ----- 서버 -----
+    def ping(self):
+        return True
+
+    def dbsize(self):
+        return sum(1 for key in list(self._data) if self._alive(key))
+
+    def flushdb(self):
+        self._data.clear()
+        self._expires_at.clear()
+        return True
+
+    def memory_usage(self, key, samples=None):
+        """값 크기 근사치 (바이트) - 키가 없으면 None"""
+        self._count("memory_usage")
+        return self._size(key) if self._alive(key) else None
+
+    def info(self, section=None):
+        """INFO memory 대역 - maxmemory 0 (제한 없음)"""
+        used = sum(self._size(key) for key in list(self._data) if self._alive(key))
+        return {"used_memory": used, "maxmemory": 0}
+
+    def _peek(self, key):
+        """WATCH 비교용 현재 값 사본 (호출 수 집계 없음)"""
+        return copy.deepcopy(self._data.get(key)) if self._alive(key) else None
+
+    def _size(self, key):
+        value = self._data[key]
+        if isinstance(value, dict):
+            items = [*value.keys(), *map(str, value.values())]
+        elif isinstance(value, (list, set)):
+            items = list(value)
+        else:
+            items = [value]
+        return len(key) + sum(len(item) if isinstance(item, (str, bytes)) else 8 for item in items)
+
+    # ----- 파이프라인 (명령을 모았다가 execute 에서 차례로 실행) -----
+    def pipeline(self, transaction=True):
+        return _InMemoryPipeline(self)
+
+
+class _InMemoryPipeline:
+    """명령 묶음 + WATCH/MULTI 대역
+
+    redis-py 와 같이 watch() 이후 multi() 전까지는 명령을 바로 실행하고, execute() 때 감시한 키의 값이
+    watch() 시점과 다르면 WatchError 를 냅니다 (버전 대신 값 비교 - 같은 값으로 되돌린 변경은 감지 못함).
+    """
+
+    def __init__(self, client):
+        self._client = client
+        self._commands = []
+        self._watched = {}
+        self._immediate = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.reset()
+
+    def __getattr__(self, name):
+        method = getattr(self._client, name)
+        if self._immediate:
+            return method
+
+        def queue(*args, **kwargs):
+            self._commands.append((method, args, kwargs))
+            return self
+        return queue
+
+    def watch(self, *keys):
+        with self._client._lock:
+            self._watched.update({key: self._client._peek(key) for key in keys})
+        self._immediate = True
+        return True
+
+    def multi(self):
+        self._immediate = False
+
+    def reset(self):
+        self._commands = []
+        self._watched = {}
+        self._immediate = False
+
+    def execute(self):
+        commands, watched = self._commands, self._watched
+        self.reset()
+        with self._client._lock:  # MULTI/EXEC 처럼 묶음 사이에 다른 명령이 끼어들지 않도록
+            if any(self._client._peek(key) != value for key, value in watched.items()):
+                raise WatchError("감시한 키가 변경됨")
+            return [method(*args, **kwargs) for method, args, kwargs in commands]
@@ -0,0 +1,229 @@
+# Prometheus 메트릭 수집 모듈
+#
+# - Celery 시그널(task_prerun/postrun/retry/failure)로 작업별 대기/실행 시간 수집
+# - 파이프라인 단계별 처리량(청크/임베딩 수)과 Redis 호출 지연 시간 수집
+# - FastAPI 요청 지연 시간 수집 (main.py 미들웨어에서 사용)
+#
+# prefork 워커는 자식 프로세스에서 작업이 실행되므로 PROMETHEUS_MULTIPROC_DIR 를
+# 지정하면 multiprocess 모드로 집계합니다.
+
+import os
+import time
+from contextlib import contextmanager
+
+from celery.signals import (
+    before_task_publish,
+    task_prerun,
+    task_postrun,
+    task_retry,
+    task_failure,
+    worker_init,
+    worker_process_shutdown,
+)
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+    multiprocess,
+    start_http_server,
+)
+
+from background import log
+from background.profiling import record_span
+
+# 버킷: 수 ms 단위 Redis 호출부터 수 분 단위 임베딩 단계까지 커버
+TASK_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+
+# ===== Celery 작업 메트릭 =====
+TASK_QUEUE_WAIT_SECONDS = Histogram(
+    "celery_task_queue_wait_seconds",
+    "작업 발행부터 워커 실행 시작까지 대기 시간",
+    ["task"],
+    buckets=TASK_BUCKETS,
+)
+TASK_RUNTIME_SECONDS = Histogram(
+    "celery_task_runtime_seconds",
+    "작업 실행 시간",
+    ["task", "state"],
+    buckets=TASK_BUCKETS,
+)
+TASK_RETRIES_TOTAL = Counter(
+    "celery_task_retries_total",
+    "작업 재시도 횟수",
+    ["task"],
+)
+TASK_FAILURES_TOTAL = Counter(
+    "celery_task_failures_total",
+    "작업 실패 횟수",
+    ["task", "exception"],
+)
+
+# ===== 파이프라인 단계 메트릭 =====
+STAGE_DURATION_SECONDS = Histogram(
+    "pipeline_stage_duration_seconds",
+    "파이프라인 단계 실행 시간",
+    ["stage"],
+    buckets=TASK_BUCKETS,
+)
+STAGE_ITEMS_TOTAL = Counter(
+    "pipeline_stage_items_total",
+    "파이프라인 단계에서 처리한 항목 수 (청크/임베딩/저장 건수)",
+    ["stage", "item"],
+)
+
+# ===== Redis / HTTP 메트릭 =====
+REDIS_CALL_SECONDS = Histogram(
+    "redis_call_duration_seconds",
+    "Redis 명령 호출 지연 시간",
+    ["command"],
+    buckets=FAST_BUCKETS,
+)
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "FastAPI 요청 처리 시간",
+    ["method", "route", "status"],
+    buckets=FAST_BUCKETS + (2.5, 5, 10),
+)
+READ_CACHE_TOTAL = Counter(
+    "read_cache_requests_total",
+    "조회 API 캐시 요청 수 (layer=memory/redis/miss)",
+    ["resource", "layer"],
+)
+ADMISSION_TOTAL = Counter(
+    "admission_requests_total",
+    "업로드 수용 제어 판정 수 (decision=admitted/deferred/rejected)",
+    ["decision", "reason"],
+)
+IDEMPOTENT_SKIPS_TOTAL = Counter(
+    "idempotent_skips_total",
+    "멱등 원장으로 생략한 중복 실행/부수 효과 수 (reason=committed/in_progress/duplicate_effect)",
+    ["task", "reason"],
+)
+MAINTENANCE_RECLAIMED_BYTES = Counter(
+    "maintenance_reclaimed_bytes_total",
+    "주기 정리 작업으로 회수한 바이트 (target=disk/redis)",
+    ["task", "target"],
+)
+MAINTENANCE_ITEMS_TOTAL = Counter(
+    "maintenance_items_total",
+    "주기 정리/예열 작업이 처리한 항목 수 (action=deleted/trimmed/expired/warmed 등)",
+    ["task", "action"],
+)
+
+# task_id -> 실행 시작 시각 (prerun ~ postrun 사이에만 보관)
+_task_started_at = {}
+
+
+def get_registry():
+    """multiprocess 모드면 전용 레지스트리, 아니면 기본 레지스트리 반환"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def render_latest():
+    """/metrics 응답 본문과 Content-Type 반환"""
+    return generate_latest(get_registry()), CONTENT_TYPE_LATEST
+
+
+@contextmanager
+def track_stage(stage: str):
+    """파이프라인 단계 실행 시간 측정 (블록 안의 로그에는 stage 필드가 붙음)"""
+    started = time.perf_counter()
+    try:
+        with log.bind(stage=stage):
+            yield
+    finally:
+        STAGE_DURATION_SECONDS.labels(stage=stage).observe(time.perf_counter() - started)
+
+
+def count_items(stage: str, item: str, amount: int = 1):
+    """단계별 처리 항목 수 증가"""
+    STAGE_ITEMS_TOTAL.labels(stage=stage, item=item).inc(amount)
+
+
+class InstrumentedRedis:
+    """Redis 클라이언트 래퍼 - 모든 명령의 지연 시간을 기록"""
+
+    def __init__(self, client):
+        self._client = client
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if not callable(attr):
+            return attr
+
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return attr(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                REDIS_CALL_SECONDS.labels(command=name).observe(elapsed)
+                record_span(f"redis.{name}", elapsed)
+
+        return timed
+
+
+# ===== Celery 시그널 핸들러 =====
+
+@before_task_publish.connect
+def _stamp_publish_time(headers=None, **kwargs):
+    """발행 시각을 메시지 헤더에 기록 (큐 대기 시간 계산용)"""
+    if headers is not None:
+        headers.setdefault("published_at", time.time())
+
+
+@task_prerun.connect
+def _on_task_prerun(task_id=None, task=None, **kwargs):
+    now = time.time()
+    _task_started_at[task_id] = time.perf_counter()
+    published_at = getattr(task.request, "published_at", None)
+    if published_at:
+        TASK_QUEUE_WAIT_SECONDS.labels(task=task.name).observe(max(now - float(published_at), 0))
+
+
+@task_postrun.connect
+def _on_task_postrun(task_id=None, task=None, state=None, **kwargs):
+    started = _task_started_at.pop(task_id, None)
+    if started is not None:
+        TASK_RUNTIME_SECONDS.labels(task=task.name, state=state or "UNKNOWN").observe(
+            time.perf_counter() - started
+        )
+
+
+@task_retry.connect
+def _on_task_retry(sender=None, **kwargs):
+    TASK_RETRIES_TOTAL.labels(task=getattr(sender, "name", "unknown")).inc()
+
+
+@task_failure.connect
+def _on_task_failure(sender=None, exception=None, **kwargs):
+    TASK_FAILURES_TOTAL.labels(
+        task=getattr(sender, "name", "unknown"),
+        exception=type(exception).__name__,
+    ).inc()
+
+
+@worker_init.connect
+def _start_worker_metrics_server(**kwargs):
+    """CELERY_METRICS_PORT 가 지정되면 워커 메인 프로세스에서 메트릭 서버 시작"""
+    port = os.environ.get("CELERY_METRICS_PORT")
+    if not port:
+        return
+    multiproc_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if multiproc_dir:
+        os.makedirs(multiproc_dir, exist_ok=True)
+    start_http_server(int(port), registry=get_registry())
+
+
+@worker_process_shutdown.connect
+def _mark_process_dead(pid=None, **kwargs):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid or os.getpid())
@@ -0,0 +1,135 @@
+# 문서 처리 파이프라인 구성 (web 측)
+#
+# 작업 모듈을 임포트하지 않고 작업 이름으로 시그니처를 만들어 발행합니다.
+# web 프로세스는 작업 그래프 전체를 로드하지 않아도 파이프라인을 시작할 수 있습니다.
+
+import os
+import uuid
+
+from celery import chain
+
+from background.celery import celery_app
+from background import documents, pipeline_spec
+from background.store import DocumentProcessor, send_notification
+
+EXTRACT_TASK = "background.task.sample_tasks.extract_text_advanced"
+CHUNK_TASK = "background.task.sample_tasks.split_text_chunks_advanced"
+EMBED_TASK = "background.task.sample_tasks.generate_embeddings_advanced"
+SAVE_TASK = "background.task.sample_tasks.save_to_database_advanced"
+FINALIZE_TASK = "background.task.sample_tasks.finalize_pipeline"
+SPLIT_DOCUMENT_TASK = "background.task.sample_tasks.split_document"
+INGEST_BATCH_TASK = "background.task.document_tasks.ingest_document_batch"
+FUSED_STAGES_TASK = "background.task.pipeline_tasks.run_fused_stages"
+FAN_OUT_TASK = "background.task.pipeline_tasks.fan_out_stage"
+JOIN_SHARDS_TASK = "background.task.pipeline_tasks.join_stage_shards"
+
+
+def ensure_tasks_loaded():
+    """eager 모드에서는 프로세스 안에서 실행하므로 작업 모듈을 실제로 로드"""
+    if celery_app.conf.task_always_eager:
+        celery_app.loader.import_default_modules()
+
+
+def signature(name: str, *args, **options):
+    ensure_tasks_loaded()
+    return celery_app.signature(name, args=args, **options)
+
+
+# ===== 파이프라인 스펙 → canvas 컴파일 =====
+
+def stage_options(stages, priority: int = None) -> dict:
+    """발행 옵션 - 묶음이면 시간 제한을 합산하고 첫 단계의 큐를 사용"""
+    options = {"priority": priority} if priority is not None else {}
+    if stages[0].get("queue"):
+        options["queue"] = stages[0]["queue"]
+    for key in ("soft_time_limit", "time_limit"):
+        limits = [stage.get(key) for stage in stages]
+        if all(limits):
+            options[key] = sum(limits)
+    return options
+
+
+def group_signature(stages, args=(), kwargs=None, priority: int = None):
+    """실행 묶음 하나의 시그니처
+
+    - 단계 1개: 단계 작업 그대로
+    - parallelism > 1: fan_out_stage 가 실행 시점에 chord(샤드들, 합치기)로 교체
+    - fuse 로 묶인 여러 단계: run_fused_stages 한 작업에서 차례로 실행
+    """
+    if len(stages) > 1:
+        return signature(FUSED_STAGES_TASK, *args, kwargs={
+            "stages": [stage["name"] for stage in stages],
+            "first_kwargs": kwargs or {},
+        }, **stage_options(stages, priority))
+    stage = stages[0]
+    if int(stage.get("parallelism", 1)) > 1:
+        fan_out_options = {"priority": priority} if priority is not None else {}
+        return signature(FAN_OUT_TASK, *args, kwargs={"stage": stage["name"]}, **fan_out_options)
+    return signature(stage["task"], *args, kwargs=kwargs, **stage_options(stages, priority))
+
+
+def compile_pipeline(first_args=(), first_kwargs=None, priority: int = None,
+                     final_task_id: str = None, spec: dict = None):
+    """스펙의 단계 묶음을 순서대로 chain 으로 연결 (마지막 작업의 task_id = final_task_id)
+
+    중간 묶음의 결과는 다음 작업 메시지로 전달되므로 결과 백엔드에 저장하지 않고(ignore_result),
+    마지막 묶음의 결과만 final_task_id 로 저장합니다. 묶음 작업(run_fused_stages/fan_out_stage)은
+    replace() 로 이어 발행하는 작업에 같은 ignore_result 를 넘깁니다.
+    """
+    signatures = []
+    for index, stages in enumerate(pipeline_spec.stage_groups(spec)):
+        if index == 0:
+            signatures.append(group_signature(stages, first_args, first_kwargs, priority))
+        else:
+            signatures.append(group_signature(stages, priority=priority))
+    for intermediate in signatures[:-1]:
+        intermediate.set(ignore_result=True)
+    if final_task_id:
+        signatures[-1].set(task_id=final_task_id)
+    return chain(*signatures)
+
+
+# 고급 파이프라인 (모든 기능 포함)
+def process_document_pipeline_advanced(file_path: str, user_id: str = None,
+                                       priority: int = None, chain_id: str = None,
+                                       blob_sha256: str = None, batch_id: str = None,
+                                       batch_index: int = None, filename: str = None,
+                                       fair_slot: bool = False, mode: str = None):
+    """고급 문서 처리 파이프라인 - 타임아웃, 로깅, 재시작, 진행률, 알림 모두 포함
+
+    chain_id 를 지정하면 마지막 단계의 task_id 이자 문서 ID 로 사용합니다 (대기열 제출 시 미리 발급).
+    완료/실패 시 finalize_pipeline 이 문서 상태를 기록하고, blob_sha256 이 주어지면 업로드 파일
+    참조를, fair_slot 이면 user_id 의 공정 스케줄링 슬롯을 반환합니다.
+    batch_id 가 주어지면 배치의 파일 상태를 기록하고 다음 파일을 발행합니다.
+    mode 를 생략하면 파일 크기로 staged/fused 실행 모드를 고릅니다 (pipeline_spec.execution_mode).
+    """
+    chain_id = chain_id or str(uuid.uuid4())
+    options = {"priority": priority} if priority is not None else {}
+    mode = mode or pipeline_spec.execution_mode(os.path.getsize(file_path))
+
+    # 단계 구성은 celeryconfig.document_pipeline 스펙에서 컴파일 (fused 면 전 단계를 한 작업으로 묶음)
+    spec = pipeline_spec.fused_spec() if mode == pipeline_spec.FUSED else None
+    pipeline = compile_pipeline((file_path,), {"user_id": user_id, "filename": filename},
+                                priority=priority, final_task_id=chain_id, spec=spec)
+
+    # 문서 등록 + 초기 진행률 설정 (발행 전에 기록해야 빠른 완료 결과를 덮어쓰지 않음)
+    documents.register(chain_id, file_path, user_id=user_id, filename=filename)
+    DocumentProcessor.save_progress(chain_id, "파이프라인_시작", {
+        "file_path": file_path,
+        "pipeline_id": chain_id,
+        "execution_mode": mode,
+        "steps": pipeline_spec.step_names()
+    }, 0)
+
+    # 시작 알림
+    send_notification(chain_id, "파이프라인_시작", "success",
+                     f"문서 처리 파이프라인 시작: {filename or os.path.basename(file_path)}")
+
+    kwargs = {"document_id": chain_id, "user_id": user_id if fair_slot else None, "blob_sha256": blob_sha256}
+    if batch_id:
+        kwargs.update(batch_id=batch_id, batch_index=batch_index)
+    finalize = signature(FINALIZE_TASK, kwargs={**kwargs, "status": "completed"}, immutable=True)
+    on_error = signature(FINALIZE_TASK, kwargs={**kwargs, "status": "failed"}, immutable=True)
+    pipeline |= finalize.set(**options)
+    pipeline.apply_async(link_error=on_error.set(**options))
+    return celery_app.AsyncResult(chain_id)  # 정리 작업이 아닌 마지막 처리 단계 결과
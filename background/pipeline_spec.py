@@ -0,0 +1,127 @@
+# 문서 처리 파이프라인 선언형 정의
+#
+# 단계 순서와 단계별 실행 설정은 코드가 아니라 설정으로 관리합니다
+# (celeryconfig.document_pipeline, 또는 PIPELINE_SPEC_FILE 로 지정한 JSON 파일).
+# 처리량 조정(시간 제한, 재시도, 큐, 병렬도, 단계 묶기)은 설정 변경만으로 반영됩니다.
+#
+# 단계 항목
+#   name             단계 이름 (진행률/알림/메트릭의 step 이름과 같음)
+#   task             작업 이름
+#   queue            발행 큐 (생략하면 기본 큐)
+#   soft_time_limit  소프트 시간 제한 (초) - 단계의 시간 예산(background/deadline.py) 기준
+#   time_limit       하드 시간 제한 (초)
+#   max_retries      일시적 오류 재시도 횟수
+#   batch_size       단계 안의 일괄 처리 크기 (예: 임베딩 캐시 기록 단위)
+#   parallelism      2 이상이면 chord 로 샤드를 나눠 실행한 뒤 합침 (shard 인자를 지원하는 단계만)
+#   fuse             True 면 앞 단계와 같은 작업 안에서 실행 (작은 단계의 브로커 왕복 생략)
+#
+# 실행 모드
+#   staged  스펙대로 단계별 작업을 chain 으로 발행
+#   fused   모든 단계를 한 작업에서 실행 (fused_pipeline_max_bytes 이하 파일 - 단계 사이 발행/결과 저장/대기 없음)
+#
+# 작업 측 설정(시간 제한, 재시도)은 task_annotations() 로 워커 작업 속성에 반영되고,
+# 발행 측 설정(큐, 시간 제한)은 background/pipeline.py 의 컴파일러가 시그니처 옵션으로 붙입니다.
+# celeryconfig 에서 임포트하므로 background.celery 는 함수 안에서만 임포트합니다.
+
+import json
+from typing import Dict, List
+
+STAGED = "staged"
+FUSED = "fused"
+
+# 워커 작업 속성으로 반영하는 항목
+TASK_ATTRIBUTES = ("soft_time_limit", "time_limit", "max_retries")
+
+
+def load_file(path: str) -> Dict:
+    """JSON 스펙 파일 로드"""
+    with open(path, encoding="utf-8") as spec_file:
+        return validate(json.load(spec_file))
+
+
+def validate(spec: Dict) -> Dict:
+    """스펙 검증 - 잘못된 설정은 기동 시점에 ValueError"""
+    stages = spec.get("stages") or []
+    if not stages:
+        raise ValueError("파이프라인 스펙에 단계가 없습니다")
+
+    names = set()
+    for index, stage in enumerate(stages):
+        name = stage.get("name")
+        if not name or not stage.get("task"):
+            raise ValueError(f"{index + 1}번째 단계에 name/task 가 없습니다")
+        if name in names:
+            raise ValueError(f"단계 이름 중복: {name}")
+        names.add(name)
+
+        parallelism = int(stage.get("parallelism", 1))
+        if parallelism < 1:
+            raise ValueError(f"{name}: parallelism 은 1 이상이어야 합니다")
+        if index == 0 and (stage.get("fuse") or parallelism > 1):
+            raise ValueError(f"{name}: 첫 단계는 묶거나 분할할 수 없습니다")
+        if stage.get("fuse") and (parallelism > 1 or int(stages[index - 1].get("parallelism", 1)) > 1):
+            raise ValueError(f"{name}: 분할 실행 단계는 다른 단계와 묶을 수 없습니다")
+    return spec
+
+
+def task_annotations(spec: Dict, base: Dict = None) -> Dict:
+    """스펙의 작업 측 설정을 task_annotations 형식으로 변환 (base 의 같은 작업 항목과 병합)"""
+    annotations = {task: dict(values) for task, values in (base or {}).items()}
+    for stage in spec.get("stages", []):
+        values = {key: stage[key] for key in TASK_ATTRIBUTES if stage.get(key) is not None}
+        if values:
+            annotations.setdefault(stage["task"], {}).update(values)
+    return annotations
+
+
+def get_spec() -> Dict:
+    from background.celery import celery_app
+    return celery_app.conf.get("document_pipeline") or {"stages": []}
+
+
+def stages(spec: Dict = None) -> List[Dict]:
+    return (spec or get_spec())["stages"]
+
+
+def stage(name: str, spec: Dict = None) -> Dict:
+    for candidate in stages(spec):
+        if candidate["name"] == name:
+            return candidate
+    raise KeyError(f"파이프라인 스펙에 없는 단계: {name}")
+
+
+def stage_setting(name: str, key: str, default=None):
+    """단계 설정값 조회 (스펙에 단계나 항목이 없으면 default)"""
+    try:
+        value = stage(name).get(key)
+    except KeyError:
+        return default
+    return default if value is None else value
+
+
+def step_names(spec: Dict = None) -> List[str]:
+    return [candidate["name"] for candidate in stages(spec)]
+
+
+def stage_groups(spec: Dict = None) -> List[List[Dict]]:
+    """실행 단위로 묶은 단계 목록 - fuse 단계는 앞 단계와 같은 묶음"""
+    groups = []
+    for candidate in stages(spec):
+        if candidate.get("fuse") and groups:
+            groups[-1].append(candidate)
+        else:
+            groups.append([candidate])
+    return groups
+
+
+def fused_spec(spec: Dict = None) -> Dict:
+    """모든 단계를 하나의 묶음으로 만든 스펙 (분할 실행 없이 첫 단계 작업 안에서 차례로 실행)"""
+    fused = [dict(candidate, fuse=index > 0, parallelism=1) for index, candidate in enumerate(stages(spec))]
+    return {**(spec or get_spec()), "stages": fused}
+
+
+def execution_mode(file_size: int) -> str:
+    """파일 크기로 실행 모드 선택 - 작은 문서는 단계 사이 브로커 왕복이 처리 시간보다 큼"""
+    from background.celery import celery_app
+    max_bytes = int(celery_app.conf.get("fused_pipeline_max_bytes") or 0)
+    return FUSED if file_size is not None and file_size <= max_bytes else STAGED
@@ -0,0 +1,215 @@
+# 작업 단위 프로파일링 모듈
+#
+# 작업 이름 또는 샘플링 비율로 선택된 작업만 프로파일링합니다.
+#   - celeryconfig: profile_tasks / profile_sample_rate / profile_mode / profile_dir
+#   - 메시지 헤더: apply_async(headers={"profile": True}) 로 개별 요청 강제 프로파일링
+#
+# 결과는 profile_dir/{작업이름}/ 아래에 저장되고 /profile API 로 조회합니다.
+#   - {id}.prof   : cProfile 통계 (profile_mode="cprofile")
+#   - {id}.folded : 스택 샘플 (profile_mode="sample", flamegraph.pl 입력 형식)
+#   - {id}.json   : 메타데이터 + span 타이밍 (Redis 호출, 직렬화, 루프 본문)
+
+import cProfile
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+from celery.signals import task_prerun, task_postrun
+
+_local = threading.local()
+
+# task_id -> 진행 중인 프로파일 세션
+_sessions = {}
+
+
+class _SpanStats:
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "total_ms": round(self.total * 1000, 3),
+            "mean_ms": round(self.total / self.count * 1000, 3) if self.count else 0,
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+
+class StackSampler:
+    """통계적 프로파일러 - 대상 스레드의 스택을 주기적으로 샘플링"""
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def dump(self, path: str):
+        with open(path, "w") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class ProfileSession:
+    """작업 1회 실행에 대한 프로파일 세션"""
+
+    def __init__(self, task_name: str, task_id: str, mode: str, reason: str):
+        self.task_name = task_name
+        self.task_id = task_id
+        self.mode = mode
+        self.reason = reason
+        self.spans = {}
+        self.started_at = datetime.now()
+        self._started = time.perf_counter()
+        self._profiler = None
+
+    def start(self):
+        if self.mode == "sample":
+            self._profiler = StackSampler(threading.get_ident())
+            self._profiler.start()
+        else:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def record(self, name: str, seconds: float):
+        stats = self.spans.get(name)
+        if stats is None:
+            stats = self.spans[name] = _SpanStats()
+        stats.add(seconds)
+
+    def stop_and_save(self, profile_dir: str, state: str) -> str:
+        duration = time.perf_counter() - self._started
+        if self.mode == "sample":
+            self._profiler.stop()
+        else:
+            self._profiler.disable()
+
+        task_dir = os.path.join(profile_dir, self.task_name)
+        os.makedirs(task_dir, exist_ok=True)
+        profile_id = f"{self.started_at.strftime('%Y%m%dT%H%M%S')}_{self.task_id}"
+        base = os.path.join(task_dir, profile_id)
+
+        if self.mode == "sample":
+            self._profiler.dump(base + ".folded")
+        else:
+            self._profiler.dump_stats(base + ".prof")
+
+        meta = {
+            "profile_id": profile_id,
+            "task_name": self.task_name,
+            "task_id": self.task_id,
+            "mode": self.mode,
+            "reason": self.reason,
+            "state": state,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": round(duration * 1000, 3),
+            "spans": {name: stats.as_dict() for name, stats in sorted(self.spans.items())},
+        }
+        with open(base + ".json", "w") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        return profile_id
+
+
+def _profile_reason(task) -> str:
+    """프로파일링 대상이면 사유 문자열, 아니면 빈 문자열"""
+    if getattr(task.request, "profile", None):
+        return "header"
+
+    conf = task.app.conf
+    targets = conf.get("profile_tasks") or ()
+    if isinstance(targets, str):
+        targets = [t.strip() for t in targets.split(",") if t.strip()]
+    short_name = task.name.rsplit(".", 1)[-1]
+    if "*" in targets or task.name in targets or short_name in targets:
+        return "config"
+
+    rate = float(conf.get("profile_sample_rate") or 0)
+    if rate > 0 and random.random() < rate:
+        return "sampled"
+    return ""
+
+
+def current_session():
+    return getattr(_local, "session", None)
+
+
+def record_span(name: str, seconds: float):
+    """현재 스레드에서 프로파일링 중이면 span 타이밍 누적"""
+    session = getattr(_local, "session", None)
+    if session is not None:
+        session.record(name, seconds)
+
+
+@contextmanager
+def span(name: str):
+    """코드 구간 타이밍 측정 (프로파일링 중이 아니면 거의 비용 없음)"""
+    session = getattr(_local, "session", None)
+    if session is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        session.record(name, time.perf_counter() - started)
+
+
+def get_profile_dir(app=None) -> str:
+    if app is None:
+        from background.celery import celery_app as app
+    return app.conf.get("profile_dir") or "data/profiles"
+
+
+@task_prerun.connect
+def _start_profile(task_id=None, task=None, **kwargs):
+    reason = _profile_reason(task)
+    if not reason:
+        return
+    session = ProfileSession(task.name, task_id, task.app.conf.get("profile_mode") or "cprofile", reason)
+    _sessions[task_id] = session
+    _local.session = session
+    session.start()
+
+
+@task_postrun.connect
+def _stop_profile(task_id=None, task=None, state=None, **kwargs):
+    session = _sessions.pop(task_id, None)
+    if session is None:
+        return
+    _local.session = None
+    session.stop_and_save(get_profile_dir(task.app), state or "UNKNOWN")
@@ -0,0 +1,167 @@
+# 조회 API 캐시 (프로세스 내 LRU + Redis read-through)
+#
+# 조회 요청은 쓰기보다 훨씬 많으므로 응답 본문을 직렬화된 상태로 캐시합니다.
+#   1. 프로세스 내 LRU (web 프로세스마다, 짧은 TTL)
+#   2. Redis readcache:{key} (web 프로세스 간 공유)
+#   3. 원본 저장소 조회 (loader) → 두 계층에 기록
+# 본문의 해시를 ETag 로 사용해 If-None-Match 요청에는 본문 없이 304 로 응답할 수 있습니다.
+#
+# 리소스별 TTL 은 celeryconfig.read_cache 에서 설정합니다.
+
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Optional, Union
+
+from background.metrics import READ_CACHE_TOTAL
+from background.store import get_redis
+
+REDIS_KEY = "readcache:{key}"
+GROUP_KEY = "readcache:group:{resource}:{group}"  # 그룹(예: 문서 하나의 청크 페이지들)에 속한 캐시 키 집합
+
+
+@dataclass
+class CachedBody:
+    body: bytes
+    etag: str
+    ttl: int
+    expires_at: float = 0.0
+
+
+def _conf() -> dict:
+    from background.celery import celery_app
+    return celery_app.conf.get("read_cache") or {}
+
+
+def ttl_for(resource: str, default: int = 5) -> int:
+    return int((_conf().get("ttl") or {}).get(resource, default))
+
+
+def _encode(value) -> CachedBody:
+    body = json.dumps(value, ensure_ascii=False, sort_keys=True).encode()
+    return CachedBody(body=body, etag=f'"{hashlib.sha1(body).hexdigest()}"', ttl=0)
+
+
+class ReadThroughCache:
+    """직렬화된 응답 본문 캐시 - 스레드 안전 LRU + Redis 공유 계층"""
+
+    def __init__(self, maxsize: int = 4096, memory_max_ttl: int = 30):
+        self.maxsize = maxsize
+        # 다른 web 프로세스의 LRU 는 무효화할 수 없으므로 프로세스 내 보관 기간은 짧게 제한
+        self.memory_max_ttl = memory_max_ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _remember(self, key: str, entry: CachedBody):
+        entry.expires_at = time.monotonic() + min(entry.ttl, self.memory_max_ttl)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def _lookup(self, key: str) -> Optional[CachedBody]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def get(self, resource: str, key: str, loader: Callable[[], Optional[dict]],
+            ttl: Union[int, Callable[[dict], int]], group: str = None) -> Optional[CachedBody]:
+        """캐시 조회, 없으면 loader 결과를 캐시 후 반환 (loader 가 None 이면 캐시하지 않음)
+
+        ttl 은 초 단위 정수 또는 조회 결과에 따라 TTL 을 고르는 함수입니다.
+        group 을 주면 invalidate_group 으로 같은 그룹의 키를 한 번에 무효화할 수 있습니다.
+        """
+        cache_key = f"{resource}:{key}"
+        entry = self._lookup(cache_key)
+        if entry is not None:
+            READ_CACHE_TOTAL.labels(resource=resource, layer="memory").inc()
+            return entry
+
+        redis_client = get_redis()
+        raw = redis_client.get(REDIS_KEY.format(key=cache_key))
+        if raw:
+            data = json.loads(raw)
+            entry = CachedBody(body=data["body"].encode(), etag=data["etag"], ttl=data["ttl"])
+            self._remember(cache_key, entry)
+            READ_CACHE_TOTAL.labels(resource=resource, layer="redis").inc()
+            return entry
+
+        READ_CACHE_TOTAL.labels(resource=resource, layer="miss").inc()
+        value = loader()
+        if value is None:
+            return None
+        entry = _encode(value)
+        entry.ttl = int(ttl(value) if callable(ttl) else ttl)
+        if entry.ttl > 0:
+            redis_client.setex(REDIS_KEY.format(key=cache_key), entry.ttl, json.dumps({
+                "body": entry.body.decode(), "etag": entry.etag, "ttl": entry.ttl,
+            }))
+            if group is not None:
+                group_key = GROUP_KEY.format(resource=resource, group=group)
+                redis_client.sadd(group_key, cache_key)
+                redis_client.expire(group_key, max(entry.ttl, redis_client.ttl(group_key)))
+            self._remember(cache_key, entry)
+        return entry
+
+    def invalidate(self, resource: str, key: str):
+        """쓰기 후 무효화 - Redis 계층과 현재 프로세스의 LRU 에서 제거"""
+        cache_key = f"{resource}:{key}"
+        with self._lock:
+            self._entries.pop(cache_key, None)
+        get_redis().delete(REDIS_KEY.format(key=cache_key))
+
+    def invalidate_many(self, resource: str, keys):
+        """여러 키 무효화 (Redis 는 DELETE 한 번)"""
+        cache_keys = [f"{resource}:{key}" for key in keys]
+        if not cache_keys:
+            return
+        with self._lock:
+            for cache_key in cache_keys:
+                self._entries.pop(cache_key, None)
+        get_redis().delete(*[REDIS_KEY.format(key=cache_key) for cache_key in cache_keys])
+
+    def invalidate_group(self, resource: str, group: str):
+        """get(group=...) 으로 캐시한 항목 모두 무효화 (페이지별로 캐시되는 목록 응답용)"""
+        redis_client = get_redis()
+        group_key = GROUP_KEY.format(resource=resource, group=group)
+        cache_keys = redis_client.smembers(group_key)
+        with self._lock:
+            for cache_key in cache_keys:
+                self._entries.pop(cache_key, None)
+        redis_client.delete(group_key, *[REDIS_KEY.format(key=cache_key) for cache_key in cache_keys])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_cache = None
+
+
+def get_cache() -> ReadThroughCache:
+    global _cache
+    if _cache is None:
+        conf = _conf()
+        _cache = ReadThroughCache(
+            maxsize=int(conf.get("maxsize", 4096)),
+            memory_max_ttl=int(conf.get("memory_max_ttl", 30)),
+        )
+    return _cache
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 헤더 비교 (약한 비교, 여러 값 / * 지원)"""
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    return "*" in candidates or any(value.removeprefix("W/") == etag for value in candidates)
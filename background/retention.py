@@ -0,0 +1,182 @@
+# 결과 보관 정책 (Redis 메모리 절감)
+#
+# - 키 패밀리별 TTL / 압축 / 최대 길이 정책 (celeryconfig.result_retention)
+# - 진행률(progress:*)에는 큰 필드(text, chunks) 대신 요약 + 중간 결과 참조만 저장
+# - 중간 결과(intermediate:*)는 zlib 압축 후 저장
+# - 작업별 결과 백엔드 보관 기간 (celeryconfig.result_expires_by_task)
+#
+# 메모리 리포트:
+#   python -m background.retention report [--json] [--sample 1000]
+
+import argparse
+import base64
+import json
+import sys
+import zlib
+from collections import Counter, defaultdict
+
+from celery.signals import task_postrun
+
+COMPRESSED_PREFIX = "z:"
+
+# 진행률/알림에 그대로 싣지 않고 요약할 큰 필드
+LARGE_FIELDS = ("text", "chunks")
+
+
+def _conf():
+    from background.celery import celery_app
+    return celery_app.conf
+
+
+def policy(family: str) -> dict:
+    return (_conf().get("result_retention") or {}).get(family, {})
+
+
+def ttl(family: str, default: int) -> int:
+    return int(policy(family).get("ttl", default))
+
+
+def encode(family: str, payload: str) -> str:
+    """정책상 압축 대상이고 임계값 이상이면 zlib + base64 로 압축"""
+    rule = policy(family)
+    if rule.get("compress") and len(payload) >= int(rule.get("compress_min_bytes", 1024)):
+        packed = zlib.compress(payload.encode(), int(rule.get("compress_level", 6)))
+        return COMPRESSED_PREFIX + base64.b64encode(packed).decode("ascii")
+    return payload
+
+
+def decode(payload: str) -> str:
+    if payload and payload.startswith(COMPRESSED_PREFIX):
+        return zlib.decompress(base64.b64decode(payload[len(COMPRESSED_PREFIX):])).decode()
+    return payload
+
+
+def summarize(data, ref: str = None):
+    """진행률 저장용 요약 - 본문/청크 목록은 개수와 참조 키로 대체"""
+    if not isinstance(data, dict) or not any(field in data for field in LARGE_FIELDS):
+        return data
+    summary = {k: v for k, v in data.items() if k not in LARGE_FIELDS}
+    if "text" in data:
+        summary.setdefault("char_count", len(data["text"] or ""))
+    if "chunks" in data:
+        summary["chunk_count"] = len(data["chunks"] or [])
+    if ref:
+        summary["result_ref"] = ref
+    return summary
+
+
+def expires_for(task, task_kwargs: dict = None):
+    """작업 결과의 보관 기간 (초, 정책이 없으면 None)
+
+    파이프라인 묶음 작업(run_fused_stages 등)은 chain 의 최종 task_id 로 마지막 단계 결과를 저장하므로
+    묶음 작업 이름이 아니라 마지막 단계 작업 이름으로 정책을 찾습니다 (task.result_task_name).
+    """
+    resolve = getattr(task, "result_task_name", None)
+    name = resolve(task_kwargs) if resolve else task.name
+    return (_conf().get("result_expires_by_task") or {}).get(name)
+
+
+@task_postrun.connect
+def _apply_result_expiry(task_id=None, task=None, kwargs=None, **extra):
+    """작업별 결과 보관 기간 적용 (결과 저장은 postrun 이전에 끝남)"""
+    seconds = expires_for(task, kwargs)
+    if not seconds or task.request.is_eager or getattr(task, "ignore_result", False) \
+            or task.request.ignore_result:
+        return
+    backend = task.backend
+    client = getattr(backend, "client", None)
+    if client is not None and hasattr(backend, "get_key_for_task"):
+        client.expire(backend.get_key_for_task(task_id), int(seconds))
+
+
+# ===== 메모리 리포트 =====
+
+def _family(key: str) -> str:
+    if key.startswith("celery-task-meta-"):
+        return "celery-task-meta-*"
+    if key.startswith("_kombu") or key.startswith("unacked"):
+        return "kombu/unacked"
+    return key.split(":", 1)[0] + ":*" if ":" in key else key
+
+
+def memory_report(client, sample: int = 0, batch: int = 500) -> dict:
+    """SCAN + MEMORY USAGE 로 키 패밀리별 메모리 사용량 집계
+
+    sample > 0 이면 패밀리별 최대 sample 개만 측정하고 나머지는 평균으로 추정합니다.
+    """
+    families = defaultdict(lambda: {"keys": 0, "measured": 0, "bytes": 0, "no_ttl": 0})
+    queued = Counter()
+    pending = []
+
+    def flush():
+        pipe = client.pipeline(transaction=False)
+        for key in pending:
+            pipe.memory_usage(key, samples=0)
+            pipe.ttl(key)
+        values = pipe.execute()
+        for key, usage, key_ttl in zip(pending, values[0::2], values[1::2]):
+            stats = families[_family(key)]
+            stats["measured"] += 1
+            stats["bytes"] += usage or 0
+            if key_ttl == -1:
+                stats["no_ttl"] += 1
+        pending.clear()
+
+    for raw in client.scan_iter(count=batch):
+        key = raw.decode() if isinstance(raw, bytes) else raw
+        family = _family(key)
+        families[family]["keys"] += 1
+        if sample and queued[family] >= sample:
+            continue
+        queued[family] += 1
+        pending.append(key)
+        if len(pending) >= batch:
+            flush()
+    if pending:
+        flush()
+
+    for stats in families.values():
+        if stats["measured"] and stats["measured"] < stats["keys"]:
+            stats["estimated_bytes"] = int(stats["bytes"] / stats["measured"] * stats["keys"])
+        else:
+            stats["estimated_bytes"] = stats["bytes"]
+    return dict(sorted(families.items(), key=lambda item: -item[1]["estimated_bytes"]))
+
+
+def _report_clients():
+    import redis
+    from background.store import get_redis
+
+    conf = _conf()
+    clients = {"side_store(db2)": get_redis()}
+    backend_url = conf.result_backend or ""
+    if backend_url.startswith("redis"):
+        clients["result_backend"] = redis.Redis.from_url(backend_url)
+    return clients
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="결과 보관 정책 / Redis 메모리 리포트")
+    sub = parser.add_subparsers(dest="command", required=True)
+    report = sub.add_parser("report", help="키 패밀리별 Redis 메모리 사용량")
+    report.add_argument("--json", action="store_true", help="JSON 으로 출력")
+    report.add_argument("--sample", type=int, default=0, help="패밀리별 측정 키 수 상한 (0 이면 전체)")
+    args = parser.parse_args(argv)
+
+    result = {name: memory_report(client, sample=args.sample) for name, client in _report_clients().items()}
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        return
+
+    for name, families in result.items():
+        total = sum(stats["estimated_bytes"] for stats in families.values())
+        print(f"\n[{name}] 총 {total / 1024 / 1024:.2f} MiB")
+        print(f"  {'family':28s} {'keys':>10s} {'MiB':>10s} {'avg bytes':>10s} {'no TTL':>8s}")
+        for family, stats in families.items():
+            avg = stats["bytes"] / stats["measured"] if stats["measured"] else 0
+            print(f"  {family:28s} {stats['keys']:>10,d} {stats['estimated_bytes'] / 1024 / 1024:>10.2f} "
+                  f"{avg:>10.0f} {stats['no_ttl']:>8,d}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,269 @@
+# 업로드 파일 저장소 (내용 주소 기반 + 샤딩 + 참조 카운트 GC)
+#
+# - 업로드 내용의 sha256 으로 저장: {upload_storage_dir}/ab/cd/abcd....
+#   같은 내용은 한 번만 저장되고, 같은 파일명의 다른 내용은 버전으로 구분되어 덮어쓰지 않음
+# - 워커는 open_buffer() 로 mmap 기반 memoryview 를 받아 복사 없이 읽음
+# - 파이프라인이 참조를 잡고(acquire) 끝나면 놓으며(release), 참조가 0 이 되면 파일 삭제
+#   참조 감소/삭제는 WATCH/MULTI 로 원자적으로 하고, 파일 삭제와 재생성은 blob 별 잠금(blob_guard) 안에서만 합니다.
+#   그래서 release 가 0 을 본 직후 같은 내용이 다시 올라와도, 파일은 지워지지 않거나 store_upload 가 다시 씁니다.
+# - 참조 없이 남은 파일/임시 파일은 주기 작업이 정리 (background/maintenance.py)
+#
+# Redis 키
+#   blob:refs:{sha256}              참조 카운트
+#   blob:lock:{sha256}              파일 삭제/재생성 잠금 (SET NX, 토큰)
+#   uploads:{user_id}:{filename}    업로드 버전 목록 (최신이 앞, JSON, upload_max_versions 개까지)
+
+import os
+import json
+import mmap
+import hashlib
+import logging
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import BinaryIO, Dict, Union
+
+from redis.exceptions import WatchError
+
+from background.store import get_redis
+
+logger = logging.getLogger(__name__)
+
+REFS_KEY = "blob:refs:{sha256}"
+LOCK_KEY = "blob:lock:{sha256}"
+LOCK_TTL = 30  # 잠금을 잡은 프로세스가 죽어도 이 시간 뒤에는 풀림 (초)
+CHUNK_SIZE = 1024 * 1024  # 스트림 업로드를 임시 파일로 옮기는 단위
+VERSIONS_KEY = "uploads:{user_id}:{filename}"
+
+
+def _conf():
+    from background.celery import celery_app
+    return celery_app.conf
+
+
+def storage_dir() -> str:
+    return _conf().get("upload_storage_dir") or "data/blobs"
+
+
+def blob_path(sha256: str) -> str:
+    """sha256 → 샤딩된 저장 경로 (디렉토리당 파일 수 제한)"""
+    return os.path.join(storage_dir(), sha256[:2], sha256[2:4], sha256)
+
+
+def _safe_filename(filename: str) -> str:
+    return os.path.basename(filename or "") or "upload"
+
+
+@contextmanager
+def blob_guard(sha256: str):
+    """blob 별 잠금 - 파일 삭제(release, 주기 정리)와 재생성(store_upload)을 서로 배제"""
+    redis_client = get_redis()
+    key = LOCK_KEY.format(sha256=sha256)
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + LOCK_TTL
+    while not redis_client.set(key, token, ex=LOCK_TTL, nx=True):
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"blob 잠금 대기 시간 초과: {sha256[:12]}")
+        time.sleep(0.005)
+    try:
+        yield
+    finally:
+        # 내 토큰일 때만 삭제 (LOCK_TTL 이 지나 다른 쪽이 잡은 잠금은 건드리지 않음)
+        with redis_client.pipeline() as pipe:
+            try:
+                pipe.watch(key)
+                if pipe.get(key) == token:
+                    pipe.multi()
+                    pipe.delete(key)
+                    pipe.execute()
+            except WatchError:
+                pass
+
+
+def _write_blob(path: str, content: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # 임시 파일에 쓴 뒤 rename → 동시 업로드/읽기 중에도 부분 파일이 보이지 않음
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".upload-")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def _spool(stream: BinaryIO, max_bytes: int = None):
+    """스트림을 CHUNK_SIZE 씩 임시 파일에 옮기며 sha256 계산 - (sha256, 크기, 임시 파일 경로)
+
+    max_bytes 를 넘으면 임시 파일을 지우고 ValueError (압축 멤버가 선언한 크기보다 큰 경우 등)
+    """
+    root = storage_dir()
+    os.makedirs(root, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=root, prefix=".upload-")
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+                size += len(chunk)
+                if max_bytes is not None and size > max_bytes:
+                    raise ValueError(f"업로드 크기 제한 초과: {max_bytes:,} bytes")
+                digest.update(chunk)
+                f.write(chunk)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return digest.hexdigest(), size, tmp_path
+
+
+def store_upload(user_id: str, filename: str, content: Union[bytes, BinaryIO], acquire: bool = True,
+                 max_bytes: int = None) -> Dict:
+    """업로드 저장 후 메타데이터 반환
+
+    content 는 bytes 또는 바이너리 스트림 (스트림은 CHUNK_SIZE 씩 읽어 메모리에 전부 올리지 않음)
+    acquire=True 이면 이 업로드를 처리할 파이프라인 몫의 참조를 미리 잡습니다.
+    참조는 잠금 안에서 파일이 자리 잡은 뒤에 잡으므로, 잠금 대기 시간 초과나 쓰기 실패로 끝나도 남지 않습니다.
+    """
+    if isinstance(content, (bytes, bytearray, memoryview)):
+        sha256, size, tmp_path = hashlib.sha256(content).hexdigest(), len(content), None
+    else:
+        sha256, size, tmp_path = _spool(content, max_bytes)
+    path = blob_path(sha256)
+
+    redis_client = get_redis()
+    try:
+        with blob_guard(sha256):
+            try:
+                os.utime(path)  # 이미 있는 내용 - 고아 파일 정리(background/maintenance.py)의 유예 기간을 새로 시작
+            except FileNotFoundError:
+                if tmp_path:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    os.replace(tmp_path, path)
+                    tmp_path = None
+                else:
+                    _write_blob(path, content)
+            if acquire:
+                # 파일 삭제(release, 주기 정리)는 같은 잠금 안에서만 하므로 여기서 잡은 참조의 파일은 남음
+                redis_client.incr(REFS_KEY.format(sha256=sha256))
+    finally:
+        if tmp_path:
+            os.unlink(tmp_path)  # 같은 내용이 이미 있음
+
+    filename = _safe_filename(filename)
+    record = {
+        "sha256": sha256,
+        "path": path,
+        "filename": filename,
+        "size": size,
+        "user_id": user_id,
+        "uploaded_at": datetime.now().isoformat(),
+    }
+    versions_key = VERSIONS_KEY.format(user_id=user_id, filename=filename)
+    latest = redis_client.lrange(versions_key, 0, 0)
+    if latest and json.loads(latest[0])["sha256"] == sha256:
+        record["version"] = json.loads(latest[0])["version"]  # 같은 내용 재업로드
+    else:
+        # 오래된 기록은 잘리므로 목록 길이가 아닌 최신 버전에서 번호를 이어감
+        record["version"] = (json.loads(latest[0])["version"] if latest else 0) + 1
+        redis_client.lpush(versions_key, json.dumps({
+            "sha256": sha256,
+            "size": size,
+            "uploaded_at": record["uploaded_at"],
+            "version": record["version"],
+        }))
+        redis_client.ltrim(versions_key, 0, int(_conf().get("upload_max_versions") or 20) - 1)
+    return record
+
+
+def acquire(sha256: str) -> int:
+    return get_redis().incr(REFS_KEY.format(sha256=sha256))
+
+
+def _decrement(key: str) -> int:
+    """참조 감소 - 0 이하가 되면 같은 트랜잭션에서 키 삭제 (그 사이 INCR 가 끼면 재시도)"""
+    with get_redis().pipeline() as pipe:
+        while True:
+            try:
+                pipe.watch(key)
+                remaining = int(pipe.get(key) or 0) - 1
+                pipe.multi()
+                if remaining > 0:
+                    pipe.set(key, remaining)
+                else:
+                    pipe.delete(key)
+                pipe.execute()
+                return max(remaining, 0)
+            except WatchError:
+                continue
+
+
+def drop_empty_refs(key: str) -> bool:
+    """0 이하로 남은 참조 카운트 키 삭제 - 확인과 삭제 사이에 INCR 가 끼면 건드리지 않음"""
+    with get_redis().pipeline() as pipe:
+        try:
+            pipe.watch(key)
+            refs = pipe.get(key)
+            if refs is None or int(refs) > 0:
+                return False
+            pipe.multi()
+            pipe.delete(key)
+            pipe.execute()
+            return True
+        except WatchError:
+            return False
+
+
+def release(sha256: str) -> int:
+    """참조 반환 - 0 이 되면 파일 삭제, 남은 참조 수 반환"""
+    redis_client = get_redis()
+    key = REFS_KEY.format(sha256=sha256)
+    with blob_guard(sha256):
+        remaining = _decrement(key)
+        if remaining > 0:
+            return remaining
+        # 감소 후 잠금 안에서 다시 확인 - 그 사이 같은 내용이 다시 업로드되어 참조가 생겼으면 파일 유지
+        refs = int(redis_client.get(key) or 0)
+        if refs > 0:
+            return refs
+        path = blob_path(sha256)
+        try:
+            size = os.path.getsize(path)
+            os.unlink(path)
+            logger.info(f"[storage] 참조 0 - 파일 삭제: {sha256[:12]} ({size:,} bytes)")
+        except FileNotFoundError:
+            pass
+        return 0
+
+
+def list_versions(user_id: str, filename: str) -> list:
+    versions_key = VERSIONS_KEY.format(user_id=user_id, filename=_safe_filename(filename))
+    return [json.loads(v) for v in get_redis().lrange(versions_key, 0, -1)]
+
+
+@contextmanager
+def open_buffer(path: str):
+    """파일을 mmap 으로 열어 읽기 전용 memoryview 제공 (복사 없이 읽기)
+
+    반환된 memoryview 는 with 블록 안에서만 유효합니다.
+    """
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            yield memoryview(b"")
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                yield view
+            finally:
+                view.release()
+
+
+def read_text(path: str, encoding: str = "utf-8") -> str:
+    """mmap 버퍼에서 바로 디코딩 (중간 bytes 복사 없음)"""
+    with open_buffer(path) as view:
+        return str(view, encoding, "replace")
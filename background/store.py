@@ -0,0 +1,165 @@
+# 파이프라인 상태 저장소 (진행률 / 중간 결과 / 알림)
+#
+# web 과 worker 가 공통으로 사용하는 가벼운 모듈입니다.
+# 작업 모듈을 임포트하지 않고, Redis 클라이언트는 처음 사용할 때 생성합니다.
+
+import os
+import json
+import hashlib
+import logging
+from datetime import datetime
+from typing import Dict, Any, Optional
+
+from background.profiling import span
+from background import retention
+from background.metrics import IDEMPOTENT_SKIPS_TOTAL
+
+logger = logging.getLogger(__name__)
+
+_redis_client = None
+_binary_client = None
+
+
+def _connect(decode_responses: bool):
+    import redis
+    from background.metrics import InstrumentedRedis
+
+    return InstrumentedRedis(redis.Redis(
+        host=os.environ.get("REDIS_HOST", "localhost"),
+        port=int(os.environ.get("REDIS_PORT", "6379")),
+        db=2,  # 메인 Celery와 다른 DB 사용
+        decode_responses=decode_responses
+    ))
+
+
+def get_redis():
+    """중간 결과 저장용 Redis 클라이언트 (지연 생성, 명령별 지연 시간 메트릭 기록)"""
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = _connect(decode_responses=True)
+    return _redis_client
+
+
+def get_binary_redis():
+    """바이너리 값(임베딩 벡터 등)용 클라이언트 - 같은 DB, 응답을 디코딩하지 않음"""
+    global _binary_client
+    if _binary_client is None:
+        _binary_client = _connect(decode_responses=False)
+    return _binary_client
+
+
+def set_redis(client, binary_client=None):
+    """저장소 클라이언트 교체 (벤치마크/로컬 실행용, 바이너리 클라이언트를 생략하면 같은 클라이언트 사용)"""
+    global _redis_client, _binary_client
+    _redis_client = client
+    _binary_client = binary_client or client
+
+
+class DocumentProcessor:
+    """문서 처리 상태 관리 클래스"""
+
+    @staticmethod
+    def save_progress(task_id: str, step: str, data: Dict[Any, Any], progress: int):
+        """진행률과 중간 결과 저장"""
+        progress_data = {
+            "task_id": task_id,
+            "current_step": step,
+            "progress": progress,
+            "timestamp": datetime.now().isoformat(),
+            # 본문/청크는 중간 결과에만 두고 진행률에는 요약 + 참조만 저장
+            "data": retention.summarize(data, ref=f"intermediate:{task_id}:{step}"),
+            "status": "processing"
+        }
+        with span("serialize"):
+            payload = json.dumps(progress_data)
+        get_redis().setex(f"progress:{task_id}", retention.ttl("progress", 3600), payload)
+        # 단계 루프에서 항목마다 호출되므로 DEBUG + 지연 포맷 (INFO 운영 환경에서는 포맷 비용 없음)
+        logger.debug("진행률 저장: %s - %s (%s%%)", task_id, step, progress)
+
+    @staticmethod
+    def get_progress(task_id: str) -> Optional[Dict]:
+        """진행률 조회"""
+        data = get_redis().get(f"progress:{task_id}")
+        return json.loads(data) if data else None
+
+    @staticmethod
+    def save_intermediate_result(task_id: str, step: str, result: Dict[Any, Any]):
+        """중간 결과 저장 (재시작 가능하도록)"""
+        key = f"intermediate:{task_id}:{step}"
+        with span("serialize"):
+            payload = retention.encode("intermediate", json.dumps(result))
+        get_redis().setex(key, retention.ttl("intermediate", 7200), payload)  # 기본 2시간 보관
+        logger.debug("중간 결과 저장: %s - %s", step, task_id)
+
+    @staticmethod
+    def get_intermediate_result(task_id: str, step: str) -> Optional[Dict]:
+        """중간 결과 조회"""
+        key = f"intermediate:{task_id}:{step}"
+        data = get_redis().get(key)
+        return json.loads(retention.decode(data)) if data else None
+
+def send_notification(task_id: str, step: str, status: str, message: str, data: Dict = None):
+    """알림 시스템 (이메일/슬랙) - 재시도/재전달로 같은 알림이 다시 오면 보내지 않음
+
+    보낸 알림은 작업마다 집합 하나(notified:{task_id})에 단계:상태:메시지 해시로 모으고, 진행률과 같이
+    만료됩니다. 같은 단계의 서로 다른 알림(진행 경고, 오류 후 실패 안내 등)은 각각 보냅니다.
+    """
+    digest = hashlib.sha1(message.encode()).hexdigest()
+    pipe = get_redis().pipeline()
+    pipe.sadd(f"notified:{task_id}", f"{step}:{status}:{digest}")
+    pipe.expire(f"notified:{task_id}", retention.ttl("progress", 3600))
+    if not pipe.execute()[0]:
+        IDEMPOTENT_SKIPS_TOTAL.labels(task="notification", reason="duplicate_effect").inc()
+        logger.debug("중복 알림 생략: %s - %s", task_id, message)
+        return
+
+    notification_data = {
+        "task_id": task_id,
+        "step": step,
+        "status": status,
+        "message": message,
+        "timestamp": datetime.now().isoformat(),
+        "data": retention.summarize(data or {})
+    }
+
+    # 실제로는 이메일/슬랙 API 호출
+    if status == "error":
+        logger.error("🚨 알림: %s", message, extra={"step": step})
+        # send_slack_alert(notification_data)
+        # send_email_alert(notification_data)
+    elif status == "success":
+        logger.info("✅ 알림: %s", message, extra={"step": step})
+        # send_slack_notification(notification_data)
+    elif status == "warning":
+        logger.warning("⚠️ 알림: %s", message, extra={"step": step})
+
+    # 알림 히스토리 저장
+    with span("serialize"):
+        payload = json.dumps(notification_data)
+    key = f"notifications:{task_id}"
+    redis_client = get_redis()
+    redis_client.lpush(key, payload)
+    redis_client.ltrim(key, 0, int(retention.policy("notifications").get("max_items", 100)) - 1)
+    redis_client.expire(key, retention.ttl("notifications", 86400))  # 기본 24시간 보관
+
+# 진행률 추적 전용 함수
+def get_pipeline_progress(task_id: str) -> Dict:
+    """파이프라인 전체 진행률 조회"""
+    progress_data = DocumentProcessor.get_progress(task_id)
+    if not progress_data:
+        return {"error": "진행률 정보를 찾을 수 없습니다"}
+
+    return {
+        "task_id": task_id,
+        "current_step": progress_data.get("current_step"),
+        "overall_progress": progress_data.get("progress", 0),
+        "status": progress_data.get("status"),
+        "last_updated": progress_data.get("timestamp"),
+        "details": progress_data.get("data", {})
+    }
+
+# 알림 히스토리 조회
+def get_notification_history(task_id: str) -> list:
+    """작업의 알림 히스토리 조회"""
+    notifications = get_redis().lrange(f"notifications:{task_id}", 0, -1)
+    return [json.loads(notif) for notif in notifications]
@@ -1,13 +1,14 @@
 
 from celery import shared_task
+from background import clock
 
-import time, logging
+import logging
 
 @shared_task(
     queue = "default-add"
 )
 def add(x, y):
-    time.sleep(10)
+    clock.sleep(10)
 
     logging.info(f"{x=}, {y=}")
     logging.info(f"Task Done : {x} + {y} = {x + y}")
@@ -1,5 +1,7 @@
 from background.celery import celery_app
+from background import batch, storage
 import time
+import itertools
 import logging
 import os
 
@@ -14,15 +16,21 @@ def process_document(self, file_path: str, operation: str = "analyze"):
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"파일을 찾을 수 없습니다: {file_path}")
     
-    # 문서 처리 시뮬레이션
-    for i in range(10):
-        time.sleep(0.3)  # 실제 처리 시뮬레이션
-        progress = (i + 1) * 10
-        logger.info(f"[{task_id}] 진행률: {progress}%")
+    # 업로드 저장소 파일은 mmap 버퍼로 읽음 (복사 없이 디코딩)
+    text = storage.read_text(file_path)
+    
+    # 한 번 순회로 문서 통계 계산 (단계별 대기 없이 바로 처리)
+    lines = text.splitlines()
+    stats = {
+        "line_count": len(lines),
+        "word_count": sum(len(line.split()) for line in lines),
+    }
     
     result = {
         "file_path": file_path,
         "operation": operation,
+        "char_count": len(text),
+        **stats,
         "status": "completed",
         "processed_at": time.time(),
         "task_id": task_id
@@ -32,52 +40,84 @@ def process_document(self, file_path: str, operation: str = "analyze"):
     return result
 
 @celery_app.task(bind=True, soft_time_limit=180, time_limit=240)
-def process_document_batch(self, file_paths: list):
-    """문서 배치 처리 작업"""
+def process_document_batch(self, file_paths: list, user_id: str = "batch", max_in_flight: int = None):
+    """문서 배치 처리 작업 - 파일들을 배치로 등록하고 고급 파이프라인으로 흘려보냄
+
+    파일 수 제한 없이 batch_max_in_flight 개씩 동시에 처리되며,
+    진행 상황은 반환된 batch_id 로 조회합니다.
+    """
     task_id = self.request.id
     logger.info(f"[{task_id}] 문서 배치 처리 시작: {len(file_paths)}개 파일")
-    
-    if len(file_paths) > 10:
-        raise ValueError("배치 크기는 10개 파일을 초과할 수 없습니다")
-    
-    results = []
-    for i, file_path in enumerate(file_paths):
-        try:
-            # 각 파일 처리 시뮬레이션
-            time.sleep(0.2)
-            
-            if os.path.exists(file_path):
-                result = {
-                    "file_path": file_path,
-                    "status": "success",
-                    "processed_at": time.time()
-                }
-            else:
-                result = {
-                    "file_path": file_path,
-                    "status": "failed",
-                    "error": "파일을 찾을 수 없음"
-                }
-            
-            results.append(result)
-            progress = ((i + 1) / len(file_paths)) * 100
-            logger.info(f"[{task_id}] 진행률: {progress:.1f}% ({i + 1}/{len(file_paths)})")
-            
-        except Exception as e:
-            results.append({
-                "file_path": file_path,
-                "status": "failed",
-                "error": str(e)
-            })
-    
-    successful = sum(1 for r in results if r["status"] == "success")
-    logger.info(f"[{task_id}] 문서 배치 처리 완료: {successful}/{len(file_paths)} 성공")
-    
+
+    batch_id = batch.create(user_id, {"type": "paths", "files": len(file_paths)}, max_in_flight)
+    missing = []
+    for file_path in file_paths:
+        if not os.path.isfile(file_path):
+            missing.append(file_path)
+            continue
+        with open(file_path, "rb") as f:
+            upload = storage.store_upload(user_id, os.path.basename(file_path), f)
+        batch.add_file(batch_id, upload, filename=file_path)
+
+    batch.finish_expanding(batch_id)
+    dispatched = batch.pump(batch_id)
+    logger.info(f"[{task_id}] 배치 등록 완료: {batch_id} - {len(file_paths) - len(missing)}개 등록, "
+                f"{dispatched}개 발행, {len(missing)}개 누락")
+
     return {
-        "total_files": len(file_paths),
-        "successful": successful,
-        "failed": len(file_paths) - successful,
-        "results": results,
+        "batch_id": batch_id,
+        "total_files": len(file_paths) - len(missing),
+        "missing": missing,
         "task_id": task_id
     }
 
+@celery_app.task(bind=True, ignore_result=True)
+def ingest_document_batch(self, batch_id: str, directory: str = None, archives: list = None):
+    """배치 입력 확장 - 디렉토리/압축 파일을 한 파일씩 저장소에 기록하며 바로 발행
+
+    전체 목록을 메모리에 만들지 않고 스트리밍으로 등록하므로 수만 개 파일도 처리할 수 있습니다.
+    파일 내용도 한 번에 읽지 않고 저장소로 흘려보내며, 크기/개수 제한에 걸린 파일은 skipped 로 기록합니다.
+    이미 업로드된 파일은 web 에서 등록되어 있고, 여기서는 발행만 시작합니다.
+    """
+    meta = batch.get_meta(batch_id)
+    if not meta:
+        logger.warning(f"[batch] 배치를 찾을 수 없음: {batch_id}")
+        return
+    user_id = meta["user_id"]
+    max_files = int(celery_app.conf.get("batch_max_files") or 100000)
+    max_member_bytes = batch.max_member_bytes()
+
+    sources = []
+    if directory:
+        sources.append(("", batch.iter_directory(batch.resolve_directory(directory))))
+    for archive in archives or []:
+        sources.append((archive["filename"] + "/", batch.iter_archive(archive["path"])))
+    entries = ((prefix + name, size, opener, reason)
+               for prefix, items in sources for name, size, opener, reason in items)
+
+    registered = 0
+    try:
+        for name, size, opener, reason in itertools.islice(entries, max_files):
+            if reason is None:
+                try:
+                    with opener() as stream:
+                        upload = storage.store_upload(user_id, name, stream, max_bytes=max_member_bytes)
+                except ValueError:
+                    reason = batch.MEMBER_TOO_LARGE  # 선언한 크기보다 실제 내용이 큼
+            if reason:
+                batch.skip_file(batch_id, name, size, reason)
+                continue
+            batch.add_file(batch_id, upload, filename=name)
+            registered += 1
+            # 등록하는 동안에도 빈 슬롯만큼 바로 처리 시작
+            if registered % 50 == 0:
+                batch.pump(batch_id)
+        if next(entries, None) is not None:
+            logger.warning(f"[batch] {batch_id} 최대 파일 수 {max_files} 초과 - 나머지 생략")
+    finally:
+        for archive in archives or []:
+            storage.release(archive["sha256"])  # 압축 파일은 풀어 등록한 뒤 참조 반환
+        batch.finish_expanding(batch_id)
+        batch.pump(batch_id)
+
+    logger.info(f"[batch] {batch_id} 입력 확장 완료 - {registered}개 파일 등록")
@@ -0,0 +1,44 @@
+from background.celery import celery_app
+from background import idempotency, maintenance
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 주기 정리 작업 (celeryconfig.beat_schedule 에 따라 celery beat 가 발행)
+# 한 번의 실행이 주기보다 길어져도 겹쳐 돌지 않도록 실행 중 표시(SET NX)를 잡고, 끝나면 놓습니다.
+# 작업이 죽으면 표시는 lock_ttl 후 자동으로 풀립니다.
+
+
+def _exclusive(name: str, run):
+    conf = celery_app.conf.get("maintenance") or {}
+    if not idempotency.claim("maintenance", name, ttl=int(conf.get("lock_ttl", 1800))):
+        logger.info(f"[maintenance] {name} 이전 실행이 아직 진행 중 - 건너뜀")
+        return {"skipped": True}
+    try:
+        return run()
+    finally:
+        idempotency.release("maintenance", name)
+
+
+@celery_app.task(ignore_result=True, soft_time_limit=1500, time_limit=1800)
+def sweep_orphaned_uploads():
+    """참조 없는 업로드 파일 / 오래된 임시 파일 / 빈 샤드 디렉토리 정리"""
+    return _exclusive("sweep_orphaned_uploads", maintenance.sweep_uploads)
+
+
+@celery_app.task(ignore_result=True, soft_time_limit=1500, time_limit=1800)
+def sweep_orphaned_keys():
+    """고아 중간 결과 / 오래된 알림 목록 / 0 이하 참조 카운트 키 정리"""
+    return _exclusive("sweep_orphaned_keys", maintenance.sweep_keys)
+
+
+@celery_app.task(ignore_result=True, soft_time_limit=1500, time_limit=1800)
+def compact_vector_index():
+    """문서/청크 색인과 임베딩 캐시 LRU 압축"""
+    return _exclusive("compact_vector_index", maintenance.compact_index)
+
+
+@celery_app.task(ignore_result=True, soft_time_limit=1500, time_limit=1800)
+def prewarm_embedding_cache():
+    """반복되는 본문(템플릿 문단 등)의 임베딩 캐시 예열"""
+    return _exclusive("prewarm_embedding_cache", maintenance.prewarm_embeddings)
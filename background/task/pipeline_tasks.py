@@ -0,0 +1,125 @@
+from background.celery import celery_app
+from background import pipeline_spec
+from background.deadline import StageYield, TRANSIENT_ERRORS
+from background.pipeline import JOIN_SHARDS_TASK, group_signature, signature, stage_options
+from celery import Task, chain, chord, group
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 파이프라인 스펙(background/pipeline_spec.py)의 묶음/분할 실행을 담당하는 작업
+#   run_fused_stages   fuse 로 묶인 단계들을 한 작업 안에서 차례로 실행
+#   fan_out_stage      parallelism > 1 인 단계를 chord(샤드들 → join_stage_shards)로 교체
+#   join_stage_shards  샤드 결과를 모아 단계를 한 번 더 실행 (샤드가 채운 캐시를 읽어 결과 구성)
+
+
+def _priority(request):
+    return (request.delivery_info or {}).get("priority")
+
+
+def _result_options(request) -> dict:
+    """replace() 로 이어지는 마지막 작업에 넘길 결과 저장 옵션 (중간 묶음이면 ignore_result)"""
+    return {"ignore_result": True} if request.ignore_result else {}
+
+
+class PipelineGroupTask(Task):
+    """묶음 작업 기반 클래스 - 재시도 메시지에도 chain 이 정한 ignore_result 를 유지"""
+
+    def signature_from_request(self, request=None, *args, **kwargs):
+        sig = super().signature_from_request(request, *args, **kwargs)
+        return sig.set(**_result_options(request or self.request))
+
+    def result_task_name(self, kwargs: dict) -> str:
+        """결과 보관 기간(result_expires_by_task)을 찾을 작업 이름 - 묶음이 대신 실행한 마지막 단계 작업"""
+        names = (kwargs or {}).get("stages") or [(kwargs or {}).get("stage")]
+        return pipeline_spec.stage(names[-1])["task"] if names[-1] else self.name
+
+
+def _run_inline(task, request, args, kwargs, soft_limit):
+    """단계 작업을 현재 작업 안에서 실행 (같은 task_id, 남은 시간 예산 전달)
+
+    fused=True 요청에서는 이어하기가 replace() 대신 StageYield 로 올라오고,
+    일시적 오류는 바깥 묶음 작업의 재시도로 처리됩니다 (called_directly 요청의 retry 는 원래 예외를 다시 발생).
+    """
+    task.push_request(
+        id=request.id,
+        root_id=request.root_id,
+        parent_id=request.parent_id,
+        delivery_info=request.delivery_info,
+        is_eager=request.is_eager,
+        timelimit=(None, soft_limit),
+        fused=True,
+    )
+    try:
+        return task.run(*args, **kwargs)
+    finally:
+        task.pop_request()
+
+
+@celery_app.task(
+    bind=True,
+    base=PipelineGroupTask,
+    autoretry_for=TRANSIENT_ERRORS,
+    retry_backoff=5,
+    retry_backoff_max=120,
+    max_retries=3
+)
+def run_fused_stages(self, stage_input, stages: list, first_kwargs: dict = None):
+    """묶인 단계를 한 작업에서 실행 - 단계 사이 브로커 왕복/결과 직렬화 생략
+
+    재시도되면 앞 단계는 중간 결과를 재사용하므로 처음부터 다시 처리하지 않습니다.
+    """
+    started = time.monotonic()
+    soft_limit = (self.request.timelimit or (None, None))[1]
+    value = stage_input
+    for index, name in enumerate(stages):
+        stage = pipeline_spec.stage(name)
+        remaining = max(soft_limit - (time.monotonic() - started), 0.001) if soft_limit else None
+        kwargs = (first_kwargs or {}) if index == 0 else {}
+        try:
+            value = _run_inline(celery_app.tasks[stage["task"]], self.request, (value,), kwargs, remaining)
+        except StageYield as exc:
+            # 시간 예산 소진 - 이 단계의 이어하기 + 남은 단계를 같은 task_id 로 이어서 발행
+            priority = _priority(self.request)
+            continuation = exc.signature.set(task_id=self.request.id, **stage_options([stage], priority))
+            rest = [pipeline_spec.stage(rest_name) for rest_name in stages[index + 1:]]
+            logger.info(f"[{self.request.id}] 묶음 실행 중 {name} 이어하기 - 남은 단계 {len(rest)}개 함께 발행")
+            if rest:
+                continuation.set(ignore_result=True)
+                return self.replace(chain(continuation, group_signature(rest, priority=priority)
+                                          .set(**_result_options(self.request))))
+            return self.replace(continuation.set(**_result_options(self.request)))
+    return value
+
+
+@celery_app.task(bind=True, base=PipelineGroupTask)
+def fan_out_stage(self, stage_input, stage: str):
+    """단계를 parallelism 개 샤드로 나눠 chord 로 실행 (같은 task_id 로 교체되어 chain 은 그대로 이어짐)
+
+    샤드 작업은 결과를 저장하지 않습니다 (celeryconfig.task_annotations 의 ignore_result).
+    chord 합류 카운터에는 샤드별 요약(생성 수)만 넘어가고, join 은 샤드가 side store 의 임베딩 캐시에
+    기록한 벡터로 전체 결과를 다시 구성합니다.
+    """
+    spec_stage = pipeline_spec.stage(stage)
+    shard_count = int(spec_stage.get("parallelism", 1))
+    options = stage_options([spec_stage], _priority(self.request))
+    shards = group(
+        signature(spec_stage["task"], stage_input, kwargs={"shard": [index, shard_count]}, **options)
+        for index in range(shard_count)
+    )
+    join = signature(JOIN_SHARDS_TASK, kwargs={"stage": stage, "stage_input": stage_input},
+                     **({"priority": options["priority"]} if "priority" in options else {}),
+                     **_result_options(self.request))
+    logger.info(f"[{self.request.id}] {stage} {shard_count}개 샤드로 분할 실행")
+    return self.replace(chord(shards, join))
+
+
+@celery_app.task(bind=True, base=PipelineGroupTask)
+def join_stage_shards(self, shard_results: list, stage: str, stage_input):
+    """샤드 결과를 넘겨 단계를 한 번 더 실행 - 샤드가 캐시에 남긴 결과로 전체 결과를 구성"""
+    spec_stage = pipeline_spec.stage(stage)
+    options = stage_options([spec_stage], _priority(self.request))
+    return self.replace(signature(spec_stage["task"], stage_input,
+                                  kwargs={"shard_results": shard_results}, **options,
+                                  **_result_options(self.request)))
@@ -1,99 +1,51 @@
 from background.celery import celery_app
 import os
-import time
-import json
 import logging
-from datetime import datetime, timedelta
-from typing import Dict, Any, Optional
-from celery import chain, current_task
-from celery.exceptions import SoftTimeLimitExceeded
-import redis
-
-# Redis 연결 (중간 결과 저장용)
-redis_client = redis.Redis(
-    host=os.environ.get("REDIS_HOST", "localhost"),
-    port=int(os.environ.get("REDIS_PORT", "6379")),
-    db=2,  # 메인 Celery와 다른 DB 사용
-    decode_responses=True
+from datetime import datetime
+from typing import Dict
+from celery.exceptions import Ignore, SoftTimeLimitExceeded
+from background.metrics import track_stage, count_items
+from background.profiling import span
+from background.log import sampled
+from background.deadline import StageBudget, TRANSIENT_ERRORS, continue_stage
+from background.idempotency import IdempotentTask
+from background.chunking import content_hash, scope_for, split_boundaries, vector_ids
+from background import batch, clock, documents, embedding_cache, fair_queue, pipeline_spec, storage
+from background.store import (
+    get_redis,
+    DocumentProcessor,
+    send_notification,
+    get_pipeline_progress,
+    get_notification_history,
 )
+from background.pipeline import process_document_pipeline_advanced
 
-# 구조화된 로깅 설정
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
 
-class DocumentProcessor:
-    """문서 처리 상태 관리 클래스"""
-    
-    @staticmethod
-    def save_progress(task_id: str, step: str, data: Dict[Any, Any], progress: int):
-        """진행률과 중간 결과 저장"""
-        progress_data = {
-            "task_id": task_id,
-            "current_step": step,
-            "progress": progress,
-            "timestamp": datetime.now().isoformat(),
-            "data": data,
-            "status": "processing"
-        }
-        redis_client.setex(f"progress:{task_id}", 3600, json.dumps(progress_data))
-        logger.info(f"진행률 저장: {task_id} - {step} ({progress}%)")
-    
-    @staticmethod
-    def get_progress(task_id: str) -> Optional[Dict]:
-        """진행률 조회"""
-        data = redis_client.get(f"progress:{task_id}")
-        return json.loads(data) if data else None
-    
-    @staticmethod
-    def save_intermediate_result(task_id: str, step: str, result: Dict[Any, Any]):
-        """중간 결과 저장 (재시작 가능하도록)"""
-        key = f"intermediate:{task_id}:{step}"
-        redis_client.setex(key, 7200, json.dumps(result))  # 2시간 보관
-        logger.info(f"중간 결과 저장: {step} - {task_id}")
-    
-    @staticmethod
-    def get_intermediate_result(task_id: str, step: str) -> Optional[Dict]:
-        """중간 결과 조회"""
-        key = f"intermediate:{task_id}:{step}"
-        data = redis_client.get(key)
-        return json.loads(data) if data else None
+def __getattr__(name):
+    # 기존 코드 호환: sample_tasks.redis_client 는 지연 생성 클라이언트를 가리킴
+    if name == "redis_client":
+        return get_redis()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-def send_notification(task_id: str, step: str, status: str, message: str, data: Dict = None):
-    """알림 시스템 (이메일/슬랙)"""
-    notification_data = {
-        "task_id": task_id,
-        "step": step,
-        "status": status,
-        "message": message,
-        "timestamp": datetime.now().isoformat(),
-        "data": data or {}
-    }
-    
-    # 실제로는 이메일/슬랙 API 호출
-    if status == "error":
-        logger.error(f"🚨 알림: {message}")
-        # send_slack_alert(notification_data)
-        # send_email_alert(notification_data)
-    elif status == "success":
-        logger.info(f"✅ 알림: {message}")
-        # send_slack_notification(notification_data)
-    elif status == "warning":
-        logger.warning(f"⚠️ 알림: {message}")
-    
-    # 알림 히스토리 저장
-    redis_client.lpush(f"notifications:{task_id}", json.dumps(notification_data))
-    redis_client.expire(f"notifications:{task_id}", 86400)  # 24시간 보관
+# 구조화된 로깅 설정
+logger = logging.getLogger(__name__)
 
 @celery_app.task(
     bind=True,
     soft_time_limit=120,  # 2분 소프트 타임아웃
     time_limit=180,       # 3분 하드 타임아웃
-    autoretry_for=(Exception,), # 예외 타입을 작성하면 됨
-    # dont_autoretry_for=(FileNotFoundError,), # 예외 타입을 작성하면 됨
-    retry_kwargs={'max_retries': 3, 'countdown': 60}
+    autoretry_for=TRANSIENT_ERRORS, # 일시적 오류만 재시도 (타임아웃/입력 오류는 재시도해도 같은 결과)
+    retry_backoff=5,      # 5, 10, 20 ... 초 (지터 포함)
+    retry_backoff_max=120,
+    max_retries=3         # 시간 제한/재시도 횟수는 celeryconfig.document_pipeline 스펙 값으로 덮어씀
 )
-def extract_text_advanced(self, file_path: str, resume_data: Dict = None):
-    """1단계: 고급 텍스트 추출 (타임아웃, 로깅, 재시작 가능)"""
+@track_stage("텍스트_추출")
+def extract_text_advanced(self, file_path: str, resume_data: Dict = None,
+                          user_id: str = None, filename: str = None):
+    """1단계: 고급 텍스트 추출 (타임아웃, 로깅, 재시작 가능)
+
+    user_id/filename 은 다음 단계로 전달되어 같은 파일의 이전 색인과 비교하는 데 사용됩니다.
+    """
     task_id = self.request.id
     step_name = "텍스트_추출"
     
@@ -129,21 +81,25 @@ def extract_text_advanced(self, file_path: str, resume_data: Dict = None):
         # 진행률 업데이트
         DocumentProcessor.save_progress(task_id, step_name, {"file_path": file_path, "file_size": file_size}, 25)
         
-        # 실제 텍스트 추출 작업 시뮬레이션
-        extracted_text = f"문서 내용 from {os.path.basename(file_path)} (크기: {file_size} bytes)"
+        # 텍스트 추출 (mmap 버퍼에서 바로 디코딩 - 파일 전체를 bytes 로 복사하지 않음)
+        with span("read"):
+            extracted_text = storage.read_text(file_path)
         
         # 처리 시간 시뮬레이션 (타임아웃 테스트용)
         for i in range(10):
-            time.sleep(0.2)
-            progress = 25 + (i + 1) * 7.5
-            DocumentProcessor.save_progress(task_id, step_name, {
-                "file_path": file_path,
-                "file_size": file_size,
-                "processing": f"청크 {i+1}/10 처리 중"
-            }, int(progress))
+            with span("loop_body"):
+                clock.sleep(0.2)
+                progress = 25 + (i + 1) * 7.5
+                DocumentProcessor.save_progress(task_id, step_name, {
+                    "file_path": file_path,
+                    "file_size": file_size,
+                    "processing": f"청크 {i+1}/10 처리 중"
+                }, int(progress))
         
         result = {
             "file_path": file_path,
+            "user_id": user_id,
+            "filename": filename,
             "text": extracted_text,
             "char_count": len(extracted_text),
             "file_size": file_size,
@@ -154,6 +110,7 @@ def extract_text_advanced(self, file_path: str, resume_data: Dict = None):
         # 중간 결과 저장
         DocumentProcessor.save_intermediate_result(task_id, step_name, result)
         DocumentProcessor.save_progress(task_id, step_name, result, 100)
+        count_items(step_name, "bytes", file_size)
         
         # 성공 알림
         send_notification(task_id, step_name, "success", 
@@ -177,11 +134,14 @@ def extract_text_advanced(self, file_path: str, resume_data: Dict = None):
     bind=True, # 
     soft_time_limit=90,
     time_limit=120,
-    autoretry_for=(Exception,),
-    retry_kwargs={'max_retries': 3, 'countdown': 30}
+    autoretry_for=TRANSIENT_ERRORS,
+    retry_backoff=5,
+    retry_backoff_max=120,
+    max_retries=3
 )
-def split_text_chunks_advanced(self, extract_result: Dict):
-    """2단계: 고급 텍스트 청킹"""
+@track_stage("텍스트_청킹")
+def split_text_chunks_advanced(self, extract_result: Dict, continuation: int = 0):
+    """2단계: 고급 텍스트 청킹 (시간 예산이 부족하면 체크포인트 후 이어하기)"""
     task_id = self.request.id
     step_name = "텍스트_청킹"
     
@@ -205,37 +165,78 @@ def split_text_chunks_advanced(self, extract_result: Dict):
             return intermediate
         
         text = extract_result["text"]
-        chunk_size = 500
         
-        # 청킹 처리
-        chunks = []
+        # 청킹 처리 (내용 기반 경계 → 수정된 부분 주변 청크만 바뀜)
+        # 이어하기/재시도면 체크포인트의 청크부터 계속
+        checkpoint_step = f"{step_name}_체크포인트"
+        checkpoint = DocumentProcessor.get_intermediate_result(task_id, checkpoint_step) or {}
+        chunks = checkpoint.get("chunks", [])
+        resume_at = offset = checkpoint.get("offset", 0)
         total_length = len(text)
-        
-        for i in range(0, total_length, chunk_size):
-            chunk = text[i:i + chunk_size]
-            chunk_data = {
-                "chunk_id": i // chunk_size,
-                "content": chunk,
-                "start_pos": i,
-                "end_pos": min(i + chunk_size, total_length),
-                "char_count": len(chunk)
-            }
-            chunks.append(chunk_data)
-            
-            # 진행률 업데이트
-            progress = int((i + chunk_size) / total_length * 80) + 10
-            DocumentProcessor.save_progress(task_id, step_name, {
-                **extract_result,
-                "processing": f"청크 {len(chunks)} 생성 중",
-                "chunks_created": len(chunks)
-            }, min(progress, 90))
-            
-            time.sleep(0.1)  # 처리 시간 시뮬레이션
+        budget = StageBudget(self)
+        
+        def checkpoint_and_continue(position):
+            DocumentProcessor.save_intermediate_result(task_id, checkpoint_step, {"chunks": chunks, "offset": position})
+            return continue_stage(self, step_name, extract_result, continuation)
+        
+        try:
+            for start, end in split_boundaries(text):
+                if start < resume_at:
+                    continue
+                if budget.should_yield():
+                    return checkpoint_and_continue(start)
+                
+                with span("loop_body"):
+                    chunk = text[start:end]
+                    chunk_data = {
+                        "chunk_id": len(chunks),
+                        "content": chunk,
+                        "content_hash": content_hash(chunk),
+                        "start_pos": start,
+                        "end_pos": end,
+                        "char_count": len(chunk)
+                    }
+                    chunks.append(chunk_data)
+                    
+                    # 진행률 업데이트
+                    progress = int(end / total_length * 80) + 10
+                    DocumentProcessor.save_progress(task_id, step_name, {
+                        **extract_result,
+                        "processing": f"청크 {len(chunks)} 생성 중",
+                        "chunks_created": len(chunks)
+                    }, min(progress, 90))
+                    
+                    clock.sleep(0.1)  # 처리 시간 시뮬레이션
+                    if sampled(len(chunks) - 1):
+                        logger.debug("청크 %d 생성: %d-%d (%d chars)", len(chunks), start, end, end - start)
+                offset = end
+                budget.tick()
+        except SoftTimeLimitExceeded:
+            # 항목이 예상보다 오래 걸린 경우 - 완료된 청크까지 남기고 이어하기
+            if offset == resume_at:
+                raise
+            chunks[:] = [c for c in chunks if c["end_pos"] <= offset]  # 중단된 청크는 다시 처리
+            return checkpoint_and_continue(offset)
+        
+        # 같은 사용자/파일명의 이전 색인과 비교 → 새 청크만 임베딩/저장, 빠진 청크는 삭제
+        user_id, filename = extract_result.get("user_id"), extract_result.get("filename")
+        scope = scope_for(user_id, filename, document_id=self.request.root_id or task_id)
+        previous_ids = documents.indexed_chunk_ids(user_id, filename)
+        for chunk_data, vector_id in zip(chunks, vector_ids([c["content_hash"] for c in chunks], scope)):
+            chunk_data["vector_id"] = vector_id
+            chunk_data["index_status"] = "unchanged" if vector_id in previous_ids else "new"
+        current_ids = {c["vector_id"] for c in chunks}
+        index_diff = {
+            "new": sum(1 for c in chunks if c["index_status"] == "new"),
+            "unchanged": len(current_ids & previous_ids),
+            "removed_ids": sorted(previous_ids - current_ids),
+        }
         
         result = {
             **extract_result,
             "chunks": chunks,
             "total_chunks": len(chunks),
+            "index_diff": index_diff,
             "chunking_timestamp": datetime.now().isoformat(),
             "step_completed": step_name
         }
@@ -243,15 +244,20 @@ def split_text_chunks_advanced(self, extract_result: Dict):
         # 중간 결과 저장
         DocumentProcessor.save_intermediate_result(task_id, step_name, result)
         DocumentProcessor.save_progress(task_id, step_name, result, 100)
+        count_items(step_name, "chunks", len(chunks))
         
         # 성공 알림
         send_notification(task_id, step_name, "success", 
                          f"텍스트 청킹 완료: {len(chunks)} chunks", 
                          {"chunk_count": len(chunks)})
         
-        logger.info(f"[{task_id}] {step_name} 완료: {len(chunks)} chunks")
+        logger.info(f"[{task_id}] {step_name} 완료: {len(chunks)} chunks "
+                    f"(새 청크 {index_diff['new']}, 유지 {index_diff['unchanged']}, "
+                    f"삭제 {len(index_diff['removed_ids'])})")
         return result
         
+    except Ignore:
+        raise  # replace() 로 이어하기 작업을 발행한 경우 (실패 아님)
     except Exception as e:
         error_msg = f"{step_name} 실패: {str(e)}"
         send_notification(task_id, step_name, "error", error_msg)
@@ -262,11 +268,19 @@ def split_text_chunks_advanced(self, extract_result: Dict):
     bind=True,
     soft_time_limit=300,  # 5분 (임베딩 생성은 시간이 오래 걸림)
     time_limit=420,       # 7분
-    autoretry_for=(Exception,),
-    retry_kwargs={'max_retries': 2, 'countdown': 120}
+    autoretry_for=TRANSIENT_ERRORS,
+    retry_backoff=5,
+    retry_backoff_max=120,
+    max_retries=2
 )
-def generate_embeddings_advanced(self, chunk_result: Dict):
-    """3단계: 고급 임베딩 생성"""
+@track_stage("임베딩_생성")
+def generate_embeddings_advanced(self, chunk_result: Dict, continuation: int = 0,
+                                 shard: list = None, shard_results: list = None):
+    """3단계: 고급 임베딩 생성 (시간 예산이 부족하면 만든 벡터를 캐시에 남기고 이어하기)
+
+    스펙의 parallelism 이 2 이상이면 shard=[번호, 개수] 로 캐시 미스의 일부만 생성해 캐시에 기록하고,
+    join_stage_shards 가 shard_results 와 함께 다시 호출해 (모두 캐시 적중) 전체 결과를 만듭니다.
+    """
     task_id = self.request.id
     step_name = "임베딩_생성"
     
@@ -289,42 +303,108 @@ def generate_embeddings_advanced(self, chunk_result: Dict):
             DocumentProcessor.save_progress(task_id, step_name, intermediate, 100)
             return intermediate
         
-        # 임베딩 생성 (청크별)
-        total_chunks = len(chunks)
+        # 임베딩 생성 (이전 색인에 이미 있는 청크는 건너뜀)
+        model = embedding_cache.model_name()
+        pending = [chunk for chunk in chunks if chunk.get("index_status", "new") == "new"]
+        
+        # 공유 캐시 일괄 조회 (MGET 1회) → 캐시에 없는 본문만 API 호출
+        with span("cache_lookup"):
+            cached = embedding_cache.get_many(model, [chunk["content_hash"] for chunk in pending])
+        misses = list(dict.fromkeys(c["content_hash"] for c in pending if c["content_hash"] not in cached))
+        if shard:
+            # 해시로 나눠야 샤드마다 캐시 조회 시점이 달라도 같은 본문을 중복 생성하지 않음
+            misses = [digest for digest in misses if int(digest[:8], 16) % shard[1] == shard[0]]
+        total_calls = len(misses)
+        
+        # 이어하기: 앞선 실행(또는 샤드)에서 만든 벡터는 이미 캐시에 있으므로 위 조회에서 빠짐 (개수만 체크포인트)
+        checkpoint_step = f"{step_name}_체크포인트"
+        created_before = (DocumentProcessor.get_intermediate_result(task_id, checkpoint_step) or {}).get("created", 0)
+        created_before += sum(result.get("embeddings_created", 0) for result in shard_results or [])
+        created = 0
+        unflushed = {}
+        flush_size = int(pipeline_spec.stage_setting(step_name, "batch_size", 32))
+        budget = StageBudget(self)
+        
+        def flush():
+            embedding_cache.put_many(model, unflushed)
+            unflushed.clear()
+        
+        def checkpoint_and_continue():
+            flush()
+            DocumentProcessor.save_intermediate_result(task_id, checkpoint_step, {"created": created_before + created})
+            return continue_stage(self, step_name, chunk_result, continuation,
+                                  shard=shard, shard_results=shard_results)
+        
+        try:
+            for i, digest in enumerate(misses):
+                if budget.should_yield():
+                    return checkpoint_and_continue()
+                
+                with span("loop_body"):
+                    # 실제로는 OpenAI API 호출
+                    # embedding = openai.embeddings.create(...)
+                    clock.sleep(0.3)  # API 호출 시뮬레이션
+                    unflushed[digest] = embedding_cache.simulate_embedding(digest)
+                    created += 1
+                    
+                    # 진행률 업데이트
+                    progress = int((i + 1) / total_calls * 80) + 10
+                    DocumentProcessor.save_progress(task_id, step_name, {
+                        **chunk_result,
+                        "processing": f"임베딩 {i+1}/{total_calls} 생성 중",
+                        "embeddings_created": i + 1
+                    }, progress)
+                    if sampled(i, total_calls):
+                        logger.debug("임베딩 %d/%d 생성", i + 1, total_calls)
+                    
+                    # 재시도 시 다시 호출하지 않도록 주기적으로 캐시에 기록
+                    if len(unflushed) >= flush_size:
+                        flush()
+                    
+                    # 경고: 처리 시간이 오래 걸리는 경우
+                    if i % 10 == 0 and i > 0:
+                        send_notification(task_id, step_name, "warning", 
+                                        f"임베딩 생성 진행 중: {i}/{total_calls}")
+                budget.tick()
+        except SoftTimeLimitExceeded:
+            # 호출이 예상보다 오래 걸린 경우 - 완료된 벡터까지 남기고 이어하기
+            if not created:
+                raise
+            return checkpoint_and_continue()
+        
+        flush()
+        if shard:
+            # 샤드는 캐시만 채우고 생성 수만 반환 (결과 구성은 join 후 한 번)
+            count_items(step_name, "embeddings", created)
+            return {"shard": shard, "embeddings_created": created_before + created}
+        
+        # 벡터 자체는 캐시에 두고 다음 단계에는 캐시 키만 전달 (메시지 크기 유지)
         embedded_chunks = []
-        
-        for i, chunk in enumerate(chunks):
-            # 실제로는 OpenAI API 호출
-            # embedding = openai.embeddings.create(...)
-            
-            chunk_with_embedding = {
+        for chunk in chunks:
+            if chunk.get("index_status", "new") != "new":
+                embedded_chunks.append({**chunk, "embedding": None, "embedding_reused": True,
+                                        "embedding_model": model})
+                continue
+            embedded_chunks.append({
                 **chunk,
-                "embedding": f"embedding_vector_{chunk['chunk_id']}_{task_id[:8]}",
-                "embedding_model": "text-embedding-3-small",
+                "embedding": embedding_cache.cache_key(model, chunk["content_hash"]),
+                "embedding_model": model,
+                "embedding_source": "cache" if chunk["content_hash"] in cached else "api",
                 "embedding_timestamp": datetime.now().isoformat()
-            }
-            embedded_chunks.append(chunk_with_embedding)
-            
-            # 진행률 업데이트
-            progress = int((i + 1) / total_chunks * 80) + 10
-            DocumentProcessor.save_progress(task_id, step_name, {
-                **chunk_result,
-                "processing": f"임베딩 {i+1}/{total_chunks} 생성 중",
-                "embeddings_created": len(embedded_chunks)
-            }, progress)
-            
-            time.sleep(0.3)  # API 호출 시뮬레이션
-            
-            # 경고: 처리 시간이 오래 걸리는 경우
-            if i % 10 == 0 and i > 0:
-                send_notification(task_id, step_name, "warning", 
-                                f"임베딩 생성 진행 중: {i}/{total_chunks}")
+            })
+        # 앞선 실행에서 이 작업이 만든 벡터는 캐시 적중이 아닌 생성으로 집계
+        cache_hits = max(sum(1 for chunk in pending if chunk["content_hash"] in cached) - created_before, 0)
+        total_calls = created_before + created
+        reused = len(chunks) - len(pending)
         
         result = {
             **chunk_result,
             "chunks": embedded_chunks,
             "embeddings_generated": True,
             "embedding_count": len(embedded_chunks),
+            "embeddings_created": total_calls,
+            "embeddings_cached": cache_hits,
+            "embeddings_reused": reused,
             "embedding_timestamp": datetime.now().isoformat(),
             "step_completed": step_name
         }
@@ -332,15 +412,21 @@ def generate_embeddings_advanced(self, chunk_result: Dict):
         # 중간 결과 저장
         DocumentProcessor.save_intermediate_result(task_id, step_name, result)
         DocumentProcessor.save_progress(task_id, step_name, result, 100)
+        count_items(step_name, "embeddings", total_calls)
+        count_items(step_name, "embeddings_cached", cache_hits)
+        count_items(step_name, "embeddings_reused", reused)
         
         # 성공 알림
         send_notification(task_id, step_name, "success", 
-                         f"임베딩 생성 완료: {len(embedded_chunks)} embeddings", 
-                         {"embedding_count": len(embedded_chunks)})
+                         f"임베딩 생성 완료: {total_calls} embeddings (캐시 {cache_hits}, 재사용 {reused})", 
+                         {"embedding_count": len(embedded_chunks), "embeddings_created": total_calls})
         
-        logger.info(f"[{task_id}] {step_name} 완료: {len(embedded_chunks)} embeddings")
+        logger.info(f"[{task_id}] {step_name} 완료: {total_calls} embeddings "
+                    f"(캐시 {cache_hits}, 재사용 {reused})")
         return result
         
+    except Ignore:
+        raise  # replace() 로 이어하기 작업을 발행한 경우 (실패 아님)
     except SoftTimeLimitExceeded:
         error_msg = f"{step_name} 타임아웃 (300초 초과)"
         send_notification(task_id, step_name, "error", error_msg)
@@ -356,11 +442,14 @@ def generate_embeddings_advanced(self, chunk_result: Dict):
     bind=True,
     soft_time_limit=60,
     time_limit=90,
-    autoretry_for=(Exception,),
-    retry_kwargs={'max_retries': 3, 'countdown': 30}
+    autoretry_for=TRANSIENT_ERRORS,
+    retry_backoff=5,
+    retry_backoff_max=120,
+    max_retries=3
 )
-def save_to_database_advanced(self, embedding_result: Dict):
-    """4단계: 고급 데이터베이스 저장"""
+@track_stage("데이터베이스_저장")
+def save_to_database_advanced(self, embedding_result: Dict, continuation: int = 0):
+    """4단계: 고급 데이터베이스 저장 (시간 예산이 부족하면 저장한 위치를 체크포인트 후 이어하기)"""
     task_id = self.request.id
     step_name = "데이터베이스_저장"
     
@@ -376,28 +465,60 @@ def save_to_database_advanced(self, embedding_result: Dict):
         # 진행률 초기화
         DocumentProcessor.save_progress(task_id, step_name, embedding_result, 0)
         
-        # 데이터베이스 저장
-        saved_ids = []
-        total_chunks = len(chunks)
-        
-        for i, chunk in enumerate(chunks):
-            # 실제 벡터 DB 저장 로직
-            doc_id = f"doc_{chunk['chunk_id']}_{task_id[:8]}_{int(time.time())}"
-            
-            # 실제로는 Pinecone, Weaviate, ChromaDB 등에 저장
-            # vector_db.insert(doc_id, chunk['embedding'], chunk['content'])
-            
-            saved_ids.append(doc_id)
-            
-            # 진행률 업데이트
-            progress = int((i + 1) / total_chunks * 80) + 10
-            DocumentProcessor.save_progress(task_id, step_name, {
-                **embedding_result,
-                "processing": f"저장 {i+1}/{total_chunks}",
-                "saved_count": len(saved_ids)
-            }, progress)
-            
-            time.sleep(0.1)  # DB 저장 시뮬레이션
+        # 데이터베이스 저장 (새 청크만 upsert, 이전 색인에서 빠진 청크는 삭제)
+        saved_ids = [chunk.get("vector_id") or f"doc_{chunk['chunk_id']}_{task_id[:8]}" for chunk in chunks]
+        stored_chunks = [{**chunk, "chunk_id": doc_id} for chunk, doc_id in zip(chunks, saved_ids)]
+        upserts = [chunk for chunk in stored_chunks if chunk.get("index_status", "new") == "new"]
+        removed_ids = embedding_result.get("index_diff", {}).get("removed_ids", [])
+        total_chunks = len(upserts)
+        
+        # 이어하기/재시도면 이미 저장한 청크는 건너뜀
+        checkpoint_step = f"{step_name}_체크포인트"
+        done = (DocumentProcessor.get_intermediate_result(task_id, checkpoint_step) or {}).get("upserted", 0)
+        budget = StageBudget(self)
+        
+        def checkpoint_and_continue():
+            DocumentProcessor.save_intermediate_result(task_id, checkpoint_step, {"upserted": done})
+            return continue_stage(self, step_name, embedding_result, continuation)
+        
+        # 임베딩 단계가 캐시에 남긴 벡터를 일괄 조회
+        with span("cache_lookup"):
+            vectors = embedding_cache.load_vectors(
+                embedding_cache.model_name(), [chunk["content_hash"] for chunk in upserts[done:]]
+            )
+        
+        resumed_at = done
+        try:
+            for i, chunk in enumerate(upserts[done:], start=done):
+                if budget.should_yield():
+                    return checkpoint_and_continue()
+                
+                with span("loop_body"):
+                    vector = vectors[chunk["content_hash"]]
+                    # 실제로는 Pinecone, Weaviate, ChromaDB 등에 저장 (벡터 ID 가 같으면 덮어씀)
+                    # vector_db.upsert(chunk['chunk_id'], vector, chunk['content'])
+                    clock.sleep(0.1)  # DB 저장 시뮬레이션
+                    done = i + 1
+                    
+                    # 진행률 업데이트
+                    progress = int(done / total_chunks * 80) + 10
+                    DocumentProcessor.save_progress(task_id, step_name, {
+                        **embedding_result,
+                        "processing": f"저장 {done}/{total_chunks}",
+                        "saved_count": done
+                    }, progress)
+                    if sampled(i, len(upserts)):
+                        logger.debug("저장 %d/%d: %s", done, len(upserts), chunk["chunk_id"])
+                budget.tick()
+        except SoftTimeLimitExceeded:
+            # 저장이 예상보다 오래 걸린 경우 - upsert 는 멱등이므로 완료된 위치부터 이어하기
+            if done == resumed_at:
+                raise
+            return checkpoint_and_continue()
+        
+        if removed_ids:
+            # vector_db.delete(removed_ids)
+            logger.info(f"[{task_id}] 이전 버전에서 빠진 청크 {len(removed_ids)}개 삭제")
         
         # 최종 결과
         final_result = {
@@ -410,15 +531,25 @@ def save_to_database_advanced(self, embedding_result: Dict):
                 "char_count": embedding_result["char_count"],
                 "chunk_count": embedding_result["total_chunks"],
                 "embedding_count": embedding_result["embedding_count"],
-                "saved_count": len(saved_ids)
+                "saved_count": len(saved_ids),
+                "upserted_count": len(upserts),
+                "unchanged_count": len(saved_ids) - len(upserts),
+                "deleted_count": len(removed_ids)
             },
             "completion_timestamp": datetime.now().isoformat(),
             "step_completed": step_name,
             "pipeline_completed": True
         }
         
+        # 조회 API 용 문서/청크 기록
+        documents.save_chunks(task_id, stored_chunks, final_result["processing_summary"],
+                              user_id=embedding_result.get("user_id"),
+                              filename=embedding_result.get("filename"),
+                              removed_ids=removed_ids)
+        
         # 최종 진행률 업데이트
         DocumentProcessor.save_progress(task_id, "완료", final_result, 100)
+        count_items(step_name, "documents", len(upserts))
         
         # 최종 성공 알림
         send_notification(task_id, "파이프라인_완료", "success", 
@@ -428,58 +559,33 @@ def save_to_database_advanced(self, embedding_result: Dict):
         logger.info(f"[{task_id}] 전체 파이프라인 완료: {len(saved_ids)} documents")
         return final_result
         
+    except Ignore:
+        raise  # replace() 로 이어하기 작업을 발행한 경우 (실패 아님)
     except Exception as e:
         error_msg = f"{step_name} 실패: {str(e)}"
         send_notification(task_id, step_name, "error", error_msg)
         logger.error(f"[{task_id}] {error_msg}")
         raise
 
-# 진행률 추적 전용 함수
-def get_pipeline_progress(task_id: str) -> Dict:
-    """파이프라인 전체 진행률 조회"""
-    progress_data = DocumentProcessor.get_progress(task_id)
-    if not progress_data:
-        return {"error": "진행률 정보를 찾을 수 없습니다"}
-    
-    return {
-        "task_id": task_id,
-        "current_step": progress_data.get("current_step"),
-        "overall_progress": progress_data.get("progress", 0),
-        "status": progress_data.get("status"),
-        "last_updated": progress_data.get("timestamp"),
-        "details": progress_data.get("data", {})
-    }
-
-# 알림 히스토리 조회
-def get_notification_history(task_id: str) -> list:
-    """작업의 알림 히스토리 조회"""
-    notifications = redis_client.lrange(f"notifications:{task_id}", 0, -1)
-    return [json.loads(notif) for notif in notifications]
+@celery_app.task(base=IdempotentTask, ignore_result=True)
+def finalize_pipeline(user_id: str = None, blob_sha256: str = None, batch_id: str = None,
+                      batch_index: int = None, status: str = "completed", document_id: str = None):
+    """파이프라인 종료(성공/실패) 시 정리 - 문서 상태 기록, 업로드 참조 반환, 사용자 슬롯 반환 + 대기 작업 배정
 
-# 고급 파이프라인 (모든 기능 포함)
-def process_document_pipeline_advanced(file_path: str):
-    """고급 문서 처리 파이프라인 - 타임아웃, 로깅, 재시작, 진행률, 알림 모두 포함"""
-    pipeline = chain(
-        extract_text_advanced.s(file_path),
-        split_text_chunks_advanced.s(),
-        generate_embeddings_advanced.s(),
-        save_to_database_advanced.s()
-    )
-    
-    result = pipeline.apply_async()
-    
-    # 초기 진행률 설정
-    DocumentProcessor.save_progress(result.id, "파이프라인_시작", {
-        "file_path": file_path,
-        "pipeline_id": result.id,
-        "steps": ["텍스트_추출", "텍스트_청킹", "임베딩_생성", "데이터베이스_저장"]
-    }, 0)
-    
-    # 시작 알림
-    send_notification(result.id, "파이프라인_시작", "success", 
-                     f"문서 처리 파이프라인 시작: {os.path.basename(file_path)}")
-    
-    return result
+    참조/슬롯 반환은 두 번 실행되면 카운터가 어긋나므로 같은 작업의 재전달은 건너뜁니다.
+    (인자 해시로 묶지 않음 - 같은 업로드를 다시 올리면 인자가 같아도 반환할 참조는 별개)
+    """
+    if document_id and status == "failed":
+        documents.mark_failed(document_id)
+    if batch_id:
+        dispatched = batch.file_done(batch_id, batch_index, status)
+        logger.info(f"[batch] {batch_id} #{batch_index} {status} - 다음 파일 {dispatched}건 발행")
+    if blob_sha256:
+        storage.release(blob_sha256)
+    if user_id is not None:
+        dispatched = fair_queue.release(user_id)
+        if dispatched:
+            logger.info(f"[fair] 슬롯 반환 - {user_id}, 대기 작업 {dispatched}건 배정")
 
 # 기존 호환성 유지
 @celery_app.task
@@ -487,7 +593,7 @@ def split_document(file_path: str):
     """기존 API 호환성을 위한 단순 작업"""
     try:
         logger.info(f"단순 문서 분할 작업: {file_path}")
-        time.sleep(2)
+        clock.sleep(2)
         return f"문서 분할 완료: {os.path.basename(file_path)}"
     except Exception as e:
         raise e
\ No newline at end of file
@@ -1,4 +1,6 @@
 from background.celery import celery_app
+from background import clock, idempotency
+from background.idempotency import IdempotentTask
 import time
 import logging
 
@@ -6,12 +8,12 @@ logger = logging.getLogger(__name__)
 
 @celery_app.task
 def add(x, y):
-    time.sleep(10)
+    clock.sleep(10)
     return x + y
 
 @celery_app.task
 def multiply(x, y):
-    time.sleep(10)
+    clock.sleep(10)
     return x * y
 
 @celery_app.task
@@ -67,7 +69,7 @@ def process_user_batch(self, user_ids: list[int]):
     
     for i, user_id in enumerate(user_ids):
         # 사용자별 처리 (0.5-2초 소요)
-        time.sleep(0.1)  # 실제 처리 시뮬레이션
+        clock.sleep(0.1)  # 실제 처리 시뮬레이션
         
         result = {
             "user_id": user_id,
@@ -89,9 +91,12 @@ def process_user_batch(self, user_ids: list[int]):
         "task_id": task_id
     }
 
-@celery_app.task(bind=True, soft_time_limit=300, time_limit=420)
+@celery_app.task(bind=True, base=IdempotentTask, soft_time_limit=300, time_limit=420)
 def send_email_campaign(self, email_list: list[str], template_id: str):
-    """✅ 적정 크기: 이메일 캠페인 발송 (3-5분 소요)"""
+    """✅ 적정 크기: 이메일 캠페인 발송 (3-5분 소요)
+
+    재전달되면 기록된 결과를 반환하고, 같은 템플릿을 이미 받은 주소에는 다시 보내지 않습니다.
+    """
     task_id = self.request.id
     max_batch_size = 200
     
@@ -102,12 +107,18 @@ def send_email_campaign(self, email_list: list[str], template_id: str):
     
     sent_count = 0
     failed_count = 0
+    skipped_count = 0
     results = []
     
     for i, email in enumerate(email_list):
+        send_key = idempotency.derive_key(template_id, email)
+        if not idempotency.claim("email", send_key):
+            skipped_count += 1
+            results.append({"email": email, "status": "duplicate", "sent_at": None})
+            continue
         try:
             # 이메일 발송 시뮬레이션 (0.5-1초 소요)
-            time.sleep(0.05)
+            clock.sleep(0.05)
             
             # 90% 성공률 시뮬레이션
             success = (i % 10) != 0
@@ -118,6 +129,7 @@ def send_email_campaign(self, email_list: list[str], template_id: str):
             else:
                 failed_count += 1
                 status = "failed"
+                idempotency.release("email", send_key)  # 보내지 못한 주소는 다음 발송에서 다시 시도
                 
             results.append({
                 "email": email,
@@ -132,15 +144,18 @@ def send_email_campaign(self, email_list: list[str], template_id: str):
                 
         except Exception as e:
             failed_count += 1
+            idempotency.release("email", send_key)
             logger.error(f"[{task_id}] 이메일 발송 실패 {email}: {str(e)}")
     
     success_rate = (sent_count / len(email_list)) * 100
-    logger.info(f"[{task_id}] 이메일 캠페인 완료 - 성공: {sent_count}, 실패: {failed_count}, 성공률: {success_rate:.1f}%")
+    logger.info(f"[{task_id}] 이메일 캠페인 완료 - 성공: {sent_count}, 실패: {failed_count}, "
+                f"중복 생략: {skipped_count}, 성공률: {success_rate:.1f}%")
     
     return {
         "total_emails": len(email_list),
         "sent_count": sent_count,
         "failed_count": failed_count,
+        "skipped_count": skipped_count,
         "success_rate": success_rate,
         "template_id": template_id,
         "results": results,
@@ -156,19 +171,19 @@ def generate_report_chunk(self, date_range: dict, chunk_id: int):
     
     # 데이터 조회 시뮬레이션 (30초)
     logger.info(f"[{task_id}] 데이터 조회 중...")
-    time.sleep(0.3)
+    clock.sleep(0.3)
     
     # 데이터 처리 시뮬레이션 (2분)
     logger.info(f"[{task_id}] 데이터 처리 중...")
     for i in range(20):
-        time.sleep(0.1)  # 실제로는 데이터 가공
+        clock.sleep(0.1)  # 실제로는 데이터 가공
         if (i + 1) % 5 == 0:
             progress = ((i + 1) / 20) * 100
             logger.info(f"[{task_id}] 데이터 처리 진행률: {progress:.0f}%")
     
     # 리포트 생성 시뮬레이션 (1분)
     logger.info(f"[{task_id}] 리포트 생성 중...")
-    time.sleep(0.2)
+    clock.sleep(0.2)
     
     report_data = {
         "chunk_id": chunk_id,
@@ -0,0 +1 @@
+# Benchmark / load-test package
@@ -0,0 +1,188 @@
+"""업로드 수용 제어 부하 테스트 (이산 사건 시뮬레이션)
+
+워커 처리 용량을 넘는 요청이 몰리는 구간을 시뮬레이션 시계로 재현하고,
+수용 제어를 끈 경우와 켠 경우의 종단 지연(p50/p95/p99), 최대 적체, Redis 메모리 사용률,
+거절 수를 비교합니다. 판정은 실제 background.admission.AdmissionController 가 수행합니다.
+
+사용 예:
+    python -m benchmarks.admission_bench
+    python -m benchmarks.admission_bench --overload 4 --spike-seconds 120 --workers 8
+    python -m benchmarks.admission_bench --output admission.json
+"""
+import argparse
+import heapq
+import json
+import os
+import random
+import sys
+from collections import Counter, deque
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4, help="동시 처리 워커 프로세스 수")
+    parser.add_argument("--service-time", type=float, default=0.5, help="문서당 평균 처리 시간 (초)")
+    parser.add_argument("--overload", type=float, default=3.0, help="급증 구간 도착률 / 처리 용량")
+    parser.add_argument("--baseline-load", type=float, default=0.5, help="평상시 도착률 / 처리 용량")
+    parser.add_argument("--warmup-seconds", type=float, default=30)
+    parser.add_argument("--spike-seconds", type=float, default=60)
+    parser.add_argument("--cooldown-seconds", type=float, default=60)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--max-queue-depth", type=int, default=40)
+    parser.add_argument("--max-user-backlog", type=int, default=10)
+    parser.add_argument("--rate-headroom", type=float, default=1.5, help="토큰 버킷 속도 / 처리 용량")
+    parser.add_argument("--bytes-per-job", type=int, default=512 * 1024, help="대기 작업당 Redis 사용량 (메시지 + 진행률/중간 결과)")
+    parser.add_argument("--memory-limit", type=int, default=64 * 1024 * 1024, help="시뮬레이션 Redis maxmemory")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="결과 JSON 저장 경로 (기본: 표준 출력)")
+    return parser.parse_args(argv)
+
+
+class SimulatedSystem:
+    """워커 풀 + 브로커 큐 + Redis 메모리 모델 (AdmissionController 의 probe 역할도 함께)"""
+
+    def __init__(self, args, rng):
+        self.args = args
+        self.rng = rng
+        self.now = 0.0
+        self.queue = deque()
+        self.busy = 0
+        self.per_user = Counter()
+        self.events = []
+        self._seq = 0
+        self.latencies = []
+        self.max_depth = 0
+        self.peak_memory_ratio = 0.0
+
+    # ----- probe -----
+    def queue_depth(self) -> int:
+        return len(self.queue)
+
+    def memory_ratio(self, max_bytes=None) -> float:
+        used = (len(self.queue) + self.busy) * self.args.bytes_per_job
+        return used / (max_bytes or self.args.memory_limit)
+
+    def user_backlog(self, user_id: str) -> int:
+        return self.per_user[user_id]
+
+    # ----- 사건 처리 -----
+    def schedule(self, at: float, kind: str, payload):
+        self._seq += 1
+        heapq.heappush(self.events, (at, self._seq, kind, payload))
+
+    def _start(self, job):
+        self.busy += 1
+        self.schedule(self.now + self.rng.expovariate(1 / self.args.service_time), "done", job)
+
+    def enqueue(self, job):
+        self.per_user[job["user_id"]] += 1
+        if self.busy < self.args.workers:
+            self._start(job)
+        else:
+            self.queue.append(job)
+        self.max_depth = max(self.max_depth, len(self.queue))
+        self.peak_memory_ratio = max(self.peak_memory_ratio, self.memory_ratio())
+
+    def complete(self, job):
+        self.busy -= 1
+        self.per_user[job["user_id"]] -= 1
+        self.latencies.append(self.now - job["arrived_at"])
+        if self.queue:
+            self._start(self.queue.popleft())
+
+
+def arrival_rate(args, t: float) -> float:
+    capacity = args.workers / args.service_time
+    if args.warmup_seconds <= t < args.warmup_seconds + args.spike_seconds:
+        return capacity * args.overload
+    return capacity * args.baseline_load
+
+
+def simulate(args, admission_enabled: bool) -> dict:
+    from background.admission import AdmissionController
+    from benchmarks.pipeline_bench import percentile
+
+    rng = random.Random(args.seed)
+    system = SimulatedSystem(args, rng)
+    capacity = args.workers / args.service_time
+    controller = AdmissionController({
+        "enabled": admission_enabled,
+        "max_queue_depth": args.max_queue_depth,
+        "max_user_backlog": args.max_user_backlog,
+        "max_redis_memory_ratio": 0.85,
+        "rate_per_second": capacity * args.rate_headroom,
+        "burst": capacity * args.rate_headroom,
+        "max_defer_seconds": 0.5,
+        "retry_after_seconds": 5,
+        "probe_interval": 0.2,
+    }, system, clock=lambda: system.now)
+
+    # 사용자 가중치: 소수의 대량 업로더 + 다수의 일반 사용자
+    users = [f"user-{i}" for i in range(args.users)]
+    weights = [8 if i < 2 else 1 for i in range(args.users)]
+    duration = args.warmup_seconds + args.spike_seconds + args.cooldown_seconds
+    system.schedule(rng.expovariate(arrival_rate(args, 0)), "arrival", None)
+
+    outcomes = Counter()
+    deferred_waits = []
+    while system.events:
+        system.now, _, kind, payload = heapq.heappop(system.events)
+        if kind == "arrival":
+            if system.now < duration:
+                system.schedule(system.now + rng.expovariate(arrival_rate(args, system.now)), "arrival", None)
+            job = {"user_id": rng.choices(users, weights)[0], "arrived_at": system.now}
+            decision = controller.check(job["user_id"])
+            if not decision.admitted:
+                outcomes[f"rejected_{decision.reason}"] += 1
+                continue
+            outcomes["deferred" if decision.wait else "admitted"] += 1
+            if decision.wait:
+                deferred_waits.append(decision.wait)
+            system.schedule(system.now + decision.wait, "enqueue", job)
+        elif kind == "enqueue":
+            system.enqueue(job=payload)
+        else:
+            system.complete(payload)
+
+    latencies = system.latencies
+    return {
+        "admission": "on" if admission_enabled else "off",
+        "requests": sum(outcomes.values()),
+        "outcomes": dict(sorted(outcomes.items())),
+        "completed": len(latencies),
+        "latency_seconds": {
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "p99": round(percentile(latencies, 99), 3),
+            "max": round(max(latencies), 3),
+        },
+        "deferred_wait_p99": round(percentile(deferred_waits, 99), 3) if deferred_waits else 0.0,
+        "max_queue_depth": system.max_depth,
+        "peak_redis_memory_ratio": round(system.peak_memory_ratio, 3),
+    }
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    capacity = args.workers / args.service_time
+    report = {
+        "scenario": {
+            "capacity_per_second": capacity,
+            "spike_rate_per_second": capacity * args.overload,
+            "phases_seconds": [args.warmup_seconds, args.spike_seconds, args.cooldown_seconds],
+            "memory_limit_bytes": args.memory_limit,
+        },
+        "results": [simulate(args, False), simulate(args, True)],
+    }
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""업로드 → 고급 파이프라인 → 상태 폴링 전체 흐름 벤치마크
+
+사용 예:
+    # eager 모드 + 인메모리 Redis 대역 (외부 서비스 불필요)
+    python -m benchmarks.pipeline_bench --documents 50 --size 65536 --sleep-scale 0
+
+    # 실제 브로커/워커 대상 (docker-compose 환경)
+    python -m benchmarks.pipeline_bench --mode live --documents 20
+
+    # 결과를 저장하고 이전 실행과 비교
+    python -m benchmarks.pipeline_bench --output bench_output.json --compare baseline.json
+
+출력 JSON 에는 처리량, p50/p95/p99 지연 시간, 문서당 Redis 명령 수,
+단계별 직렬화 바이트 수가 포함됩니다.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from celery.signals import task_postrun
+
+
+def percentile(values, pct):
+    """선형 보간 백분위수"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def make_document(size: int, index: int) -> bytes:
+    """지정 크기의 합성 문서 생성 (문서마다 내용이 조금씩 다름)"""
+    line = f"문서 {index} - 합성 벤치마크 문장입니다. The quick brown fox jumps over the lazy dog.\n"
+    data = (line * (size // len(line.encode()) + 1)).encode()
+    return data[:size]
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            stderr=subprocess.DEVNULL,
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def configure(mode: str, sleep_scale: float):
+    """실행 모드에 맞게 Celery/Redis 를 설정하고 (client, redis 대역) 반환"""
+    from background.celery import celery_app
+
+    fake_redis = None
+    if mode == "eager":
+        from background import local
+        fake_redis = local.enable(celery_app)
+
+    from background import clock
+    clock.set_scale(sleep_scale)
+
+    from fastapi.testclient import TestClient
+    import main
+
+    return TestClient(main.app), fake_redis
+
+
+def run_one(client, index, size, poll_interval, timeout):
+    """업로드 1건 → 완료까지 폴링, 종단 지연 시간(초) 반환"""
+    started = time.perf_counter()
+    response = client.post(
+        "/sample/process_advanced",
+        data={"user_id": f"bench-{index % 10}"},
+        files={"file": (f"doc_{index}.txt", make_document(size, index), "text/plain")},
+    )
+    response.raise_for_status()
+    chain_id = response.json()["chain_id"]
+
+    deadline = started + timeout
+    while True:
+        status = client.get(f"/sample/status/{chain_id}").json()
+        celery_status = status.get("comprehensive_status", {}).get("celery_status", {})
+        if celery_status.get("ready"):
+            if not celery_status.get("successful"):
+                raise RuntimeError(f"파이프라인 실패: {chain_id}")
+            return time.perf_counter() - started
+        if time.perf_counter() > deadline:
+            raise TimeoutError(f"파이프라인 타임아웃: {chain_id}")
+        time.sleep(poll_interval)
+
+
+def run_benchmark(args):
+    from background import clock
+
+    client, fake_redis = configure(args.mode, args.sleep_scale)
+
+    # 작업별 결과 직렬화 크기 집계 (단계 간 전달되는 페이로드 크기)
+    serialized = defaultdict(list)
+
+    def record_result_size(task=None, retval=None, **kwargs):
+        try:
+            serialized[task.name.rsplit(".", 1)[-1]].append(len(json.dumps(retval, ensure_ascii=False).encode()))
+        except (TypeError, ValueError):
+            pass
+
+    task_postrun.connect(record_result_size, weak=False)
+
+    # warmup (임포트/캐시 효과 제외)
+    for i in range(args.warmup):
+        run_one(client, -(i + 1), args.size, args.poll_interval, args.timeout)
+    if fake_redis is not None:
+        fake_redis.ops.clear()
+        fake_redis.bytes_written.clear()
+    serialized.clear()
+    clock.reset()
+
+    latencies = []
+    errors = 0
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        futures = [
+            pool.submit(run_one, client, i, args.size, args.poll_interval, args.timeout)
+            for i in range(args.documents)
+        ]
+        for future in futures:
+            try:
+                latencies.append(future.result())
+            except Exception as e:
+                errors += 1
+                print(f"오류: {e}", file=sys.stderr)
+    elapsed = time.perf_counter() - started
+    task_postrun.disconnect(record_result_size)
+
+    completed = len(latencies)
+    report = {
+        "benchmark": "pipeline_advanced",
+        "timestamp": datetime.now().isoformat(),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "params": {
+            "mode": args.mode,
+            "documents": args.documents,
+            "size_bytes": args.size,
+            "concurrency": args.concurrency,
+            "sleep_scale": args.sleep_scale,
+        },
+        "results": {
+            "completed": completed,
+            "errors": errors,
+            "elapsed_seconds": round(elapsed, 4),
+            "throughput_docs_per_sec": round(completed / elapsed, 3) if elapsed else None,
+            "latency_seconds": {
+                "mean": statistics.fmean(latencies) if latencies else None,
+                "p50": percentile(latencies, 50),
+                "p95": percentile(latencies, 95),
+                "p99": percentile(latencies, 99),
+                "max": max(latencies) if latencies else None,
+            },
+            # 작업 안의 처리 시간 시뮬레이션 합계 (sleep_scale 적용 전 - 0 으로 돌려도 실제라면 걸렸을 시간)
+            "simulated_sleep_seconds_per_document": round(clock.simulated_seconds() / completed, 3) if completed else None,
+            "serialized_bytes_per_stage": {
+                stage: {"mean": statistics.fmean(sizes), "total": sum(sizes)}
+                for stage, sizes in serialized.items()
+            },
+        },
+    }
+    if fake_redis is not None and completed:
+        report["results"]["redis_ops_per_document"] = {
+            command: round(count / completed, 2) for command, count in sorted(fake_redis.ops.items())
+        }
+        report["results"]["redis_ops_per_document_total"] = round(sum(fake_redis.ops.values()) / completed, 2)
+        report["results"]["redis_bytes_written_per_document"] = {
+            family: round(size / completed, 1) for family, size in sorted(fake_redis.bytes_written.items())
+        }
+    return report
+
+
+def compare(current, baseline):
+    """이전 실행 결과 대비 주요 지표 변화율 출력"""
+    def pick(report):
+        results = report["results"]
+        return {
+            "throughput_docs_per_sec": results.get("throughput_docs_per_sec"),
+            "latency_p50": results["latency_seconds"].get("p50"),
+            "latency_p95": results["latency_seconds"].get("p95"),
+            "latency_p99": results["latency_seconds"].get("p99"),
+            "redis_ops_per_document_total": results.get("redis_ops_per_document_total"),
+        }
+
+    now, before = pick(current), pick(baseline)
+    print(f"\n비교 기준: {baseline.get('git_revision')} ({baseline.get('timestamp')})", file=sys.stderr)
+    for name, value in now.items():
+        old = before.get(name)
+        if value is None or not old:
+            continue
+        print(f"  {name:32s} {old:>12.4f} → {value:>12.4f} ({(value - old) / old * 100:+.1f}%)", file=sys.stderr)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="문서 파이프라인 벤치마크")
+    parser.add_argument("--mode", choices=["eager", "live"], default="eager",
+                        help="eager: 프로세스 내 실행 + Redis 대역, live: 실제 브로커/워커 사용")
+    parser.add_argument("--documents", type=int, default=20, help="처리할 문서 수")
+    parser.add_argument("--size", type=int, default=16 * 1024, help="합성 문서 크기 (bytes)")
+    parser.add_argument("--concurrency", type=int, default=1, help="동시 업로드 수")
+    parser.add_argument("--warmup", type=int, default=1, help="측정 전 워밍업 문서 수")
+    parser.add_argument("--sleep-scale", type=float, default=0.0,
+                        help="작업 내 time.sleep 시뮬레이션 배율 (0 이면 생략, 1 이면 원래 값)")
+    parser.add_argument("--poll-interval", type=float, default=0.05, help="상태 폴링 간격 (초)")
+    parser.add_argument("--timeout", type=float, default=600, help="문서당 최대 대기 시간 (초)")
+    parser.add_argument("--output", help="결과 JSON 저장 경로 (미지정 시 stdout)")
+    parser.add_argument("--compare", help="비교할 이전 결과 JSON 경로")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    output = os.path.abspath(args.output) if args.output else None
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    # 업로드 파일이 저장소를 오염시키지 않도록 임시 디렉토리에서 실행
+    repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, repo_root)
+    with tempfile.TemporaryDirectory(prefix="pipeline-bench-") as workdir:
+        previous_cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            report = run_benchmark(args)
+        finally:
+            os.chdir(previous_cwd)
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if output:
+        with open(output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if baseline:
+        compare(report, baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""web / worker 콜드 스타트(임포트) 시간 벤치마크
+
+각 시나리오를 새 파이썬 프로세스에서 반복 실행해 임포트 완료까지의 시간을 측정합니다.
+
+사용 예:
+    python -m benchmarks.startup_bench --repeat 10
+    python -m benchmarks.startup_bench --top 15          # 가장 느린 임포트 모듈 출력
+    python -m benchmarks.startup_bench --output startup.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime
+
+from benchmarks.pipeline_bench import git_revision, percentile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = {
+    # web 컨테이너: FastAPI 앱 로드
+    "web": ("import main", {}),
+    # 워커: celery 앱 + include 된 전체 작업 모듈 로드
+    "worker_all": (
+        "from background.celery import celery_app; celery_app.loader.import_default_modules()",
+        {},
+    ),
+    # default-add 큐 전용 워커
+    "worker_default_add": (
+        "from background.celery import celery_app; celery_app.loader.import_default_modules()",
+        {"CELERY_WORKER_QUEUES": "default-add"},
+    ),
+}
+
+_TIMER = (
+    "import time, sys; _t = time.perf_counter(); {code}; "
+    "sys.stdout.write(repr(time.perf_counter() - _t))"
+)
+
+
+def measure(code: str, env: dict) -> float:
+    """새 프로세스에서 code 실행 시간 (초) - 인터프리터 기동 시간은 제외"""
+    output = subprocess.check_output(
+        [sys.executable, "-c", _TIMER.format(code=code)],
+        cwd=REPO_ROOT,
+        env={**os.environ, **env},
+        stderr=subprocess.DEVNULL,
+    )
+    return float(output.decode().strip().splitlines()[-1])
+
+
+def slowest_imports(code: str, env: dict, top: int):
+    """-X importtime 결과에서 누적 시간이 큰 모듈 목록"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=REPO_ROOT,
+        env={**os.environ, **env},
+        capture_output=True,
+        text=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        try:
+            _, cumulative, name = [part.strip() for part in line[len("import time:"):].split("|")]
+            rows.append((int(cumulative), name))
+        except ValueError:
+            continue
+    rows.sort(reverse=True)
+    return [{"module": name, "cumulative_ms": round(us / 1000, 2)} for us, name in rows[:top]]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="web/worker 콜드 스타트 벤치마크")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="측정할 시나리오 (여러 번 지정 가능, 기본 전체)")
+    parser.add_argument("--top", type=int, default=0, help="시나리오별 느린 임포트 상위 N개 출력")
+    parser.add_argument("--output", help="결과 JSON 저장 경로 (미지정 시 stdout)")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name in args.scenario or sorted(SCENARIOS):
+        code, env = SCENARIOS[name]
+        samples = [measure(code, env) * 1000 for _ in range(args.repeat)]
+        results[name] = {
+            "median_ms": round(statistics.median(samples), 2),
+            "p95_ms": round(percentile(samples, 95), 2),
+            "min_ms": round(min(samples), 2),
+        }
+        if args.top:
+            results[name]["slowest_imports"] = slowest_imports(code, env, args.top)
+
+    report = {
+        "benchmark": "startup",
+        "timestamp": datetime.now().isoformat(),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "params": {"repeat": args.repeat},
+        "results": results,
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
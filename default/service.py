@@ -1,14 +1,13 @@
-from background.task.default_tasks import add
-from background.celery import celery_app
+from background.pipeline import signature
 import logging
 
 async def add_service(x, y):
     logging.info(f"add_service : {x=}, {y=}")
 
-    celery_app.send_task(
+    # send_task 는 eager 설정을 무시하므로 시그니처로 발행 (로컬 실행 모드에서는 바로 실행)
+    signature(
         "background.task.default_tasks.add", # 작업을 처리할 worker(처리함수 지정)
         kwargs={"x" : x, "y" : y}, # worker 인자값 전달
         queue = "default-add" # 작업을 처리할 queue 지정
-    )
-    
+    ).apply_async()
 
@@ -1,23 +1,55 @@
-from fastapi import FastAPI, Query, HTTPException, UploadFile, File
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, Query, HTTPException, UploadFile, File, Request
+from fastapi.responses import JSONResponse, Response
 from typing import List, Optional
 import json
+import time
+
+from background.log import configure as configure_logging
+from background.metrics import HTTP_REQUEST_SECONDS, render_latest
+
+configure_logging()
 
 app = FastAPI(title="Celery Test Harder", description="분산 작업 처리 시스템")
 
 from routers.sample_app import sample_router
+from routers.document_app import document_router
+from routers.profile_app import profile_router
 from default.app import default_router
 
-routers = [sample_router, default_router]
+routers = [sample_router, document_router, profile_router, default_router]
 
 for router in routers:
     app.include_router(router)
 
 
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    """요청 지연 시간 메트릭 기록 (라우트 템플릿 단위로 집계)"""
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        HTTP_REQUEST_SECONDS.labels(
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=str(status),
+        ).observe(time.perf_counter() - started)
+
+
 @app.get("/")
 async def root():
     return JSONResponse(content={"message": "Celery Test Harder Start reload"})
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus 스크레이프 엔드포인트"""
+    body, content_type = render_latest()
+    return Response(content=body, media_type=content_type)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
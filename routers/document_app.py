@@ -1,7 +1,136 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Query, Request
+from fastapi.responses import JSONResponse, Response
+from starlette.concurrency import run_in_threadpool
+
+import logging
 
 document_router = APIRouter(prefix="/document", tags=["document 학습 엔드포인트"])
 
 from background.celery import celery_app
+from background import documents, read_cache
+from background.store import get_pipeline_progress, get_notification_history
+
+logger = logging.getLogger(__name__)
+
+# 완료/실패/superseded 문서는 바뀌지 않으므로 길게, 처리 중인 문서는 짧게 캐시
+# (다음 버전 저장으로 superseded 가 되거나 청크가 정리될 때는 쓰는 쪽에서 무효화)
+FINAL_STATUSES = ("completed", "failed", "superseded")
+
+
+def _document_ttl(document: dict) -> int:
+    if document.get("status") in FINAL_STATUSES:
+        return read_cache.ttl_for("document")
+    return read_cache.ttl_for("document_processing")
+
+
+async def cached_response(request: Request, resource: str, key: str, loader, ttl, group: str = None) -> Response:
+    """캐시된 본문으로 응답 - ETag 가 일치하면 본문 없이 304"""
+    entry = await run_in_threadpool(read_cache.get_cache().get, resource, key, loader, ttl, group)
+    if entry is None:
+        return JSONResponse(content={"error": f"{resource} 정보를 찾을 수 없습니다", "id": key}, status_code=404)
+
+    headers = {"ETag": entry.etag, "Cache-Control": f"private, max-age={entry.ttl}"}
+    if read_cache.etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+# ===== 파이프라인 상태 =====
+
+@document_router.get("/progress/{task_id}")
+async def get_progress(request: Request, task_id: str):
+    """파이프라인 진행률"""
+    def load():
+        progress = get_pipeline_progress(task_id)
+        return None if "error" in progress else progress
+
+    return await cached_response(request, "progress", task_id, load, read_cache.ttl_for("progress"))
+
+
+@document_router.get("/notifications/{task_id}")
+async def get_notifications(request: Request, task_id: str):
+    """알림 히스토리"""
+    def load():
+        notifications = get_notification_history(task_id)
+        return {
+            "task_id": task_id,
+            "notification_count": len(notifications),
+            "notifications": notifications
+        }
+
+    return await cached_response(request, "notifications", task_id, load, read_cache.ttl_for("notifications"))
+
+
+@document_router.get("/status/{task_id}")
+async def get_status(request: Request, task_id: str):
+    """문서 상태 + 진행률 + 최근 알림 (결과 본문은 /document/documents/{id}/chunks 로 조회)"""
+    def load():
+        document = documents.get_document(task_id)
+        progress = get_pipeline_progress(task_id)
+        if document is None and "error" in progress:
+            return None
+        notifications = get_notification_history(task_id)
+        return {
+            "task_id": task_id,
+            "document_status": document.get("status") if document else None,
+            "celery_status": celery_app.AsyncResult(task_id).status,
+            "progress": None if "error" in progress else progress,
+            "latest_notification": notifications[0] if notifications else None
+        }
+
+    return await cached_response(request, "status", task_id, load, read_cache.ttl_for("status"))
+
+
+# ===== 문서 / 청크 =====
+
+@document_router.get("/documents")
+async def list_documents(
+    request: Request,
+    user_id: str = Query(None),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+):
+    """문서 목록 (최신순, user_id 로 필터)"""
+    key = f"{user_id or '*'}:{offset}:{limit}"
+    return await cached_response(
+        request, "documents", key,
+        lambda: documents.list_documents(user_id, offset, limit),
+        read_cache.ttl_for("documents"),
+    )
+
+
+@document_router.get("/documents/{document_id}")
+async def get_document(request: Request, document_id: str):
+    """문서 메타데이터"""
+    return await cached_response(
+        request, "document", document_id,
+        lambda: documents.get_document(document_id),
+        _document_ttl,
+    )
+
+
+@document_router.get("/documents/{document_id}/chunks")
+async def list_chunks(
+    request: Request,
+    document_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=500),
+):
+    """문서의 청크 목록 (순서대로)"""
+    return await cached_response(
+        request, "chunks", f"{document_id}:{offset}:{limit}",
+        lambda: documents.list_chunks(document_id, offset, limit),
+        lambda page: read_cache.ttl_for("chunks") if page["status"] in FINAL_STATUSES
+        else read_cache.ttl_for("document_processing"),
+        group=document_id,
+    )
 
 
+@document_router.get("/chunks/{chunk_id}")
+async def get_chunk(request: Request, chunk_id: str):
+    """청크 단건 조회"""
+    return await cached_response(
+        request, "chunk", chunk_id,
+        lambda: documents.get_chunk(chunk_id),
+        read_cache.ttl_for("chunk"),
+    )
@@ -0,0 +1,109 @@
+from fastapi import APIRouter, Query
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+
+import io, os, re, json, glob
+import pstats
+
+from background.profiling import get_profile_dir
+
+profile_router = APIRouter(prefix="/profile", tags=["작업 프로파일 조회"])
+
+# 작업 이름은 디렉토리 이름으로 쓰이므로 경로 문자 없이 모듈 경로 형식만 허용
+TASK_NAME_PATTERN = re.compile(r"[A-Za-z0-9_][A-Za-z0-9_.\-]*")
+# profile_id = {시작 시각}_{task_id} (background/profiling.py) - glob 메타 문자가 섞이지 않도록 형식 고정
+PROFILE_ID_PATTERN = re.compile(r"[0-9]{8}T[0-9]{6}_[A-Za-z0-9_\-]+")
+PROFILE_MODES = ("cprofile", "sample")
+SORT_KEYS = {key.value for key in pstats.SortKey} | {"tottime"}
+LIST_FIELDS = ("task_id", "mode", "reason", "state", "started_at", "duration_ms")
+
+
+def _find_profile(profile_id: str):
+    """profile_id 로 메타데이터 파일 경로 탐색 (형식이 다른 id 는 찾지 않음)"""
+    if not PROFILE_ID_PATTERN.fullmatch(profile_id):
+        return None
+    matches = glob.glob(os.path.join(glob.escape(get_profile_dir()), "*", f"{glob.escape(profile_id)}.json"))
+    return matches[0] if matches else None
+
+
+@profile_router.get("/")
+async def list_profiles(task_name: str = Query(None), limit: int = Query(50, le=500)):
+    """저장된 프로파일 목록 (최신순) - 읽을 수 없거나 형식이 다른 파일은 건너뜀"""
+    if task_name is not None and (not TASK_NAME_PATTERN.fullmatch(task_name) or ".." in task_name):
+        return JSONResponse(content={"error": "잘못된 task_name 입니다"}, status_code=400)
+
+    pattern = os.path.join(get_profile_dir(), task_name or "*", "*.json")
+    profiles = []
+    for path in sorted(glob.glob(pattern), key=_mtime, reverse=True):
+        if len(profiles) >= limit:
+            break
+        try:
+            with open(path) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if not isinstance(meta, dict) or "profile_id" not in meta or "task_name" not in meta:
+            continue
+        profiles.append({
+            "profile_id": meta["profile_id"],
+            "task_name": meta["task_name"],
+            **{field: meta.get(field) for field in LIST_FIELDS},
+        })
+    return JSONResponse(content={"count": len(profiles), "profiles": profiles})
+
+
+def _mtime(path: str) -> float:
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0.0  # 목록 조회 중 삭제된 파일
+
+
+@profile_router.get("/{profile_id}")
+async def get_profile(
+    profile_id: str,
+    sort: str = Query("cumulative", description="pstats 정렬 기준 (cumulative, tottime, calls ...)"),
+    limit: int = Query(30, le=200),
+):
+    """프로파일 상세 - span 타이밍 + 상위 함수 통계 (cProfile) 또는 상위 스택 (sample)"""
+    if sort not in SORT_KEYS:
+        return JSONResponse(content={"error": f"잘못된 sort 입니다 (허용: {', '.join(sorted(SORT_KEYS))})"},
+                            status_code=400)
+    meta_path = _find_profile(profile_id)
+    if not meta_path:
+        return JSONResponse(content={"error": "프로파일을 찾을 수 없습니다"}, status_code=404)
+
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        meta = None
+    if not isinstance(meta, dict) or meta.get("mode") not in PROFILE_MODES:
+        # 기록 중이거나 이전 형식의 메타데이터
+        return JSONResponse(content={"error": "프로파일 메타데이터를 읽을 수 없습니다"}, status_code=422)
+
+    base = meta_path[:-len(".json")]
+    if meta.get("mode") == "sample":
+        with open(base + ".folded") as f:
+            meta["top_stacks"] = [line.rstrip("\n") for _, line in zip(range(limit), f)]
+    else:
+        stream = io.StringIO()
+        stats = pstats.Stats(base + ".prof", stream=stream)
+        stats.sort_stats(sort).print_stats(limit)
+        meta["stats"] = stream.getvalue()
+
+    return JSONResponse(content=meta)
+
+
+@profile_router.get("/{profile_id}/raw")
+async def get_profile_raw(profile_id: str):
+    """원본 프로파일 (snakeviz/flamegraph 도구용)"""
+    meta_path = _find_profile(profile_id)
+    if not meta_path:
+        return JSONResponse(content={"error": "프로파일을 찾을 수 없습니다"}, status_code=404)
+
+    base = meta_path[:-len(".json")]
+    if os.path.exists(base + ".folded"):
+        with open(base + ".folded") as f:
+            return PlainTextResponse(f.read())
+    with open(base + ".prof", "rb") as f:
+        return Response(content=f.read(), media_type="application/octet-stream")
@@ -1,24 +1,45 @@
+import asyncio
+from typing import List, Optional
+
 from fastapi import APIRouter, UploadFile, File, Form
 from fastapi.responses import JSONResponse
 
-import os, aiofiles
 import logging
+from starlette.concurrency import run_in_threadpool
 
-# 로깅 설정
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 sample_router = APIRouter(prefix="/sample")
 
-from background.task.sample_tasks import (
-    split_document, 
-    process_document_pipeline_advanced, 
-    get_pipeline_progress,
-    get_notification_history
-)
+# 작업 모듈은 임포트하지 않고 이름으로 발행 (web 프로세스 기동 시간 단축)
+from background.store import get_pipeline_progress, get_notification_history
+from background.pipeline import signature, SPLIT_DOCUMENT_TASK, FINALIZE_TASK, INGEST_BATCH_TASK
 
 
 from background.celery import celery_app
+from background import admission, batch, fair_queue, pipeline_spec, storage
+
+async def save_upload(user_id: str, file: UploadFile) -> dict:
+    """업로드를 내용 주소 저장소에 기록 (파이프라인 몫의 참조 포함, 스풀 파일에서 나눠 읽음)"""
+    await file.seek(0)
+    record = await run_in_threadpool(storage.store_upload, user_id, file.filename, file.file)
+    logger.info(f"파일 저장 완료 - {record['filename']} v{record['version']} "
+                f"({record['size']} bytes, sha256={record['sha256'][:12]})")
+    return record
+
+async def admit(user_id: str) -> Optional[JSONResponse]:
+    """업로드 수용 제어 - 한도 초과면 429 응답, 수용이면 None (토큰 버킷 지연은 여기서 기다림)"""
+    decision = await run_in_threadpool(admission.get_controller().check, user_id)
+    if not decision.admitted:
+        logger.warning(f"업로드 거절 ({decision.reason}) - user_id: {user_id}")
+        return JSONResponse(content={
+            "error": "처리 대기 작업이 많아 요청을 받을 수 없습니다. 잠시 후 다시 시도하세요",
+            "reason": decision.reason,
+            "retry_after": round(decision.retry_after, 2)
+        }, status_code=429, headers={"Retry-After": decision.retry_after_header()})
+    if decision.wait:
+        await asyncio.sleep(decision.wait)
+    return None
 
 @sample_router.post("/learn_file")
 async def learn_file(
@@ -28,41 +49,26 @@ async def learn_file(
     try:
         logger.info(f"파일 업로드 시작 - user_id: {user_id}, filename: {file.filename}")
         
-        upload_dir = f"data/uploads/{user_id}"
-        logger.info(f"업로드 디렉토리: {upload_dir}")
-        
-        # 디렉토리 생성
-        os.makedirs(upload_dir, exist_ok=True)
-        logger.info(f"디렉토리 생성 완료: {upload_dir}")
+        # 수용 제어 (업로드 저장/발행 전)
+        rejected = await admit(user_id)
+        if rejected:
+            return rejected
 
-        file_path = os.path.join(upload_dir, file.filename)
-        logger.info(f"파일 저장 경로: {file_path}")
-        
-        # 파일 내용 읽기
-        content = await file.read()
-        logger.info(f"파일 크기: {len(content)} bytes")
-        
         # 파일 저장
-        async with aiofiles.open(file_path, "wb") as f:
-            await f.write(content)
-        
-        # 파일 저장 확인
-        if os.path.exists(file_path):
-            file_size = os.path.getsize(file_path)
-            logger.info(f"파일 저장 성공! 크기: {file_size} bytes")
-        else:
-            logger.error(f"파일 저장 실패! 경로: {file_path}")
-            return JSONResponse(content={"error": "파일 저장 실패"}, status_code=500)
-
-        # Celery 작업 시작
-        result = split_document.delay(file_path)
+        upload = await save_upload(user_id, file)
+        file_path = upload["path"]
+
+        # Celery 작업 시작 (완료/실패 시 업로드 참조 반환)
+        finalize = signature(FINALIZE_TASK, kwargs={"blob_sha256": upload["sha256"]}, immutable=True)
+        result = signature(SPLIT_DOCUMENT_TASK, file_path).apply_async(link=finalize, link_error=finalize)
         logger.info(f"Celery 작업 시작 - task_id: {result.id}")
 
         return JSONResponse(content={
             "message": "File uploaded successfully", 
             "task_id": result.id,
             "file_path": file_path,
-            "file_size": len(content)
+            "file_size": upload["size"],
+            "version": upload["version"]
         }, status_code=200)
         
     except Exception as e:
@@ -94,46 +100,35 @@ async def process_document_with_pipeline(
     try:
         logger.info(f"파이프라인 처리 시작 - user_id: {user_id}, filename: {file.filename}")
         
-        upload_dir = f"data/uploads/{user_id}"
-        logger.info(f"업로드 디렉토리: {upload_dir}")
-        
-        # 디렉토리 생성
-        os.makedirs(upload_dir, exist_ok=True)
-        logger.info(f"디렉토리 생성 완료: {upload_dir}")
+        # 수용 제어 (업로드 저장/발행 전)
+        rejected = await admit(user_id)
+        if rejected:
+            return rejected
 
-        file_path = os.path.join(upload_dir, file.filename)
-        logger.info(f"파일 저장 경로: {file_path}")
-        
-        # 파일 내용 읽기
-        content = await file.read()
-        logger.info(f"파일 크기: {len(content)} bytes")
-        
         # 파일 저장
-        async with aiofiles.open(file_path, "wb") as f:
-            await f.write(content)
-        
-        # 파일 저장 확인
-        if os.path.exists(file_path):
-            file_size = os.path.getsize(file_path)
-            logger.info(f"파일 저장 성공! 크기: {file_size} bytes")
-        else:
-            logger.error(f"파일 저장 실패! 경로: {file_path}")
-            return JSONResponse(content={"error": "파일 저장 실패"}, status_code=500)
-
-        # Chain 파이프라인 시작
-        pipeline_result = process_document_pipeline_advanced(file_path)
-        logger.info(f"파이프라인 시작 - chain_id: {pipeline_result.id}")
+        upload = await save_upload(user_id, file)
+        file_path = upload["path"]
+
+        # Chain 파이프라인 시작 (사용자별 공정 스케줄링)
+        job = fair_queue.submit(user_id, file_path, upload["size"], blob_sha256=upload["sha256"],
+                                filename=upload["filename"])
+        logger.info(f"파이프라인 {job['status']} - chain_id: {job['chain_id']}")
 
         return JSONResponse(content={
             "message": "Document processing pipeline started successfully", 
-            "chain_id": pipeline_result.id,
+            "chain_id": job["chain_id"],
             "file_path": file_path,
-            "file_size": len(content),
+            "file_size": upload["size"],
+            "version": upload["version"],
+            "execution_mode": job["mode"],
+            "scheduling": {
+                "status": job["status"],
+                "lane": job["lane"],
+                "queue_position": job.get("queue_position")
+            },
             "pipeline_steps": [
-                "1. 텍스트 추출",
-                "2. 텍스트 청킹", 
-                "3. 임베딩 생성",
-                "4. 데이터베이스 저장"
+                f"{index}. {name.replace('_', ' ')}"
+                for index, name in enumerate(pipeline_spec.step_names(), start=1)
             ]
         }, status_code=200)
         
@@ -150,29 +145,33 @@ async def process_document_advanced(
     try:
         logger.info(f"고급 파이프라인 처리 시작 - user_id: {user_id}, filename: {file.filename}")
         
-        upload_dir = f"data/uploads/{user_id}"
-        os.makedirs(upload_dir, exist_ok=True)
+        # 수용 제어 (업로드 저장/발행 전)
+        rejected = await admit(user_id)
+        if rejected:
+            return rejected
 
-        file_path = os.path.join(upload_dir, file.filename)
-        
         # 파일 저장
-        content = await file.read()
-        async with aiofiles.open(file_path, "wb") as f:
-            await f.write(content)
-        
-        # 파일 저장 확인
-        if not os.path.exists(file_path):
-            return JSONResponse(content={"error": "파일 저장 실패"}, status_code=500)
+        upload = await save_upload(user_id, file)
+        file_path = upload["path"]
 
-        # 고급 파이프라인 시작
-        pipeline_result = process_document_pipeline_advanced(file_path)
-        logger.info(f"고급 파이프라인 시작 - chain_id: {pipeline_result.id}")
+        # 고급 파이프라인 시작 (사용자별 공정 스케줄링)
+        job = fair_queue.submit(user_id, file_path, upload["size"], blob_sha256=upload["sha256"],
+                                filename=upload["filename"])
+        chain_id = job["chain_id"]
+        logger.info(f"고급 파이프라인 {job['status']} - chain_id: {chain_id}")
 
         return JSONResponse(content={
             "message": "Advanced document processing pipeline started", 
-            "chain_id": pipeline_result.id,
+            "chain_id": chain_id,
             "file_path": file_path,
-            "file_size": len(content),
+            "file_size": upload["size"],
+            "version": upload["version"],
+            "execution_mode": job["mode"],
+            "scheduling": {
+                "status": job["status"],
+                "lane": job["lane"],
+                "queue_position": job.get("queue_position")
+            },
             "features": [
                 "단계별 타임아웃 설정",
                 "구조화된 로깅",
@@ -181,9 +180,11 @@ async def process_document_advanced(
                 "알림 시스템 연동"
             ],
             "endpoints": {
-                "progress": f"/document/progress/{pipeline_result.id}",
-                "notifications": f"/document/notifications/{pipeline_result.id}",
-                "result": f"/chain-result/{pipeline_result.id}"
+                "progress": f"/document/progress/{chain_id}",
+                "notifications": f"/document/notifications/{chain_id}",
+                "status": f"/document/status/{chain_id}",
+                "document": f"/document/documents/{chain_id}",
+                "chunks": f"/document/documents/{chain_id}/chunks"
             }
         }, status_code=200)
         
@@ -245,3 +246,80 @@ async def get_comprehensive_status(task_id: str):
         })
     except Exception as e:
         return JSONResponse(content={"error": str(e)}, status_code=500)
+
+@sample_router.post("/batch_ingest")
+async def batch_ingest(
+    user_id: str = Form(...),
+    files: List[UploadFile] = File(default=[]),
+    directory: Optional[str] = Form(None),
+    max_in_flight: Optional[int] = Form(None),
+):
+    """대량 문서 배치 수집 - 여러 파일 / 서버 디렉토리 / 압축 파일(zip, tar)
+
+    파일들은 배치 대기열에 쌓이고 max_in_flight 개씩 공정 스케줄링을 거쳐 고급 파이프라인으로 처리됩니다.
+    진행 상황은 /sample/batch/{batch_id} 한 곳에서 파일별로 조회합니다.
+    """
+    try:
+        if not files and not directory:
+            return JSONResponse(content={"error": "files 또는 directory 중 하나는 필요합니다"}, status_code=400)
+        if directory:
+            try:
+                batch.resolve_directory(directory)
+            except (PermissionError, FileNotFoundError) as e:
+                return JSONResponse(content={"error": str(e)}, status_code=400)
+
+        # 수용 제어 (업로드 저장/배치 생성 전) - 배치 파일은 이후 사용자 슬롯으로 제한됨
+        rejected = await admit(user_id)
+        if rejected:
+            return rejected
+
+        documents = [f for f in files if not batch.is_archive(f.filename)]
+        archive_files = [f for f in files if batch.is_archive(f.filename)]
+        logger.info(f"배치 수집 시작 - user_id: {user_id}, 파일 {len(documents)}개, "
+                    f"압축 {len(archive_files)}개, 디렉토리: {directory}")
+
+        batch_id = batch.create(user_id, {
+            "files": len(documents),
+            "archives": [f.filename for f in archive_files],
+            "directory": directory,
+        }, max_in_flight)
+
+        # 개별 파일은 바로 저장소에 기록 후 등록, 압축 파일/디렉토리는 워커에서 풀며 등록
+        for file in documents:
+            upload = await save_upload(user_id, file)
+            await run_in_threadpool(batch.add_file, batch_id, upload)
+        archives = []
+        for file in archive_files:
+            upload = await save_upload(user_id, file)
+            archives.append({"filename": upload["filename"], "path": upload["path"], "sha256": upload["sha256"]})
+
+        signature(INGEST_BATCH_TASK, batch_id, directory, archives).apply_async()
+        logger.info(f"배치 수집 등록 완료 - batch_id: {batch_id}")
+
+        return JSONResponse(content={
+            "message": "Batch ingest started",
+            "batch_id": batch_id,
+            "registered_files": len(documents),
+            "pending_expansion": {
+                "archives": len(archives),
+                "directory": directory
+            },
+            "endpoints": {
+                "status": f"/sample/batch/{batch_id}"
+            }
+        }, status_code=200)
+
+    except Exception as e:
+        logger.error(f"배치 수집 중 오류 발생: {str(e)}")
+        return JSONResponse(content={"error": str(e)}, status_code=500)
+
+@sample_router.get("/batch/{batch_id}")
+async def get_batch_status(batch_id: str, offset: int = 0, limit: int = 100, status: Optional[str] = None):
+    """배치 집계 상태 + 파일별 상태 (offset/limit 페이지, status 로 필터)"""
+    try:
+        result = await run_in_threadpool(batch.status, batch_id, offset, min(limit, 1000), status)
+        if result is None:
+            return JSONResponse(content={"error": "배치 정보를 찾을 수 없습니다"}, status_code=404)
+        return JSONResponse(content=result)
+    except Exception as e:
+        return JSONResponse(content={"error": str(e)}, status_code=500)
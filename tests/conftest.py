@@ -0,0 +1,20 @@
+# 로컬 실행 모드 대역(InMemoryRedis, eager Celery, 시뮬레이션 시계) 위에서 테스트
+# 외부 Redis / 워커 없이 실행됩니다.
+
+import pytest
+
+from background.celery import celery_app
+from background import clock, local, read_cache
+from background.memory_store import InMemoryRedis
+
+
+@pytest.fixture
+def redis_client(tmp_path):
+    """테스트마다 새 인메모리 저장소 + 임시 업로드 디렉토리로 로컬 모드 전환"""
+    client = local.enable(celery_app, time_scale=0, redis_client=InMemoryRedis())
+    storage_dir = celery_app.conf.get("upload_storage_dir")
+    celery_app.conf.upload_storage_dir = str(tmp_path / "blobs")
+    read_cache._cache = None  # 이전 테스트의 조회 캐시 비우기
+    yield client
+    celery_app.conf.upload_storage_dir = storage_dir
+    clock.reset()
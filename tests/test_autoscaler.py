@@ -0,0 +1,113 @@
+from background.autoscaler import (
+    Autoscaler,
+    MetricsLatencySource,
+    ScalingPolicy,
+    SimulatedQueue,
+    histogram_quantile,
+    simulate,
+)
+
+
+def _policy(**overrides):
+    options = {
+        "min_procs": 1,
+        "max_procs": 6,
+        "target_backlog_per_proc": 5,
+        "max_wait_seconds": 30,
+        "scale_up_cooldown": 5,
+        "scale_down_cooldown": 30,
+    }
+    options.update(overrides)
+    return ScalingPolicy.from_config("sim", options)
+
+
+def _run(queue, scaler, seconds, interval=5.0):
+    decisions = []
+    end = queue.now + seconds
+    while queue.now < end:
+        queue.advance(interval)
+        decisions.append(scaler.evaluate("sim"))
+    return decisions
+
+
+def test_burst_scales_up_then_back_down():
+    """버스트 동안 적체를 따라 확장하고, 버스트가 끝나면 최소 프로세스 수로 돌아옴"""
+    def arrivals(t):
+        return 4.0 if t < 120 else 0.0
+
+    queue = SimulatedQueue("sim", arrivals, service_time=1.0, procs=1)
+    scaler = Autoscaler(queue, [_policy()], clock=lambda: queue.now)
+
+    burst = _run(queue, scaler, 120)
+    assert max(d["current"] for d in burst) > 1
+    assert any(d["action"] == "scale_up" for d in burst)
+
+    _run(queue, scaler, 600)
+    assert queue.depth("sim") == 0
+    assert queue.procs == 1
+
+
+def test_scaling_never_leaves_policy_bounds():
+    queue = SimulatedQueue("sim", lambda t: 50.0, service_time=2.0, procs=2)
+    scaler = Autoscaler(queue, [_policy(min_procs=2, max_procs=4)], clock=lambda: queue.now)
+
+    decisions = _run(queue, scaler, 300)
+    assert all(2 <= d["current"] <= 4 for d in decisions)
+    assert queue.procs == 4
+
+
+def test_latency_signal_scales_up_below_backlog_threshold():
+    """적체 기준으로는 확장하지 않는 부하에서도 대기 시간 p95 가 허용치를 넘으면 확장"""
+    def arrivals(t):
+        return 1.5
+
+    without_latency = SimulatedQueue("sim", arrivals, service_time=2.0, procs=2, seed=3)
+    scaler = Autoscaler(without_latency, [_policy(min_procs=2, target_backlog_per_proc=1000, max_wait_seconds=1e9)],
+                        clock=lambda: without_latency.now)
+    _run(without_latency, scaler, 300)
+    assert without_latency.procs == 2
+
+    with_latency = SimulatedQueue("sim", arrivals, service_time=2.0, procs=2, seed=3)
+    scaler = Autoscaler(with_latency, [_policy(min_procs=2, target_backlog_per_proc=1000, max_wait_seconds=1e9,
+                                               max_latency_p95_seconds=5)],
+                        clock=lambda: with_latency.now)
+    decisions = _run(with_latency, scaler, 300)
+    assert with_latency.procs > 2
+    assert any(d["latency_p95"] and d["latency_p95"] > 5 for d in decisions)
+
+
+def test_simulate_report_shortens_waits_compared_to_fixed_pool():
+    fixed = simulate(_policy(min_procs=1, max_procs=1), duration=600)
+    scaled = simulate(_policy(min_procs=1, max_procs=8), duration=600)
+
+    assert fixed["max_procs_used"] == 1
+    assert scaled["max_procs_used"] > 1
+    assert scaled["wait_p99"] < fixed["wait_p99"]
+
+
+def test_histogram_quantile_interpolates_within_bucket():
+    buckets = {0.5: 0, 1.0: 50, 2.5: 100, float("inf"): 100}
+    assert histogram_quantile(0.5, buckets) == 1.0
+    assert histogram_quantile(0.95, buckets) == 1.0 + 1.5 * 45 / 50
+    assert histogram_quantile(0.95, {1.0: 0, float("inf"): 0}) is None
+
+
+def test_metrics_latency_source_uses_delta_between_scrapes():
+    """워커 메트릭의 누적 버킷에서 직전 조회 이후 분만 골라 p95 계산 (다른 큐의 작업은 제외)"""
+    def exposition(fast, slow):
+        lines = ["# TYPE celery_task_queue_wait_seconds histogram"]
+        for task, (under_1s, under_10s) in {
+            "background.task.sample_tasks.embed": (fast, fast + slow),
+            "background.task.default_tasks.add": (0, 500),
+        }.items():
+            for bound, count in (("1.0", under_1s), ("10.0", under_10s), ("+Inf", under_10s)):
+                lines.append(f'celery_task_queue_wait_seconds_bucket{{le="{bound}",task="{task}"}} {count}')
+            lines.append(f'celery_task_queue_wait_seconds_count{{task="{task}"}} {under_10s}')
+        return "\n".join(lines) + "\n"
+
+    pages = iter([exposition(100, 0), exposition(100, 20)])
+    source = MetricsLatencySource(["http://worker:9808/metrics"], {"sim": ["background.task.sample_tasks"]},
+                                  fetch=lambda url: next(pages))
+
+    assert source.latency_p95("sim") <= 1.0
+    assert source.latency_p95("sim") > 1.0  # 두 번째 조회 구간에는 느린 작업만 있음
@@ -0,0 +1,99 @@
+import io
+import os
+import zipfile
+
+import pytest
+
+from background import batch, fair_queue, storage
+from background.celery import celery_app
+from background.task import document_tasks
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    monkeypatch.setattr(celery_app.conf, "batch_max_member_bytes", 1000)
+    monkeypatch.setattr(celery_app.conf, "batch_max_archive_bytes", 2500)
+    monkeypatch.setattr(celery_app.conf, "batch_max_archive_members", 3)
+
+
+def _zip(tmp_path, members):
+    path = tmp_path / "docs.zip"
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in members:
+            archive.writestr(name, content)
+    return str(path)
+
+
+def test_iter_archive_checks_declared_sizes_before_reading(tmp_path, redis_client, limits):
+    path = _zip(tmp_path, [
+        ("a.txt", b"a" * 900),
+        ("huge.txt", b"0" * 50000),  # 압축하면 작지만 풀면 큼
+        ("b.txt", b"b" * 900),
+        ("c.txt", b"c" * 900),  # 누적 2700 > 2500
+        ("d.txt", b"d" * 10),
+    ])
+    entries = [(name, size, reason) for name, size, _, reason in batch.iter_archive(path)]
+    assert entries == [
+        ("a.txt", 900, None),
+        ("huge.txt", 50000, batch.MEMBER_TOO_LARGE),
+        ("b.txt", 900, None),
+        ("c.txt", 900, batch.ARCHIVE_SIZE_LIMIT),
+    ]
+
+
+def test_iter_archive_stops_at_member_count(tmp_path, redis_client, limits):
+    path = _zip(tmp_path, [(f"{i}.txt", b"x") for i in range(5)])
+    reasons = [reason for _, _, _, reason in batch.iter_archive(path)]
+    assert reasons == [None, None, None, batch.ARCHIVE_MEMBER_LIMIT]
+
+
+def test_ingest_records_skipped_members_in_batch_status(tmp_path, redis_client, limits, monkeypatch):
+    monkeypatch.setattr(batch, "pump", lambda batch_id: 0)  # 파이프라인 발행은 이 테스트 대상이 아님
+    path = _zip(tmp_path, [("a.txt", b"a" * 100), ("huge.txt", b"0" * 5000), ("b.txt", b"b" * 100)])
+    with open(path, "rb") as f:
+        archive = storage.store_upload("u1", "docs.zip", f)
+
+    batch_id = batch.create("u1", {"archives": ["docs.zip"]})
+    document_tasks.ingest_document_batch.apply(args=(batch_id, None, [archive]))
+
+    status = batch.status(batch_id)
+    assert status["counts"]["queued"] == 2
+    assert status["counts"]["skipped"] == 1
+    skipped = [f for f in status["files"] if f["status"] == "skipped"]
+    assert skipped == [{
+        "index": 1, "filename": "docs.zip/huge.txt", "size": 5000, "status": "skipped",
+        "reason": batch.MEMBER_TOO_LARGE, "chain_id": None, "finished_at": skipped[0]["finished_at"],
+    }]
+    assert not os.path.exists(archive["path"])  # 압축 파일 참조는 풀고 나서 반환
+
+
+def test_store_upload_streams_and_enforces_max_bytes(redis_client):
+    record = storage.store_upload("u1", "a.txt", io.BytesIO(b"x" * (storage.CHUNK_SIZE + 10)))
+    assert record["size"] == storage.CHUNK_SIZE + 10
+    assert os.path.getsize(record["path"]) == record["size"]
+
+    with pytest.raises(ValueError):
+        storage.store_upload("u1", "b.txt", io.BytesIO(b"y" * 2000), max_bytes=1000)
+    leftovers = [name for _, _, files in os.walk(storage.storage_dir()) for name in files
+                 if name.startswith(".upload-")]
+    assert leftovers == []
+
+
+def test_batch_files_share_user_fair_slots(redis_client):
+    """배치 파일도 사용자 슬롯을 쓰므로 슬롯이 찬 사용자의 배치는 공정 스케줄링 대기열에서 기다림"""
+    held = fair_queue.max_inflight("u1")
+    redis_client.set(fair_queue.INFLIGHT_KEY.format(user_id="u1"), held)  # 다른 업로드가 슬롯을 모두 사용 중
+
+    batch_id = batch.create("u1", {"files": 2})
+    for i in range(2):
+        batch.add_file(batch_id, storage.store_upload("u1", f"{i}.txt", f"문서 {i} 본문. ".encode() * 50))
+    batch.finish_expanding(batch_id)
+    assert batch.pump(batch_id) == 2
+    assert fair_queue.pending_count("u1") == 2
+    assert batch.status(batch_id)["counts"]["completed"] == 0
+
+    fair_queue.release("u1")  # 슬롯 하나가 비면 배치 파일이 차례로 실행 (eager)
+    status = batch.status(batch_id)
+    assert status["done"] and status["counts"]["completed"] == 2
+    assert fair_queue.pending_count("u1") == 0
+    assert fair_queue.inflight("u1") == held - 1
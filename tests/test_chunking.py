@@ -0,0 +1,61 @@
+import random
+
+from background.chunking import content_hash, split_boundaries
+
+
+def _text(seed: int, words: int, newlines: bool = True) -> str:
+    rng = random.Random(seed)
+    vocabulary = ["".join(rng.choice("abcdefghijklmn가나다라마바사") for _ in range(rng.randint(2, 9)))
+                  for _ in range(400)]
+    parts = []
+    for _ in range(words):
+        parts.append(rng.choice(vocabulary))
+        parts.append("\n" if newlines and rng.random() < 0.08 else " ")
+    return "".join(parts)
+
+
+def _chunks(text):
+    return [text[start:end] for start, end in split_boundaries(text)]
+
+
+def _reuse_ratio(before, after):
+    """수정 후 청크 중 수정 전에도 있던 청크(내용 해시 기준) 비율"""
+    previous = {content_hash(chunk) for chunk in before}
+    return sum(content_hash(chunk) in previous for chunk in after) / len(after)
+
+
+def test_boundaries_cover_text_within_size_limits():
+    text = _text(1, 8000)
+    bounds = list(split_boundaries(text, min_chars=250, max_chars=1000))
+    assert bounds[0][0] == 0 and bounds[-1][1] == len(text)
+    assert all(end == next_start for (_, end), (next_start, _) in zip(bounds, bounds[1:]))
+    assert all(250 <= end - start <= 1000 for start, end in bounds[:-1])
+
+
+def test_small_edit_only_changes_neighbouring_chunks():
+    text = _text(2, 8000)
+    before = _chunks(text)
+    middle = len(text) // 2
+    edited = text[:middle] + " 추가된 문장입니다 " + text[middle:]
+    after = _chunks(edited)
+
+    changed = [chunk for chunk in after if chunk not in set(before)]
+    assert len(changed) <= 2
+    assert _reuse_ratio(before, after) >= 0.95
+
+
+def test_prepend_to_single_long_line_keeps_later_chunks():
+    """줄바꿈 없는 긴 줄도 고정 오프셋이 아니라 내용으로 자르므로 앞에 글자를 넣어도 뒤 청크는 그대로"""
+    text = _text(3, 6000, newlines=False)
+    before = _chunks(text)
+    after = _chunks("머리말 " + text)
+
+    assert len(before) > 20
+    assert _reuse_ratio(before, after) >= 0.9
+
+
+def test_deleted_paragraph_keeps_reuse_ratio():
+    text = _text(4, 8000)
+    start = len(text) // 3
+    edited = text[:start] + text[start + 200:]
+    assert _reuse_ratio(_chunks(text), _chunks(edited)) >= 0.95
@@ -0,0 +1,38 @@
+from background import documents
+from background.read_cache import get_cache
+
+
+def _chunk(chunk_id, content):
+    return {"chunk_id": chunk_id, "content": content, "content_hash": chunk_id, "char_count": len(content)}
+
+
+def _page(document_id):
+    return get_cache().get("chunks", f"{document_id}:0:50",
+                           lambda: documents.list_chunks(document_id, 0, 50), 300, group=document_id)
+
+
+def _chunk_entry(chunk_id):
+    return get_cache().get("chunk", chunk_id, lambda: documents.get_chunk(chunk_id), 3600)
+
+
+def test_new_version_invalidates_removed_chunks_and_superseded_pages(redis_client):
+    documents.register("v1", "/blobs/v1", user_id="u1", filename="a.txt")
+    documents.save_chunks("v1", [_chunk("c1", "one"), _chunk("c2", "two")], user_id="u1", filename="a.txt")
+    assert [c["chunk_id"] for c in documents.list_chunks("v1")["items"]] == ["c1", "c2"]
+
+    first_page = _page("v1")
+    assert b'"status": "completed"' in first_page.body
+    assert b'"document_id": "v1"' in _chunk_entry("c1").body
+    assert _chunk_entry("c2") is not None
+
+    documents.register("v2", "/blobs/v2", user_id="u1", filename="a.txt")
+    documents.save_chunks("v2", [_chunk("c1", "one"), _chunk("c3", "three")], user_id="u1", filename="a.txt",
+                          removed_ids=["c2"])
+
+    assert documents.get_document("v1")["status"] == "superseded"
+    assert _chunk_entry("c2") is None  # 삭제된 청크는 캐시에서도 사라짐
+    assert b'"document_id": "v2"' in _chunk_entry("c1").body  # 재사용 청크는 새 문서 기준
+    page = _page("v1")
+    assert page.etag != first_page.etag
+    assert b'"status": "superseded"' in page.body
+    assert b"two" not in page.body
@@ -0,0 +1,67 @@
+from background import documents, fair_queue, storage
+
+
+def test_slot_released_after_successful_pipeline(redis_client):
+    record = storage.store_upload("u1", "a.txt", "문서 본문 한 줄입니다.\n".encode() * 400)
+    job = fair_queue.submit("u1", record["path"], record["size"], blob_sha256=record["sha256"], filename="a.txt")
+
+    assert job["status"] == "dispatched"
+    assert documents.get_document(job["chain_id"])["status"] == "completed"
+    assert fair_queue.inflight("u1") == 0
+
+
+def test_slot_released_after_failed_pipeline(redis_client, tmp_path):
+    """대기 작업의 파이프라인이 실패해도 release() 는 정상 반환하고, 슬롯 반환 후 남은 대기 작업을 계속 배정"""
+    redis_client.set(fair_queue.INFLIGHT_KEY.format(user_id="u1"), fair_queue.max_inflight("u1"))
+    failing = fair_queue.submit("u1", str(tmp_path / "missing.txt"), 100)  # 추출 단계에서 실패
+    record = storage.store_upload("u1", "a.txt", "문서 본문 한 줄입니다.\n".encode() * 400)
+    following = fair_queue.submit("u1", record["path"], record["size"], blob_sha256=record["sha256"])
+    assert failing["status"] == following["status"] == "queued"
+
+    assert fair_queue.release("u1") == 2
+    assert documents.get_document(failing["chain_id"])["status"] == "failed"
+    assert documents.get_document(following["chain_id"])["status"] == "completed"
+    assert fair_queue.pending_count("u1") == 0
+    assert fair_queue.inflight("u1") == fair_queue.max_inflight("u1") - 1
+
+
+def _fill_slots(redis_client, user_id="u1"):
+    redis_client.set(fair_queue.INFLIGHT_KEY.format(user_id=user_id), fair_queue.max_inflight(user_id))
+
+
+def test_publish_failure_requeues_job_and_keeps_tenant_in_ring(redis_client, monkeypatch):
+    """발행이 실패해도 작업은 대기열 맨 앞으로, 사용자는 링으로 돌아가 다음 release 때 배정됨"""
+    _fill_slots(redis_client)
+    queued = fair_queue.submit("u1", "/blobs/a.txt", 100)
+    dispatched = []
+
+    def broken_publish(job):
+        raise ConnectionError("broker down")
+
+    monkeypatch.setattr(fair_queue, "_dispatch", broken_publish)
+    assert fair_queue.release("u1") == 0
+    assert fair_queue.inflight("u1") == fair_queue.max_inflight("u1") - 1
+    assert fair_queue.pending_count("u1") == 1
+    assert redis_client.lrange(fair_queue.TENANT_RING_KEY, 0, -1) == ["u1"]
+
+    monkeypatch.setattr(fair_queue, "_dispatch", dispatched.append)
+    assert fair_queue.dispatch_pending() == 1
+    assert [job["chain_id"] for job in dispatched] == [queued["chain_id"]]
+
+
+def test_submit_dispatches_when_slot_freed_while_enqueueing(redis_client, monkeypatch):
+    """슬롯 확인이 실패한 뒤 대기열에 넣기 전에 release 가 지나가도 작업이 대기열에 묶이지 않음"""
+    dispatched = []
+    monkeypatch.setattr(fair_queue, "_dispatch", dispatched.append)
+    real_acquire, attempts = fair_queue._try_acquire, []
+
+    def acquire_after_first(user_id):
+        attempts.append(user_id)
+        return len(attempts) > 1 and real_acquire(user_id)  # 첫 확인 때는 한도였다가 곧바로 반환됨
+
+    monkeypatch.setattr(fair_queue, "_try_acquire", acquire_after_first)
+
+    job = fair_queue.submit("u1", "/blobs/a.txt", 100)
+    assert [item["chain_id"] for item in dispatched] == [job["chain_id"]]
+    assert fair_queue.pending_count("u1") == 0
+    assert fair_queue.inflight("u1") == 1
@@ -0,0 +1,97 @@
+import json
+import threading
+
+import pytest
+from celery.exceptions import Retry
+
+from background import idempotency, retention
+from background.celery import celery_app
+from background.idempotency import DONE_KEY, LOCK_KEY, IdempotentTask
+from background.store import get_notification_history, send_notification
+
+calls = []
+
+
+@celery_app.task(bind=True, base=IdempotentTask, name="tests.idempotent_echo")
+def idempotent_echo(self, value):
+    calls.append(value)
+    return {"value": value}
+
+
+@pytest.fixture(autouse=True)
+def _reset_calls():
+    calls.clear()
+
+
+def _keys(task_id):
+    return (LOCK_KEY.format(task=idempotent_echo.name, key=task_id),
+            DONE_KEY.format(task=idempotent_echo.name, key=task_id))
+
+
+def _run_on_worker(task_id, value):
+    """워커가 메시지를 받아 실행하는 것처럼 (eager 아님) 실행"""
+    idempotent_echo.push_request(id=task_id, retries=0, is_eager=False, called_directly=False,
+                                 args=[value], kwargs={}, headers={})
+    try:
+        return idempotent_echo(value)
+    finally:
+        idempotent_echo.pop_request()
+
+
+def test_redelivery_retries_while_dead_worker_lock_is_held(redis_client, monkeypatch):
+    """죽은 워커의 잠금이 남은 재전달은 버리지 않고 재시도, 잠금이 풀리면 실행"""
+    monkeypatch.setitem(celery_app.conf, "task_always_eager", False)
+    lock_key, done_key = _keys("t-redelivered")
+    redis_client.set(lock_key, "t-redelivered", ex=60)
+
+    with pytest.raises(Retry) as excinfo:
+        _run_on_worker("t-redelivered", "a")
+    assert calls == []
+    assert 1 <= excinfo.value.when <= int(idempotency._conf().get("contention_countdown", 30))
+
+    redis_client.delete(lock_key)  # 잠금 TTL 만료
+    assert _run_on_worker("t-redelivered", "a") == {"value": "a"}
+    assert calls == ["a"]
+    assert json.loads(redis_client.get(done_key)) == {"value": "a"}
+    assert redis_client.get(lock_key) is None
+
+
+def test_committed_key_returns_recorded_result(redis_client):
+    """완료 기록이 있으면 다시 실행하지 않고 기록된 결과 반환"""
+    _, done_key = _keys("t-done")
+    redis_client.set(done_key, json.dumps({"value": "first"}))
+
+    assert idempotent_echo.apply(args=["second"], task_id="t-done").get() == {"value": "first"}
+    assert calls == []
+
+
+def test_eager_contention_waits_for_running_copy(redis_client):
+    """eager 실행은 실행 중인 같은 키가 끝날 때까지 기다렸다가 그 결과를 반환"""
+    lock_key, done_key = _keys("t-running")
+    redis_client.set(lock_key, "t-running", ex=60)
+
+    def finish():
+        redis_client.set(done_key, json.dumps({"value": "other"}))
+        redis_client.delete(lock_key)
+
+    timer = threading.Timer(0.05, finish)
+    timer.start()
+    try:
+        assert idempotent_echo.apply(args=["mine"], task_id="t-running").get() == {"value": "other"}
+    finally:
+        timer.join()
+    assert calls == []
+
+
+def test_notifications_dedupe_only_redelivered_messages(redis_client):
+    """같은 단계의 다른 알림은 모두 보내고, 같은 (작업, 단계, 상태, 메시지) 재전달만 생략"""
+    send_notification("t1", "임베딩_생성", "warning", "임베딩 생성 진행 중: 10/27")
+    send_notification("t1", "임베딩_생성", "warning", "임베딩 생성 진행 중: 20/27")
+    send_notification("t1", "임베딩_생성", "warning", "임베딩 생성 진행 중: 10/27")  # 재시도로 다시 보냄
+    send_notification("t2", "임베딩_생성", "warning", "임베딩 생성 진행 중: 10/27")
+
+    assert [item["message"] for item in get_notification_history("t1")] == [
+        "임베딩 생성 진행 중: 20/27", "임베딩 생성 진행 중: 10/27"]
+    assert len(get_notification_history("t2")) == 1
+    assert 0 < redis_client.ttl("notified:t1") <= retention.ttl("progress", 3600)
+    assert list(redis_client.scan_iter("idem:once:*")) == []
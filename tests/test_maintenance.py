@@ -0,0 +1,13 @@
+from background import maintenance
+
+
+def test_sweep_keys_deletes_only_intermediate_without_ttl(redis_client):
+    """진행률이 만료된 작업의 중간 결과도 TTL 이 남아 있으면 유지 (재시도/재개가 다시 읽음)"""
+    redis_client.setex("intermediate:t-retrying:청크_생성", 600, "{}")  # progress:t-retrying 없음
+    redis_client.set("intermediate:t-leaked:청크_생성", "{}")
+
+    stats = maintenance.sweep_keys()
+
+    assert stats["intermediate"]["deleted"] == 1
+    assert redis_client.exists("intermediate:t-retrying:청크_생성")
+    assert not redis_client.exists("intermediate:t-leaked:청크_생성")
@@ -0,0 +1,50 @@
+import pytest
+
+from background import pipeline, pipeline_spec, storage
+from background.celery import celery_app
+
+
+def _stored_results():
+    """cache+memory 결과 백엔드에 저장된 작업 ID"""
+    prefix = b"celery-task-meta-"
+    return {key[len(prefix):].decode() for key in celery_app.backend.client.cache if key.startswith(prefix)}
+
+
+@pytest.fixture
+def results(redis_client):
+    celery_app.backend.client.cache.clear()
+    yield
+    celery_app.backend.client.cache.clear()
+
+
+def test_compiled_chain_stores_only_final_result():
+    signatures = pipeline.compile_pipeline(("blob",), {"user_id": "u1"}, final_task_id="doc-1").tasks
+    assert len(signatures) == len(pipeline_spec.stage_groups())
+    assert all(sig.options.get("ignore_result") for sig in signatures[:-1])
+    assert signatures[-1].options["task_id"] == "doc-1"
+    assert "ignore_result" not in signatures[-1].options
+
+
+@pytest.mark.parametrize("mode", [pipeline_spec.STAGED, pipeline_spec.FUSED])
+def test_pipeline_run_stores_only_final_chain_result(results, mode):
+    record = storage.store_upload("u1", "a.txt", "문서 본문 한 줄입니다.\n".encode() * 400)
+    result = pipeline.process_document_pipeline_advanced(record["path"], user_id="u1", filename="a.txt", mode=mode)
+
+    assert result.status == "SUCCESS"
+    assert _stored_results() == {result.id}
+
+
+def test_fan_out_stage_stores_only_final_chain_result(results, monkeypatch):
+    """parallelism > 1 인 중간 단계를 chord 로 교체해도 합친 결과는 저장하지 않음 (eager chord 는 샤드 결과를 직접 전달)"""
+    spec = {"stages": [dict(stage) for stage in pipeline_spec.stages()]}
+    for stage in spec["stages"]:
+        if stage["name"] == "임베딩_생성":
+            stage["parallelism"] = 2
+    monkeypatch.setattr(celery_app.conf, "document_pipeline", pipeline_spec.validate(spec))
+
+    record = storage.store_upload("u1", "a.txt", "다른 문서 본문입니다.\n".encode() * 400)
+    result = pipeline.process_document_pipeline_advanced(record["path"], user_id="u1", filename="a.txt",
+                                                         mode=pipeline_spec.STAGED)
+
+    assert result.status == "SUCCESS"
+    assert _stored_results() == {result.id}
@@ -0,0 +1,27 @@
+from background import pipeline, pipeline_spec, retention
+from background.celery import celery_app
+
+WEEK = 7 * 86400
+
+
+def _task(name):
+    pipeline.ensure_tasks_loaded()
+    return celery_app.tasks[name]
+
+
+def test_final_stage_task_uses_its_own_policy(redis_client):
+    assert retention.expires_for(_task(pipeline.SAVE_TASK), {}) == WEEK
+    assert retention.expires_for(_task(pipeline.EXTRACT_TASK), {}) is None
+
+
+def test_fused_group_uses_policy_of_its_last_stage(redis_client):
+    """FUSED 모드는 run_fused_stages 가 최종 결과를 저장 - 마지막 단계(저장) 작업의 보관 기간 적용"""
+    fused = _task(pipeline.FUSED_STAGES_TASK)
+    assert retention.expires_for(fused, {"stages": pipeline_spec.step_names()}) == WEEK
+    assert retention.expires_for(fused, {"stages": pipeline_spec.step_names()[:2]}) is None
+
+
+def test_fan_out_wrapper_uses_policy_of_its_stage(redis_client):
+    fan_out = _task(pipeline.FAN_OUT_TASK)
+    assert retention.expires_for(fan_out, {"stage": "데이터베이스_저장"}) == WEEK
+    assert retention.expires_for(fan_out, {"stage": "임베딩_생성"}) is None
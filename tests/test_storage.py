@@ -0,0 +1,127 @@
+import os
+import hashlib
+import threading
+from contextlib import contextmanager
+
+import pytest
+
+from background import storage
+
+
+def _refs(client, sha256):
+    return int(client.get(storage.REFS_KEY.format(sha256=sha256)) or 0)
+
+
+def test_release_removes_blob_after_last_reference(redis_client):
+    first = storage.store_upload("u1", "a.txt", b"hello")
+    storage.store_upload("u2", "b.txt", b"hello")
+    assert _refs(redis_client, first["sha256"]) == 2
+
+    assert storage.release(first["sha256"]) == 1
+    assert os.path.exists(first["path"])
+    assert storage.release(first["sha256"]) == 0
+    assert not os.path.exists(first["path"])
+    assert redis_client.get(storage.REFS_KEY.format(sha256=first["sha256"])) is None
+
+
+def test_upload_during_release_rewrites_blob(redis_client, monkeypatch):
+    """release 가 참조 0 을 본 직후 같은 내용이 다시 업로드되면, 업로드는 잠금을 기다렸다가 파일을 다시 씀"""
+    record = storage.store_upload("u1", "a.txt", b"payload")
+    decrement = storage._decrement
+    uploaded = {}
+
+    def interleaved(key):
+        remaining = decrement(key)
+        # 다른 요청의 store_upload: release 가 잠금을 놓을 때까지 파일 확인과 참조 획득을 기다림
+        thread = threading.Thread(target=lambda: uploaded.update(storage.store_upload("u2", "b.txt", b"payload")))
+        thread.start()
+        thread.join(timeout=0.05)
+        assert thread.is_alive()
+        uploaded["thread"] = thread
+        return remaining
+
+    monkeypatch.setattr(storage, "_decrement", interleaved)
+    assert storage.release(record["sha256"]) == 0
+    uploaded["thread"].join(timeout=5)
+
+    assert _refs(redis_client, record["sha256"]) == 1
+    with open(uploaded["path"], "rb") as f:
+        assert f.read() == b"payload"
+
+
+def test_failed_store_upload_does_not_leak_reference(redis_client, monkeypatch):
+    """잠금 대기 시간 초과로 끝난 업로드는 참조를 남기지 않음 (남으면 파일이 영영 정리되지 않음)"""
+    @contextmanager
+    def busy_guard(sha256):
+        raise TimeoutError("blob 잠금 대기 시간 초과")
+        yield
+
+    monkeypatch.setattr(storage, "blob_guard", busy_guard)
+    with pytest.raises(TimeoutError):
+        storage.store_upload("u1", "a.txt", b"payload")
+    sha256 = hashlib.sha256(b"payload").hexdigest()
+    assert _refs(redis_client, sha256) == 0
+
+
+def test_version_history_is_trimmed(redis_client, monkeypatch):
+    monkeypatch.setattr(storage._conf(), "upload_max_versions", 3)
+    for i in range(5):
+        record = storage.store_upload("u1", "a.txt", f"v{i}".encode())
+    assert record["version"] == 5
+    assert [v["version"] for v in storage.list_versions("u1", "a.txt")] == [5, 4, 3]
+
+
+def test_store_upload_recreates_blob_removed_after_release(redis_client):
+    record = storage.store_upload("u1", "a.txt", b"payload")
+    os.unlink(record["path"])  # 참조를 잡기 직전 다른 release 가 파일을 지운 상황
+
+    again = storage.store_upload("u2", "b.txt", b"payload")
+    with open(again["path"], "rb") as f:
+        assert f.read() == b"payload"
+
+
+def test_concurrent_upload_and_release_never_lose_referenced_blob(redis_client):
+    """참조를 잡고 있는 동안에는 항상 파일을 읽을 수 있고, 모두 반환하면 파일과 카운트가 사라짐"""
+    errors = []
+
+    def worker(n):
+        for i in range(50):
+            record = storage.store_upload(f"u{n}", f"{i}.txt", b"shared content")
+            try:
+                with open(record["path"], "rb") as f:
+                    assert f.read() == b"shared content"
+            except (OSError, AssertionError) as e:
+                errors.append(e)
+            storage.release(record["sha256"])
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    sha256 = storage.store_upload("check", "x.txt", b"shared content", acquire=False)["sha256"]
+    assert _refs(redis_client, sha256) == 0
+
+
+def test_release_is_atomic_against_concurrent_acquire(redis_client):
+    """감소와 삭제 사이에 잡힌 참조를 잃지 않음"""
+    record = storage.store_upload("u1", "a.txt", b"payload", acquire=False)
+    storage.acquire(record["sha256"])
+    barrier = threading.Barrier(2)
+
+    def release():
+        barrier.wait()
+        storage.release(record["sha256"])
+
+    def acquire():
+        barrier.wait()
+        storage.acquire(record["sha256"])
+
+    threads = [threading.Thread(target=release), threading.Thread(target=acquire)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert _refs(redis_client, record["sha256"]) == 1